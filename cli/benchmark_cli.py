@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+
+import argparse
+
+from lib.benchmarks import (
+    ann_recall_benchmark,
+    batch_search_benchmark,
+    build_benchmark,
+    embedding_cache_benchmark,
+    encode_benchmark,
+    fusion_benchmark,
+    hybrid_warm_benchmark,
+    query_cache_benchmark,
+    startup_benchmark,
+)
+
+
+def print_latencies(label: str, stats: dict) -> None:
+    print(
+        f"  {label:<20} mean {stats['mean_ms']:8.2f} ms  "
+        f"p50 {stats['p50_ms']:8.2f} ms  p95 {stats['p95_ms']:8.2f} ms  "
+        f"({stats['queries']} queries)"
+    )
+
+
+def print_cache_stats(stats: dict) -> None:
+    print(
+        f"  {'':<20} memory hits {stats['memory_hits']}, "
+        f"disk hits {stats['disk_hits']}, misses {stats['misses']} "
+        f"(hit rate {stats['hit_rate']:.0%})"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark CLI")
+    subparsers = parser.add_subparsers(dest="command", help="Available commands")
+
+    hybrid_warm_parser = subparsers.add_parser(
+        "hybrid-warm",
+        help="Compare RRF latency with a warm searcher vs reloading the index",
+    )
+    hybrid_warm_parser.add_argument(
+        "--runs", type=int, default=3, help="Passes over the golden dataset"
+    )
+
+    build_parser = subparsers.add_parser(
+        "build", help="Compare inverted index build time across worker counts"
+    )
+    build_parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4],
+        help="Worker counts to benchmark; the first is the baseline",
+    )
+
+    embedding_cache_parser = subparsers.add_parser(
+        "embedding-cache", help="Measure query embedding latency with the embedding cache"
+    )
+    embedding_cache_parser.add_argument(
+        "--runs", type=int, default=3, help="Repeated passes over the golden dataset"
+    )
+
+    ann_parser = subparsers.add_parser(
+        "ann", help="Measure IVF chunk search recall and latency against exact search"
+    )
+    ann_parser.add_argument(
+        "--nprobe",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4, 8, 16, 32],
+        help="nprobe values to compare",
+    )
+    ann_parser.add_argument("--nlist", type=int, help="Number of IVF lists")
+    ann_parser.add_argument(
+        "--limit", type=int, default=10, help="Results per query compared for recall"
+    )
+
+    batch_parser = subparsers.add_parser(
+        "batch", help="Compare one-query-at-a-time search with the batched APIs"
+    )
+    batch_parser.add_argument(
+        "--queries", type=int, default=500, help="Number of distinct queries"
+    )
+    batch_parser.add_argument(
+        "--limit", type=int, default=5, help="Results per query"
+    )
+
+    query_cache_parser = subparsers.add_parser(
+        "query-cache", help="Measure RRF search hit rate and latency with the query cache"
+    )
+    query_cache_parser.add_argument(
+        "--requests", type=int, default=1000, help="Number of search requests"
+    )
+
+    fusion_parser = subparsers.add_parser(
+        "fusion", help="Compare the array fusion kernels with Python loops"
+    )
+    fusion_parser.add_argument(
+        "--size", type=int, default=2500, help="Results per retriever"
+    )
+    fusion_parser.add_argument(
+        "--retrievers", type=int, default=2, help="Number of result lists fused"
+    )
+    fusion_parser.add_argument(
+        "--runs", type=int, default=50, help="Calls timed per case"
+    )
+
+    encode_parser = subparsers.add_parser(
+        "encode",
+        help="Compare chunk encoding throughput across encoder pool sizes",
+    )
+    encode_parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4, 8],
+        help="Pool sizes to benchmark",
+    )
+    encode_parser.add_argument(
+        "--texts", type=int, default=4000, help="Number of chunks encoded"
+    )
+
+    startup_parser = subparsers.add_parser(
+        "startup",
+        help="Check CLI import times against their budgets; exits 1 if any is over",
+    )
+    startup_parser.add_argument(
+        "--runs", type=int, default=3, help="Runs per command; the fastest counts"
+    )
+
+    args = parser.parse_args()
+
+    match args.command:
+        case "hybrid-warm":
+            result = hybrid_warm_benchmark(runs=args.runs)
+            print("Hybrid RRF search latency:")
+            print_latencies("reload per query", result["reload_per_query"])
+            print_latencies("warm searcher", result["warm"])
+        case "build":
+            print("Inverted index build time:")
+            for res in build_benchmark(args.workers):
+                print(
+                    f"  {res['workers']:>2} workers: {res['seconds']:7.2f} s  "
+                    f"speedup {res['speedup']:5.2f}x  "
+                    f"identical: {'yes' if res['identical'] else 'NO'}"
+                )
+        case "embedding-cache":
+            result = embedding_cache_benchmark(runs=args.runs)
+            print("Query embedding latency:")
+            print_latencies("first pass", result["first_pass"])
+            print_cache_stats(result["first_pass_stats"])
+            print_latencies("repeated passes", result["repeat"])
+            print_cache_stats(result["repeat_stats"])
+        case "ann":
+            result = ann_recall_benchmark(args.nprobe, args.limit, args.nlist)
+            print(
+                f"IVF chunk search, {result['nlist']} lists over "
+                f"{result['chunks']} chunks (nprobe, recall@{args.limit} vs exact):"
+            )
+            for res in result["results"]:
+                label = f"{res['nprobe']!s:<6} {res['recall']:.3f}"
+                print_latencies(label, res["latency"])
+        case "batch":
+            print("Search throughput:")
+            for res in batch_search_benchmark(args.queries, args.limit):
+                print(
+                    f"  {res['engine']:<9} single {res['single_qps']:9.1f} q/s  "
+                    f"batched {res['batch_qps']:9.1f} q/s  "
+                    f"speedup {res['batch_qps'] / res['single_qps']:5.2f}x  "
+                    f"same results: {res['overlap']:.1%}"
+                )
+        case "query-cache":
+            result = query_cache_benchmark(args.requests)
+            stats = result["stats"]
+            print("Hybrid RRF search latency:")
+            print_latencies("no cache", result["uncached"])
+            print_latencies("query cache", result["cached"])
+            print(
+                f"  {'':<20} hit rate {stats['hit_rate']:.0%} "
+                f"({stats['hits']} hits, {stats['misses']} misses), "
+                f"mean hit {stats['mean_hit_ms']:.3f} ms, "
+                f"mean miss {stats['mean_miss_ms']:.2f} ms"
+            )
+        case "fusion":
+            print(
+                f"Fusion latency, {args.retrievers} lists of {args.size} results:"
+            )
+            for res in fusion_benchmark(args.size, args.retrievers, args.runs):
+                if res["loop_ms"] is None:
+                    print(f"  {res['name']:<18} {'':18}kernel {res['kernel_ms']:8.3f} ms")
+                else:
+                    print(
+                        f"  {res['name']:<18} loop {res['loop_ms']:8.3f} ms  "
+                        f"kernel {res['kernel_ms']:8.3f} ms  "
+                        f"speedup {res['loop_ms'] / res['kernel_ms']:6.1f}x"
+                    )
+        case "encode":
+            result = encode_benchmark(args.workers, args.texts)
+            print(
+                f"Chunk encoding, {result['texts']} chunks "
+                f"(single process {result['baseline_texts_per_second']:.1f} chunks/s):"
+            )
+            for res in result["results"]:
+                print(
+                    f"  {res['workers']:>2} workers x {res['threads']:>2} threads: "
+                    f"{res['texts_per_second']:8.1f} chunks/s  "
+                    f"speedup {res['speedup']:5.2f}x  "
+                    f"startup {res['startup_seconds']:5.1f} s  "
+                    f"max diff {res['max_diff']:.1e}"
+                )
+        case "startup":
+            results = startup_benchmark(runs=args.runs)
+            print("CLI import time (best run vs budget):")
+            for res in results:
+                status = "ok" if res["passed"] else "FAIL"
+                print(
+                    f"  {status:<4} {res['import_ms']:7.1f} / {res['budget_ms']:4.0f} ms  "
+                    f"{res['command']}"
+                )
+                if res["deferred_imports"]:
+                    print(f"       imported {', '.join(res['deferred_imports'])}")
+                if res["returncode"] != 0:
+                    print(f"       exited with status {res['returncode']}")
+            failed = sum(not res["passed"] for res in results)
+            if failed:
+                parser.exit(1, f"{failed} command(s) over their startup budget\n")
+        case _:
+            parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
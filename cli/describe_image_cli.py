@@ -1,12 +1,7 @@
 import argparse
 import mimetypes
-import os
 
-from dotenv import load_dotenv
-from google import genai
-from google.genai import types
-
-load_dotenv()
+from lib.llm_client import get_llm_client
 
 
 def main():
@@ -22,15 +17,14 @@ def main():
 
 
 def multi_model_search(query: str, image: str):
+    from google.genai import types
+
     mime, _ = mimetypes.guess_type(image)
     mime = mime or "image/jpeg"
 
     with open(image, "rb") as f:
         img = f.read()
 
-    api_key = os.environ.get("GEMINI_API_KEY")
-    client = genai.Client(api_key=api_key)
-
     prompt = """Given the included image and text query, rewrite the text query to improve search results from a movie database. Make sure to:
         - Synthesize visual and textual information
 - Focus on movie-specific details (actors, scenes, style, etc.)
@@ -41,10 +35,7 @@ def multi_model_search(query: str, image: str):
         types.Part.from_bytes(data=img, mime_type=mime),
         query.strip(),
     ]
-    response = client.models.generate_content(
-        model="gemini-2.0-flash-001",
-        contents=parts,
-    )
+    response = get_llm_client().generate(parts)
 
     print(f"Rewritten query: {response.text.strip()}")
     if response.usage_metadata is not None:
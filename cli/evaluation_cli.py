@@ -1,9 +1,15 @@
 import argparse
+import os
 import unittest
 import json
 
-from lib.search_utils import GOLDEN_DATASET_PATH
-from lib.hybrid_search import rrf_search_command
+from lib.search_utils import (
+    EMBEDDING_QUANTIZATION_ENV,
+    GOLDEN_DATASET_PATH,
+    QUANTIZATION_KINDS,
+    SEARCH_SERVER_ENV,
+)
+from lib.search_client import call_search_service
 
 
 def main():
@@ -14,9 +20,18 @@ def main():
         default=5,
         help="Number of results to evaluate (k for precision@k, recall@k)",
     )
+    parser.add_argument(
+        "--quantization",
+        choices=QUANTIZATION_KINDS,
+        help="Search with quantized embeddings to measure their accuracy loss",
+    )
 
     args = parser.parse_args()
     limit = args.limit
+    if args.quantization:
+        # A running server keeps its own embeddings, so search in-process.
+        os.environ[EMBEDDING_QUANTIZATION_ENV] = args.quantization
+        os.environ[SEARCH_SERVER_ENV] = "off"
 
     # run evaluation logic here
     evaluation(limit)
@@ -27,13 +42,14 @@ def evaluation(limit: int):
         golden_dataset = json.load(f)
 
     golden_dataset = golden_dataset["test_cases"]
-    for data in golden_dataset:
-        query = data["query"]
-        results = rrf_search_command(
-            query=query,
-            k=60,
-            limit=limit,
-        )["results"]
+    totals = {"precision": 0.0, "recall": 0.0, "f1": 0.0}
+    all_results = call_search_service(
+        "rrf_search_many",
+        queries=[data["query"] for data in golden_dataset],
+        k=60,
+        limit=limit,
+    )
+    for data, results in zip(golden_dataset, all_results):
         total_retrieved = len(results)
         relevent_retrieved = 0
         for res in results:
@@ -41,19 +57,28 @@ def evaluation(limit: int):
                 relevent_retrieved += 1
         precision = relevent_retrieved / total_retrieved
         recall = relevent_retrieved / len(data["relevant_docs"])
-        f1 = 2 * (precision * recall) / (precision + recall)
+        f1 = 2 * (precision * recall) / (precision + recall) if relevent_retrieved else 0.0
+        totals["precision"] += precision
+        totals["recall"] += recall
+        totals["f1"] += f1
 
         print(f"k={limit}\n")
         print(f"- Query: {data["query"]}")
         print(f"  - Precision@{limit}: {precision:.4f}")
         print(f"  - Recall@{limit}: {recall:.4f}")
-        print(f"  - F1 Score: {f1:4f}")
+        print(f"  - F1 Score: {f1:.4f}")
         retrieved = []
         for res in results:
             retrieved.append(res["title"])
         print(f"  - Retrieved: {", ".join(retrieved)}")
         print(f"  - Relevant:  {", ".join(data["relevant_docs"])}")
 
+    count = len(golden_dataset)
+    print(f"\nMean over {count} queries:")
+    print(f"  - Precision@{limit}: {totals['precision'] / count:.4f}")
+    print(f"  - Recall@{limit}: {totals['recall'] / count:.4f}")
+    print(f"  - F1 Score: {totals['f1'] / count:.4f}")
+
 
 class TestEvaluation(unittest.TestCase):
     def test_evaluation(self):
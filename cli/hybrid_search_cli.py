@@ -58,6 +58,11 @@ def main() -> None:
         choices=["individual", "batch", "cross_encoder"],
         help="Rerank the returned results",
     )
+    rrf_search_parser.add_argument(
+        "--rerank-budget-ms",
+        type=float,
+        help="Time allowed for cross_encoder reranking; lower-ranked results past it keep their order",
+    )
     rrf_search_parser.add_argument(
         "--evaluate",
         action="store_true",
@@ -97,6 +102,8 @@ def main() -> None:
                 args.k,
                 args.limit,
                 args.enhance,
+                args.rerank_method or "",
+                args.rerank_budget_ms,
             )
             if args.rerank_method:
                 print(
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 import argparse
+import os
 
 from lib.keyword_search import (
     bm25_idf_command,
@@ -11,6 +12,7 @@ from lib.keyword_search import (
     search_command,
     tf_command,
     tfidf_command,
+    update_command,
 )
 from lib.search_utils import (
     BM25_B,
@@ -22,7 +24,23 @@ def main() -> None:
     parser = argparse.ArgumentParser(description="Keyword Search CLI")
     subparsers = parser.add_subparsers(dest="command", help="Available commands")
 
-    subparsers.add_parser("build", help="Build the inverted index")
+    build_parser = subparsers.add_parser("build", help="Build the inverted index")
+    build_parser.add_argument(
+        "--impacts",
+        action="store_true",
+        help="Precompute BM25 impact postings for early-terminating top-k search",
+    )
+    build_parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes used to tokenize the catalog (0 = all cores)",
+    )
+
+    subparsers.add_parser(
+        "update",
+        help="Apply added, changed and deleted movies to the index without a rebuild",
+    )
 
     search_parser = subparsers.add_parser("search", help="Search movies using BM25")
     search_parser.add_argument("query", type=str, help="Search query")
@@ -73,8 +91,17 @@ def main() -> None:
     match args.command:
         case "build":
             print("Building inverted index...")
-            build_command()
+            build_command(args.impacts, args.workers or os.cpu_count() or 1)
             print("Inverted index built successfully.")
+        case "update":
+            print("Updating inverted index...")
+            stats = update_command()
+            print(
+                f"Added {stats['added']}, updated {stats['updated']}, "
+                f"deleted {stats['deleted']}, unchanged {stats['unchanged']}."
+            )
+            if stats["compacting"]:
+                print("Compacting the index in the background...")
         case "search":
             print("Searching for:", args.query)
             results = search_command(args.query)
@@ -0,0 +1,133 @@
+import math
+import os
+
+import numpy as np
+
+from .search_utils import ANN_KMEANS_ITERATIONS
+
+# Rows scored per matrix product while assigning vectors to lists.
+ASSIGN_BATCH_SIZE = 8192
+# Training vectors sampled per list when the collection is large.
+TRAIN_POINTS_PER_LIST = 64
+
+
+class IVFIndex:
+    """Inverted-file index over L2-normalized embeddings
+
+    Vectors are clustered with spherical k-means into `nlist` lists. A search
+    scores the centroids, then only the vectors in the `nprobe` closest lists,
+    so its cost grows with nprobe * n / nlist instead of n. Raising nprobe
+    trades latency for recall; nprobe == nlist is an exact search.
+    """
+
+    def __init__(
+        self,
+        centroids: np.ndarray,
+        list_offsets: np.ndarray,
+        list_ids: np.ndarray,
+        fingerprint: str,
+    ) -> None:
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_ids = list_ids
+        self.fingerprint = fingerprint
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(
+        cls,
+        embeddings: np.ndarray,
+        nlist: int | None = None,
+        iterations: int = ANN_KMEANS_ITERATIONS,
+        seed: int = 0,
+        fingerprint: str = "",
+    ) -> "IVFIndex":
+        """Cluster normalized embeddings into inverted lists
+
+        Args:
+            embeddings: (n, d) L2-normalized float32 matrix
+            nlist: Number of lists, 4 * sqrt(n) by default
+            iterations: k-means iterations
+            seed: Seed for sampling the training set and initial centroids
+            fingerprint: Identifies the embeddings, so a stale index is never
+                used with them; see file_fingerprint
+        """
+        n = len(embeddings)
+        if nlist is None:
+            nlist = int(4 * math.sqrt(n))
+        nlist = max(1, min(nlist, n))
+        rng = np.random.default_rng(seed)
+
+        train_size = min(n, nlist * TRAIN_POINTS_PER_LIST)
+        train = embeddings[np.sort(rng.choice(n, train_size, replace=False))]
+        centroids = train[rng.choice(train_size, nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = _assign(train, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, train)
+            counts = np.bincount(assignments, minlength=nlist)
+            empty = counts == 0
+            # Restart empty lists from random training vectors.
+            sums[empty] = train[rng.choice(train_size, int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = np.divide(sums, norms, out=sums, where=norms > 0)
+
+        assignments = _assign(embeddings, centroids)
+        list_ids = np.argsort(assignments, kind="stable").astype(np.int32)
+        counts = np.bincount(assignments, minlength=nlist)
+        list_offsets = np.zeros(nlist + 1, dtype=np.int64)
+        np.cumsum(counts, out=list_offsets[1:])
+        return cls(
+            centroids.astype(np.float32),
+            list_offsets,
+            list_ids,
+            fingerprint,
+        )
+
+    def candidates(self, query_embedding: np.ndarray, nprobe: int) -> np.ndarray:
+        """Row ids in the nprobe lists whose centroids best match the query"""
+        nprobe = max(1, min(nprobe, self.nlist))
+        centroid_scores = self.centroids @ query_embedding
+        if nprobe < self.nlist:
+            probes = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        else:
+            probes = np.arange(self.nlist)
+        return np.concatenate(
+            [
+                self.list_ids[self.list_offsets[i] : self.list_offsets[i + 1]]
+                for i in probes
+            ]
+        )
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            centroids=self.centroids,
+            list_offsets=self.list_offsets,
+            list_ids=self.list_ids,
+            fingerprint=np.array(self.fingerprint),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        with np.load(path) as data:
+            return cls(
+                data["centroids"],
+                data["list_offsets"],
+                data["list_ids"],
+                str(data["fingerprint"]),
+            )
+
+
+def _assign(embeddings: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    assignments = np.empty(len(embeddings), dtype=np.int64)
+    for start in range(0, len(embeddings), ASSIGN_BATCH_SIZE):
+        batch = embeddings[start : start + ASSIGN_BATCH_SIZE]
+        assignments[start : start + len(batch)] = np.argmax(batch @ centroids.T, axis=1)
+    return assignments
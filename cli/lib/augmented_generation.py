@@ -1,10 +1,8 @@
-import os
-
 from dotenv import load_dotenv
-from google import genai
 
-from .hybrid_search import rrf_search_command, HybridSearch
-from .search_utils import load_movies
+from .hybrid_search import rrf_search_command
+from .llm_client import get_llm_client
+from .search_client import call_search_service
 
 load_dotenv()
 
@@ -21,13 +19,7 @@ Documents:
 
 Provide a comprehensive answer that addresses the query:"""
 
-    api_key = os.environ.get("GEMINI_API_KEY")
-    client = genai.Client(api_key=api_key)
-
-    response = client.models.generate_content(
-        model="gemini-2.0-flash-001",
-        contents=prompt,
-    )
+    response = get_llm_client().generate(prompt)
 
     print("Search Results:")
     for i, doc in enumerate(docs["results"], 1):
@@ -38,10 +30,7 @@ Provide a comprehensive answer that addresses the query:"""
 
 
 def summarize_command(query: str, limit: int = 5):
-    movies = load_movies()
-    searcher = HybridSearch(movies)
-
-    results = searcher.rrf_search(query=query, k=50, limit=limit)
+    results = call_search_service("rrf_search", query=query, k=50, limit=limit)
     prompt = f"""
 Provide information useful to this query by synthesizing information from multiple search results in detail.
 The goal is to provide comprehensive information so that users know what their options are.
@@ -54,13 +43,7 @@ Provide a comprehensive 3–4 sentence answer that combines information from mul
 """
     print(len(prompt))
 
-    api_key = os.environ.get("GEMINI_API_KEY")
-    client = genai.Client(api_key=api_key)
-
-    response = client.models.generate_content(
-        model="gemini-2.0-flash-001",
-        contents=prompt,
-    )
+    response = get_llm_client().generate(prompt)
 
     print("Search Results:")
     for i, doc in enumerate(results, 1):
@@ -71,10 +54,7 @@ Provide a comprehensive 3–4 sentence answer that combines information from mul
 
 
 def citation_command(query: str, limit: int = 5):
-    movies = load_movies()
-    searcher = HybridSearch(movies)
-
-    results = searcher.rrf_search(query=query, k=50, limit=limit)
+    results = call_search_service("rrf_search", query=query, k=50, limit=limit)
     print(len(results))
     prompt = f"""Answer the question or provide information based on the provided documents.
 
@@ -98,13 +78,7 @@ Answer:"""
 
     print(len(prompt))
 
-    api_key = os.environ.get("GEMINI_API_KEY")
-    client = genai.Client(api_key=api_key)
-
-    response = client.models.generate_content(
-        model="gemini-2.0-flash-001",
-        contents=prompt,
-    )
+    response = get_llm_client().generate(prompt)
 
     print("Search Results:")
     for i, doc in enumerate(results, 1):
@@ -115,10 +89,7 @@ Answer:"""
 
 
 def question_command(question: str, limit: int):
-    movies = load_movies()
-    searcher = HybridSearch(movies)
-
-    context = searcher.rrf_search(query=question, k=50, limit=limit)
+    context = call_search_service("rrf_search", query=question, k=50, limit=limit)
     prompt = f"""Answer the user's question based on the provided movies that are available on Hoopla.
 
 This should be tailored to Hoopla users. Hoopla is a movie streaming service.
@@ -136,13 +107,7 @@ Instructions:
 
 Answer:"""
 
-    api_key = os.environ.get("GEMINI_API_KEY")
-    client = genai.Client(api_key=api_key)
-
-    response = client.models.generate_content(
-        model="gemini-2.0-flash-001",
-        contents=prompt,
-    )
+    response = get_llm_client().generate(prompt)
 
     print("Search Results:")
     for i, doc in enumerate(context, 1):
@@ -0,0 +1,437 @@
+import json
+import statistics
+import time
+from typing import Callable
+
+from .search_utils import (
+    DEFAULT_K,
+    DEFAULT_SEARCH_LIMIT,
+    GOLDEN_DATASET_PATH,
+    STARTUP_BUDGETS_MS,
+    STARTUP_DEFERRED_MODULES,
+    load_movies,
+)
+
+
+def load_benchmark_queries() -> list[str]:
+    with open(GOLDEN_DATASET_PATH, "r") as f:
+        golden_dataset = json.load(f)
+    return [case["query"] for case in golden_dataset["test_cases"]]
+
+
+def time_calls(fn: Callable[[str], object], queries: list[str], runs: int = 1) -> dict:
+    """Time fn once per query per run and summarize the latencies in ms"""
+    latencies = []
+    for _ in range(runs):
+        for query in queries:
+            start = time.perf_counter()
+            fn(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {
+        "queries": len(latencies),
+        "mean_ms": statistics.fmean(latencies),
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+    }
+
+
+def hybrid_warm_benchmark(
+    k: int = DEFAULT_K, limit: int = DEFAULT_SEARCH_LIMIT, runs: int = 3
+) -> dict:
+    """Per-query RRF latency when the index is reloaded per query vs kept warm"""
+    from .hybrid_search import HybridSearch
+
+    queries = load_benchmark_queries()
+    searcher = HybridSearch(load_movies())
+
+    def reload_every_query(query: str) -> None:
+        searcher.idx.load()
+        searcher.rrf_search(query, k, limit)
+
+    cold = time_calls(reload_every_query, queries, runs)
+    searcher.idx.ensure_loaded()
+    warm = time_calls(lambda q: searcher.rrf_search(q, k, limit), queries, runs)
+    return {"reload_per_query": cold, "warm": warm}
+
+
+def build_benchmark(worker_counts: list[int]) -> list[dict]:
+    """Time index builds per worker count and check they match a serial build"""
+    from .keyword_search import InvertedIndex
+
+    results = []
+    baseline = None
+    for workers in worker_counts:
+        idx = InvertedIndex()
+        start = time.perf_counter()
+        idx.build(workers=workers)
+        elapsed = time.perf_counter() - start
+
+        snapshot = (dict(idx.index), dict(idx.term_frequencies), idx.doc_lengths)
+        if baseline is None:
+            baseline = (elapsed, snapshot)
+        results.append(
+            {
+                "workers": workers,
+                "seconds": elapsed,
+                "speedup": baseline[0] / elapsed,
+                "identical": snapshot == baseline[1],
+            }
+        )
+    return results
+
+
+def embedding_cache_benchmark(runs: int = 3) -> dict:
+    """Query embedding latency on a first pass vs repeated passes, with cache stats"""
+    from .semantic_search import SemanticSearch
+
+    queries = load_benchmark_queries()
+    searcher = SemanticSearch()
+    first = time_calls(searcher.generate_embedding, queries)
+    first_stats = searcher.encoder.stats()
+    searcher.encoder.cache.reset_stats()
+    repeat = time_calls(searcher.generate_embedding, queries, runs)
+    return {
+        "first_pass": first,
+        "first_pass_stats": first_stats,
+        "repeat": repeat,
+        "repeat_stats": searcher.encoder.stats(),
+    }
+
+
+def ann_recall_benchmark(
+    nprobes: list[int], limit: int = DEFAULT_SEARCH_LIMIT, nlist: int | None = None
+) -> dict:
+    """Recall@limit of IVF chunk search against exact search, per nprobe"""
+    from .semantic_search import ChunkedSemanticSearch
+
+    queries = load_benchmark_queries()
+    searcher = ChunkedSemanticSearch()
+    searcher.load_or_create_chunk_embeddings(load_movies())
+    ann_index = searcher.load_or_create_ann_index(nlist)
+
+    exact = {q: [r["id"] for r in searcher.search_chunks(q, limit)] for q in queries}
+    results = [
+        {
+            "nprobe": "exact",
+            "recall": 1.0,
+            "latency": time_calls(lambda q: searcher.search_chunks(q, limit), queries),
+        }
+    ]
+    for nprobe in nprobes:
+        hits = total = 0
+        for query in queries:
+            found = {r["id"] for r in searcher.search_chunks(query, limit, nprobe)}
+            hits += len(found.intersection(exact[query]))
+            total += len(exact[query])
+        latency = time_calls(
+            lambda q: searcher.search_chunks(q, limit, nprobe), queries
+        )
+        results.append(
+            {
+                "nprobe": nprobe,
+                "recall": hits / total if total else 1.0,
+                "latency": latency,
+            }
+        )
+    return {"nlist": ann_index.nlist, "chunks": len(ann_index.list_ids), "results": results}
+
+
+def batch_search_benchmark(count: int = 500, limit: int = DEFAULT_SEARCH_LIMIT) -> list[dict]:
+    """Queries per second of one-at-a-time search vs the search_many APIs
+
+    Movie titles serve as distinct queries. The embedding cache is bypassed
+    so both sides pay for encoding.
+    """
+    from .hybrid_search import HybridSearch
+
+    movies = load_movies()
+    queries = [movie["title"] for movie in movies[:count]]
+    hybrid = HybridSearch(movies)
+    hybrid.idx.ensure_loaded()
+    semantic = hybrid.semantic_search
+    semantic.load_or_create_embeddings(movies)
+    semantic.encoder = semantic.model
+
+    engines = [
+        ("bm25", hybrid.idx.bm25_search, hybrid.idx.bm25_search_many),
+        ("semantic", semantic.search, semantic.search_many),
+        ("chunks", semantic.search_chunks, semantic.search_chunks_many),
+        (
+            "rrf",
+            lambda q, n: hybrid.rrf_search(q, DEFAULT_K, n),
+            lambda qs, n: hybrid.rrf_search_many(qs, DEFAULT_K, n),
+        ),
+    ]
+    results = []
+    for name, search, search_many in engines:
+        start = time.perf_counter()
+        single = [search(query, limit) for query in queries]
+        single_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        batched = search_many(queries, limit)
+        batch_seconds = time.perf_counter() - start
+        results.append(
+            {
+                "engine": name,
+                "queries": len(queries),
+                "single_qps": len(queries) / single_seconds,
+                "batch_qps": len(queries) / batch_seconds,
+                "overlap": _overlap(single, batched),
+            }
+        )
+    return results
+
+
+def _overlap(a: list[list[dict]], b: list[list[dict]]) -> float:
+    """Fraction of results both runs returned for the same query
+
+    Batched matrix products can round differently from single ones, which
+    only reorders results whose scores tie to float32 precision.
+    """
+    key = "id" if a and a[0] and "id" in a[0][0] else "title"
+    shared = total = 0
+    for results_a, results_b in zip(a, b):
+        shared += len({r[key] for r in results_a} & {r[key] for r in results_b})
+        total += len(results_a)
+    return shared / total if total else 1.0
+
+
+def query_cache_benchmark(
+    requests: int = 1000, k: int = DEFAULT_K, limit: int = DEFAULT_SEARCH_LIMIT
+) -> dict:
+    """Hit rate and latency of RRF search through the query cache
+
+    Requests draw movie titles with Zipf-like popularity, so a few queries
+    repeat heavily, and vary their case and spacing the way users do.
+    """
+    import random
+
+    from .search_service import SearchService
+
+    service = SearchService()
+    service.warm_up()
+    titles = [movie["title"] for movie in service.documents]
+    rng = random.Random(0)
+    weights = [1 / rank for rank in range(1, len(titles) + 1)]
+    queries = []
+    for title in rng.choices(titles, weights, k=requests):
+        queries.append(title.lower() if rng.random() < 0.5 else f" {title} ")
+
+    for query in queries[:10]:
+        service.hybrid.rrf_search(query, k, limit)
+    uncached = time_calls(lambda q: service.hybrid.rrf_search(q, k, limit), queries)
+    cached = time_calls(lambda q: service.rrf_search(q, k, limit), queries)
+    return {"uncached": uncached, "cached": cached, "stats": service.query_cache_stats()}
+
+
+def fusion_benchmark(size: int = 2500, retrievers: int = 2, runs: int = 50) -> list[dict]:
+    """Per-call latency of the fusion kernels vs dict-at-a-time Python loops
+
+    Each retriever returns `size` results drawn from a catalog-sized pool of
+    document ids. The loop baselines are the list-of-dicts implementations
+    hybrid search used before the kernels.
+    """
+    import numpy as np
+
+    from .fusion import fuse_scores, min_max_normalize
+    from .hybrid_search import fuse_search_results
+
+    rng = np.random.default_rng(0)
+    pool = max(len(load_movies()), size)
+    dense = np.full((retrievers, pool), -np.inf)
+    result_lists = []
+    for row in dense:
+        ids = rng.choice(pool, size, replace=False)
+        scores = np.sort(rng.random(size) * 10)[::-1]
+        row[ids] = scores
+        result_lists.append(
+            [
+                {"id": int(i), "title": "", "document": "", "score": float(s)}
+                for i, s in zip(ids, scores)
+            ]
+        )
+    raw_scores = [r["score"] for r in result_lists[0]]
+
+    cases = [
+        (
+            "min-max",
+            lambda: _python_min_max(raw_scores),
+            lambda: min_max_normalize(dense[0]),
+        ),
+        (
+            "rrf fusion",
+            lambda: _python_fuse(result_lists, "rrf"),
+            lambda: fuse_scores(dense, "rrf"),
+        ),
+        (
+            "weighted fusion",
+            lambda: _python_fuse(result_lists, "min_max"),
+            lambda: fuse_scores(dense, "min_max"),
+        ),
+        ("z-score fusion", None, lambda: fuse_scores(dense, "z_score")),
+        (
+            "rrf, result dicts",
+            None,
+            lambda: fuse_search_results(result_lists, "rrf"),
+        ),
+    ]
+    results = []
+    for name, loop, kernel in cases:
+        results.append(
+            {
+                "name": name,
+                "loop_ms": None if loop is None else _time_ms(loop, runs),
+                "kernel_ms": _time_ms(kernel, runs),
+            }
+        )
+    return results
+
+
+def encode_benchmark(
+    workers: list[int], texts: int = 4000, model_name: str = "all-MiniLM-L6-v2"
+) -> dict:
+    """Chunk encoding throughput on EncoderPools of each size vs one process
+
+    The texts are the catalog's description chunks, sorted by length as
+    embedding builds send them. Throughput excludes pool startup, which is
+    reported separately; max_diff is the largest difference from the
+    single-process embeddings.
+    """
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+
+    from .encoder_pool import EncoderPool
+    from .search_utils import EMBEDDING_BATCH_SIZE
+    from .semantic_search import movie_chunks
+
+    chunks = []
+    for movie in load_movies():
+        chunks.extend(movie_chunks(movie))
+        if len(chunks) >= texts:
+            break
+    chunks = sorted(chunks[:texts], key=len)
+
+    model = SentenceTransformer(model_name)
+    start = time.perf_counter()
+    expected = model.encode(
+        chunks, batch_size=EMBEDDING_BATCH_SIZE, show_progress_bar=False
+    )
+    baseline_seconds = time.perf_counter() - start
+
+    results = []
+    for count in workers:
+        start = time.perf_counter()
+        with EncoderPool(model_name, count) as pool:
+            pool.warm_up()
+            startup_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            embeddings = pool.encode(chunks, batch_size=EMBEDDING_BATCH_SIZE)
+            seconds = time.perf_counter() - start
+        results.append(
+            {
+                "workers": count,
+                "threads": pool.threads,
+                "startup_seconds": startup_seconds,
+                "texts_per_second": len(chunks) / seconds,
+                "speedup": baseline_seconds / seconds,
+                "max_diff": float(np.abs(embeddings - expected).max()),
+            }
+        )
+    return {
+        "texts": len(chunks),
+        "baseline_texts_per_second": len(chunks) / baseline_seconds,
+        "results": results,
+    }
+
+
+def startup_benchmark(
+    budgets: dict[str, float] = STARTUP_BUDGETS_MS, runs: int = 3
+) -> list[dict]:
+    """Import time of CLI invocations under -X importtime, checked against budgets
+
+    Each command runs `runs` times in a fresh interpreter and keeps its
+    fastest run. A command passes when that import time is within its budget
+    and it imported none of STARTUP_DEFERRED_MODULES.
+    """
+    import os
+    import shlex
+    import subprocess
+    import sys
+
+    cli_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = []
+    for command, budget_ms in budgets.items():
+        best_ms = None
+        for _ in range(runs):
+            proc = subprocess.run(
+                [sys.executable, "-X", "importtime", *shlex.split(command)],
+                cwd=cli_dir,
+                capture_output=True,
+                text=True,
+            )
+            import_ms, modules = _parse_importtime(proc.stderr)
+            if best_ms is None or import_ms < best_ms:
+                best_ms = import_ms
+        deferred = [
+            package
+            for package in STARTUP_DEFERRED_MODULES
+            if any(
+                name == package or name.startswith(package + ".") for name in modules
+            )
+        ]
+        results.append(
+            {
+                "command": command,
+                "import_ms": best_ms,
+                "budget_ms": budget_ms,
+                "returncode": proc.returncode,
+                "deferred_imports": deferred,
+                "passed": proc.returncode == 0
+                and best_ms <= budget_ms
+                and not deferred,
+            }
+        )
+    return results
+
+
+def _parse_importtime(stderr: str) -> tuple[float, set[str]]:
+    """Total import time in ms and the modules imported, from -X importtime output"""
+    total_us = 0
+    modules = set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        total_us += int(fields[0])
+        modules.add(fields[2].strip())
+    return total_us / 1000, modules
+
+
+def _time_ms(fn: Callable[[], object], runs: int) -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - start) * 1000 / runs
+
+
+def _python_min_max(scores: list[float]) -> list[float]:
+    low, high = min(scores), max(scores)
+    if high == low:
+        return [1.0] * len(scores)
+    return [(s - low) / (high - low) for s in scores]
+
+
+def _python_fuse(result_lists: list[list[dict]], method: str, k: int = DEFAULT_K) -> list:
+    combined: dict = {}
+    for i, results in enumerate(result_lists):
+        if method == "rrf":
+            contributions = [1 / (k + rank) for rank in range(1, len(results) + 1)]
+        else:
+            contributions = _python_min_max([r["score"] for r in results])
+        for result, contribution in zip(results, contributions):
+            scores = combined.setdefault(result["id"], [0.0] * len(result_lists))
+            scores[i] = max(scores[i], contribution)
+    return sorted(combined.items(), key=lambda x: sum(x[1]), reverse=True)
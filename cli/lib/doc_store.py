@@ -0,0 +1,157 @@
+import json
+import os
+from array import array
+from collections.abc import Iterable, Sequence
+
+import numpy as np
+
+from .index_segment import (
+    current_segment,
+    new_segment_dir,
+    publish_segment,
+    save_array,
+    write_json,
+)
+
+DOC_STORE_VERSION = 1
+
+DOC_STORE_META_FILE = "store.json"
+IDS_FILE = "ids.npy"
+# Each text column is a UTF-8 blob plus int64 offsets with a trailing sentinel.
+TEXT_COLUMNS = ("title", "description", "extra")
+
+
+class DocStore(Sequence):
+    """Columnar, memory-mapped movie catalog with random access by doc index
+
+    Layout (one directory per build, published like an index segment):
+        ids.npy                       int64 movie id per doc index
+        <column>.bin / <column>_offsets.npy  for title, description and
+                                      extra (any other fields, as JSON)
+
+    store[i] decodes one movie into the same dict the catalog holds, so the
+    store can stand in for the list load_movies() used to return without
+    keeping every movie in memory.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        with open(os.path.join(directory, DOC_STORE_META_FILE), "r") as f:
+            self.meta = json.load(f)
+        self.ids = np.load(os.path.join(directory, IDS_FILE), mmap_mode="r")
+        self.blobs = {}
+        self.offsets = {}
+        for column in TEXT_COLUMNS:
+            path = os.path.join(directory, f"{column}.bin")
+            if os.path.getsize(path) > 0:
+                self.blobs[column] = np.memmap(path, dtype=np.uint8, mode="r")
+            else:
+                self.blobs[column] = np.empty(0, dtype=np.uint8)
+            self.offsets[column] = np.load(
+                os.path.join(directory, f"{column}_offsets.npy"), mmap_mode="r"
+            )
+        self._positions: dict[int, int] | None = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("document index out of range")
+        doc = {
+            "id": int(self.ids[i]),
+            "title": self.text(i, "title"),
+            "description": self.text(i, "description"),
+        }
+        extra = self.text(i, "extra")
+        if extra:
+            doc.update(json.loads(extra))
+        return doc
+
+    def text(self, i: int, column: str) -> str:
+        offsets = self.offsets[column]
+        return self.blobs[column][offsets[i] : offsets[i + 1]].tobytes().decode("utf-8")
+
+    def index_of(self, doc_id: int) -> int | None:
+        if self._positions is None:
+            self._positions = {doc_id: i for i, doc_id in enumerate(self.ids.tolist())}
+        return self._positions.get(doc_id)
+
+    def is_current(self, source: str) -> bool:
+        return self.meta.get("version") == DOC_STORE_VERSION and self.meta.get(
+            "source"
+        ) == source_version(source)
+
+    @classmethod
+    def build(cls, movies: Iterable[dict], directory: str, source: str) -> "DocStore":
+        """Write a store from a stream of movies, one movie in memory at a time
+
+        Each build writes a new, uniquely named directory under `directory`
+        and publishes it in one rename, so concurrent rebuilds (the search
+        server and a CLI, say) never write the same files and readers never
+        see a half-written store.
+        """
+        version = source_version(source)
+        store_dir = new_segment_dir(directory)
+        ids = array("q")
+        offsets = {column: array("q", [0]) for column in TEXT_COLUMNS}
+        files = {
+            column: open(os.path.join(store_dir, f"{column}.bin"), "wb")
+            for column in TEXT_COLUMNS
+        }
+        try:
+            for movie in movies:
+                movie = dict(movie)
+                ids.append(movie.pop("id"))
+                values = {
+                    "title": movie.pop("title", ""),
+                    "description": movie.pop("description", ""),
+                    "extra": json.dumps(movie) if movie else "",
+                }
+                for column, value in values.items():
+                    data = value.encode("utf-8")
+                    files[column].write(data)
+                    offsets[column].append(offsets[column][-1] + len(data))
+        finally:
+            for f in files.values():
+                f.close()
+
+        for column in TEXT_COLUMNS:
+            save_array(
+                os.path.join(store_dir, f"{column}_offsets.npy"),
+                np.frombuffer(offsets[column], dtype=np.int64),
+            )
+        save_array(os.path.join(store_dir, IDS_FILE), np.frombuffer(ids, dtype=np.int64))
+        # Written last, so a store is only finished once every column is.
+        write_json(
+            os.path.join(store_dir, DOC_STORE_META_FILE),
+            {"version": DOC_STORE_VERSION, "source": version, "num_docs": len(ids)},
+        )
+        # Mapped before publishing: the arrays stay readable even if a
+        # concurrent rebuild publishes after us and removes this directory.
+        store = cls(store_dir)
+        publish_segment(directory, store_dir, meta_file=DOC_STORE_META_FILE)
+        return store
+
+
+def source_version(path: str) -> list:
+    stat = os.stat(path)
+    return [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+
+
+def open_doc_store(directory: str, source: str, movies: Iterable[dict]) -> DocStore:
+    """Open the store for a catalog file, rebuilding it from `movies` if stale"""
+    store_dir = current_segment(directory)
+    if store_dir is not None:
+        try:
+            store = DocStore(store_dir)
+        except FileNotFoundError:
+            # Removed by a newer build between reading the pointer and opening.
+            store = None
+        if store is not None and store.is_current(source):
+            return store
+    return DocStore.build(movies, directory, source)
@@ -0,0 +1,259 @@
+import itertools
+import json
+import math
+import os
+import queue
+import shutil
+import threading
+import time
+from collections.abc import Callable, Iterator, Sequence
+
+import numpy as np
+
+from .index_segment import write_json
+from .search_utils import (
+    CATALOG_BATCH_SIZE,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_PREFETCH_SHARDS,
+)
+
+BUILD_META_FILE = "build.json"
+
+
+class EmbeddingBuild:
+    """Embed a catalog shard by shard, checkpointing each shard to disk
+
+    The catalog is cut into shards of `shard_size` documents. A background
+    thread reads each shard and turns its documents into texts (the CPU-side
+    work, such as chunking) while the calling thread encodes the previous
+    shard, up to `prefetch` shards ahead. Each shard's texts are encoded in
+    length-sorted batches of `batch_size`, so a batch pads to similar
+    lengths whatever the catalog order, and the shard is saved once encoded.
+
+    A build that stops part way resumes from the shards already saved: a
+    shard is reused when its document ids and content hashes still match.
+
+    Args:
+        directory: Where shards are kept until the build finishes
+        encoder: CachedEncoder (or model) the texts are encoded with
+        label: What the texts are, for progress output, e.g. "chunks"
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        encoder,
+        label: str,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        shard_size: int = CATALOG_BATCH_SIZE,
+        prefetch: int = EMBEDDING_PREFETCH_SHARDS,
+    ) -> None:
+        self.directory = directory
+        self.encoder = encoder
+        self.label = label
+        self.batch_size = batch_size
+        self.shard_size = shard_size
+        self.prefetch = prefetch
+        self.stats = {}
+
+    def run(
+        self,
+        documents: Sequence[dict],
+        key: Callable[[dict], tuple[int, str]],
+        texts: Callable[[dict], list[str]],
+        reuse: dict | None = None,
+    ) -> dict:
+        """Encode every shard that isn't already saved
+
+        Args:
+            documents: Catalog to embed, in order
+            key: (id, content hash) of a document; cheap, read for every shard
+            texts: Texts to embed for a document, one embedding row each
+            reuse: Optional id -> (content hash, normalized embeddings) of rows
+                that are still valid while the document's hash is unchanged
+
+        Returns:
+            Throughput stats, also kept in self.stats
+        """
+        self.__prepare_directory()
+        num_shards = math.ceil(len(documents) / self.shard_size)
+        shards: queue.Queue = queue.Queue(maxsize=max(self.prefetch, 1))
+        stop = threading.Event()
+
+        def offer(item) -> bool:
+            while not stop.is_set():
+                try:
+                    shards.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce() -> None:
+            try:
+                windows = itertools.batched(documents, self.shard_size)
+                for index, window in enumerate(windows):
+                    if not offer(self.__plan_shard(index, window, key, texts, reuse)):
+                        return
+                offer(None)
+            except BaseException as e:
+                offer(e)
+
+        producer = threading.Thread(target=produce, name="embedding-build", daemon=True)
+        start = time.perf_counter()
+        encode_seconds = 0.0
+        encoded = resumed = reused = 0
+        producer.start()
+        try:
+            while (shard := shards.get()) is not None:
+                if isinstance(shard, BaseException):
+                    raise shard
+                if shard["texts"] is None:
+                    resumed += 1
+                    continue
+                shard_start = time.perf_counter()
+                rows = self.__encode_shard(shard)
+                seconds = time.perf_counter() - shard_start
+                self.__save_shard(shard, rows)
+                count = sum(len(t) for t in shard["texts"] if t is not None)
+                encoded += count
+                reused += sum(t is None for t in shard["texts"])
+                encode_seconds += seconds
+                print(
+                    f"Embedded shard {shard['index'] + 1}/{num_shards}: "
+                    f"{count} {self.label} ({count / seconds if seconds else 0:.1f} "
+                    f"{self.label}/s)"
+                )
+        finally:
+            stop.set()
+            producer.join()
+
+        seconds = time.perf_counter() - start
+        self.stats = {
+            "shards": num_shards,
+            "resumed_shards": resumed,
+            "documents": len(documents),
+            "reused_documents": reused,
+            "encoded": encoded,
+            "seconds": seconds,
+            "encode_seconds": encode_seconds,
+            "per_second": encoded / seconds if seconds else 0.0,
+        }
+        return self.stats
+
+    def shards(self, num_documents: int) -> Iterator[dict]:
+        """Saved shards in catalog order, with the rows each document got"""
+        for index in range(math.ceil(num_documents / self.shard_size)):
+            with np.load(self.__shard_path(index)) as data:
+                yield {
+                    "start": index * self.shard_size,
+                    "ids": data["ids"].tolist(),
+                    "hashes": data["hashes"].tolist(),
+                    "counts": data["counts"],
+                    "embeddings": data["embeddings"],
+                }
+
+    def finish(self) -> None:
+        """Drop the shards once the assembled files are written"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __plan_shard(self, index, window, key, texts, reuse) -> dict:
+        ids, hashes = zip(*(key(doc) for doc in window))
+        shard = {"index": index, "ids": list(ids), "hashes": list(hashes), "texts": None}
+        if self.__is_saved(index, shard["ids"], shard["hashes"]):
+            return shard
+
+        # texts[i] is None where document i keeps its reused embeddings.
+        shard["texts"] = []
+        shard["reused"] = {}
+        for i, (doc, doc_id, doc_hash) in enumerate(zip(window, ids, hashes)):
+            if reuse and doc_id in reuse and reuse[doc_id][0] == doc_hash:
+                shard["texts"].append(None)
+                shard["reused"][i] = np.asarray(reuse[doc_id][1], dtype=np.float32)
+            else:
+                shard["texts"].append(texts(doc))
+        return shard
+
+    def __encode_shard(self, shard: dict) -> list[np.ndarray]:
+        """Normalized embeddings of each document's texts, in document order"""
+        # Local import: semantic_search builds on this module.
+        from .semantic_search import normalize_embeddings
+
+        flat = [
+            (i, j, text)
+            for i, doc_texts in enumerate(shard["texts"])
+            if doc_texts is not None
+            for j, text in enumerate(doc_texts)
+        ]
+        flat.sort(key=lambda item: len(item[2]))
+        embedded: dict[tuple[int, int], np.ndarray] = {}
+        if flat:
+            # One call per shard, so an EncoderPool can spread its batches.
+            vectors = self.encoder.encode(
+                [text for _, _, text in flat],
+                batch_size=self.batch_size,
+                show_progress_bar=False,
+            )
+            for (i, j, _), vector in zip(flat, normalize_embeddings(vectors)):
+                embedded[i, j] = vector
+
+        rows = []
+        for i, doc_texts in enumerate(shard["texts"]):
+            if doc_texts is None:
+                rows.append(shard["reused"][i].reshape(-1, shard["reused"][i].shape[-1]))
+            elif doc_texts:
+                rows.append(np.stack([embedded[i, j] for j in range(len(doc_texts))]))
+            else:
+                rows.append(np.empty((0, 0), dtype=np.float32))
+        return rows
+
+    def __save_shard(self, shard: dict, rows: list[np.ndarray]) -> None:
+        nonempty = [r for r in rows if len(r)]
+        embeddings = (
+            np.concatenate(nonempty).astype(np.float32, copy=False)
+            if nonempty
+            else np.empty((0, 0), dtype=np.float32)
+        )
+        path = self.__shard_path(shard["index"])
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                ids=np.array(shard["ids"], dtype=np.int64),
+                hashes=np.array(shard["hashes"], dtype=str),
+                counts=np.array([len(r) for r in rows], dtype=np.int32),
+                embeddings=embeddings,
+            )
+        # A shard only exists once it is whole, so a crash never leaves half of one.
+        os.replace(tmp_path, path)
+
+    def __is_saved(self, index: int, ids: list[int], hashes: list[str]) -> bool:
+        path = self.__shard_path(index)
+        if not os.path.exists(path):
+            return False
+        try:
+            with np.load(path) as data:
+                return data["ids"].tolist() == ids and data["hashes"].tolist() == hashes
+        except (OSError, ValueError, KeyError):
+            return False
+
+    def __prepare_directory(self) -> None:
+        # Shards from another model or shard size can't be reused.
+        meta = {
+            "model": getattr(self.encoder, "model_name", None),
+            "shard_size": self.shard_size,
+        }
+        meta_path = os.path.join(self.directory, BUILD_META_FILE)
+        if os.path.exists(meta_path):
+            try:
+                with open(meta_path, "r") as f:
+                    if json.load(f) == meta:
+                        return
+            except ValueError:
+                pass
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
+        write_json(meta_path, meta)
+
+    def __shard_path(self, index: int) -> str:
+        return os.path.join(self.directory, f"shard_{index:05d}.npz")
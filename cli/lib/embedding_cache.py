@@ -0,0 +1,265 @@
+import fcntl
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .search_utils import (
+    EMBEDDING_CACHE_DIR,
+    EMBEDDING_CACHE_MAX_BYTES,
+    EMBEDDING_CACHE_MEMORY_SIZE,
+)
+
+KEY_SIZE = 16
+# SentenceTransformer.encode arguments that don't change the vectors returned.
+NEUTRAL_ENCODE_KWARGS = frozenset(
+    {"batch_size", "show_progress_bar", "convert_to_numpy", "convert_to_tensor", "device"}
+)
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace, which doesn't change what the tokenizer sees"""
+    return " ".join(text.split())
+
+
+def encode_variant(kwargs: dict) -> str:
+    """Canonical form of the encode arguments that change the vectors"""
+    options = {k: v for k, v in kwargs.items() if k not in NEUTRAL_ENCODE_KWARGS}
+    return json.dumps(options, sort_keys=True, default=repr) if options else ""
+
+
+class EmbeddingCache:
+    """Content-addressed embedding cache for one model
+
+    Embeddings are keyed by a hash of the model name, the normalized text and
+    the encode options that change the vector (see encode_variant). Recently
+    used vectors are kept in an in-memory LRU. Every vector is also appended
+    to <directory>/<model>.bin as fixed-size (key, float32 vector) records,
+    so other processes and later runs skip the model as well.
+
+    Writers take <model>.lock, drop any partial record a crashed writer left
+    before appending, and once the file would pass `max_disk_bytes` replace
+    it with its newest records up to half that size.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        directory: str = EMBEDDING_CACHE_DIR,
+        memory_size: int = EMBEDDING_CACHE_MEMORY_SIZE,
+        max_disk_bytes: int = EMBEDDING_CACHE_MAX_BYTES,
+    ) -> None:
+        self.model_name = model_name
+        self.memory_size = memory_size
+        self.max_disk_bytes = max_disk_bytes
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+        self.path = os.path.join(directory, f"{safe_name}.bin")
+        self.meta_path = os.path.join(directory, f"{safe_name}.json")
+        self.lock_path = os.path.join(directory, f"{safe_name}.lock")
+        self.memory: OrderedDict[bytes, np.ndarray] = OrderedDict()
+        self.lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self.dim: int | None = None
+        self.records: np.ndarray | None = None
+        self.rows: dict[bytes, int] = {}
+        self.disk_size = 0
+        self.disk_inode: int | None = None
+
+    def key(self, text: str, variant: str = "") -> bytes:
+        data = f"{self.model_name}\0{normalize_text(text)}"
+        if variant:
+            data += f"\0{variant}"
+        return hashlib.blake2b(data.encode("utf-8"), digest_size=KEY_SIZE).digest()
+
+    def get(self, text: str, variant: str = "") -> np.ndarray | None:
+        with self.lock:
+            return self.__get(self.key(text, variant))
+
+    def put(self, text: str, embedding: np.ndarray, variant: str = "") -> None:
+        self.put_many([text], [embedding], variant)
+
+    def get_many(self, texts: list[str], variant: str = "") -> list[np.ndarray | None]:
+        with self.lock:
+            return [self.__get(self.key(text, variant)) for text in texts]
+
+    def put_many(self, texts: list[str], embeddings, variant: str = "") -> None:
+        if not texts:
+            return
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        with self.lock:
+            keys = [self.key(text, variant) for text in texts]
+            for key, embedding in zip(keys, embeddings):
+                self.__remember(key, embedding)
+            self.__append(keys, embeddings)
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+    def reset_stats(self) -> None:
+        self.memory_hits = self.disk_hits = self.misses = 0
+
+    def __get(self, key: bytes) -> np.ndarray | None:
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.memory_hits += 1
+            return self.memory[key]
+
+        row = self.rows.get(key)
+        if row is None and self.__refresh():
+            row = self.rows.get(key)
+        if row is None:
+            self.misses += 1
+            return None
+        self.disk_hits += 1
+        embedding = np.array(self.records[row]["embedding"])
+        self.__remember(key, embedding)
+        return embedding
+
+    def __remember(self, key: bytes, embedding: np.ndarray) -> None:
+        if self.memory_size <= 0:
+            return
+        self.memory[key] = embedding
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def __record_dtype(self) -> np.dtype:
+        return np.dtype([("key", f"S{KEY_SIZE}"), ("embedding", "<f4", (self.dim,))])
+
+    def __refresh(self) -> bool:
+        """Map records appended since the last look; True if there were any"""
+        if self.dim is None:
+            if not os.path.exists(self.meta_path):
+                return False
+            with open(self.meta_path, "r") as f:
+                self.dim = json.load(f)["dim"]
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        if stat.st_ino != self.disk_inode:
+            # The file was shrunk into a new one, so every row moved.
+            self.rows = {}
+            self.disk_size = 0
+            self.disk_inode = stat.st_ino
+        size = stat.st_size
+        record_dtype = self.__record_dtype()
+        # A record still being written by another process is ignored for now.
+        count = size // record_dtype.itemsize
+        if count * record_dtype.itemsize <= self.disk_size:
+            return False
+        self.records = np.memmap(self.path, dtype=record_dtype, mode="r", shape=(count,))
+        start = self.disk_size // record_dtype.itemsize
+        for row, key in enumerate(self.records["key"][start:].tolist(), start):
+            # Keys are fixed-width bytes; numpy strips trailing NULs.
+            self.rows.setdefault(key.ljust(KEY_SIZE, b"\0"), row)
+        self.disk_size = count * record_dtype.itemsize
+        return True
+
+    def __append(self, keys: list[bytes], embeddings: np.ndarray) -> None:
+        if embeddings.ndim != 2:
+            return
+        if self.dim is None:
+            self.__refresh()
+        if self.dim is None:
+            self.dim = embeddings.shape[1]
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.meta_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"model": self.model_name, "dim": self.dim}, f)
+            os.replace(tmp_path, self.meta_path)
+        if embeddings.shape[1] != self.dim:
+            return
+
+        records = np.empty(len(keys), dtype=self.__record_dtype())
+        records["key"] = keys
+        records["embedding"] = embeddings
+        with open(self.lock_path, "a") as lock:
+            # Writers take turns, so a partial record can only be a crashed
+            # writer's, and cutting it off keeps later records aligned.
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                size = os.path.getsize(self.path)
+            except FileNotFoundError:
+                size = 0
+            whole = size - size % records.itemsize
+            if whole + records.nbytes > self.max_disk_bytes:
+                self.__shrink(whole, records)
+                return
+            with open(self.path, "ab") as f:
+                if whole != size:
+                    f.truncate(whole)
+                f.write(records.tobytes())
+
+    def __shrink(self, size: int, records: np.ndarray) -> None:
+        """Replace the file with its newest records, and `records`, in half the limit"""
+        if size:
+            old = np.memmap(
+                self.path, dtype=records.dtype, mode="r", shape=(size // records.itemsize,)
+            )
+            records = np.concatenate([old, records])
+        # Keep each key's last record; the newest come last in the file.
+        _, last = np.unique(records["key"][::-1], return_index=True)
+        keep = np.sort(len(records) - 1 - last)
+        limit = self.max_disk_bytes // 2 // records.itemsize
+        keep = keep[max(len(keep) - limit, 0) :]
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(records[keep].tobytes())
+        os.replace(tmp_path, self.path)
+
+
+class CachedEncoder:
+    """Wraps a SentenceTransformer so text encodes go through an EmbeddingCache
+
+    encode() takes the same arguments and returns the same shapes as
+    SentenceTransformer.encode; options such as normalize_embeddings are part
+    of the cache key. Inputs that aren't text, such as images, are
+    passed straight to the model.
+    """
+
+    def __init__(self, model, model_name: str, cache: EmbeddingCache | None = None):
+        self.model = model
+        self.model_name = model_name
+        self.cache = cache or EmbeddingCache(model_name)
+
+    def encode(self, sentences, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not all(isinstance(text, str) for text in texts):
+            return self.model.encode(sentences, **kwargs)
+
+        variant = encode_variant(kwargs)
+        embeddings = self.cache.get_many(texts, variant)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            # Encode each distinct text once even if the batch repeats it.
+            unique = list(dict.fromkeys(texts[i] for i in missing))
+            if len(unique) == 1:
+                kwargs["show_progress_bar"] = False
+            encoded = np.asarray(self.model.encode(unique, **kwargs), dtype=np.float32)
+            self.cache.put_many(unique, encoded, variant)
+            by_text = dict(zip(unique, encoded))
+            for i in missing:
+                embeddings[i] = by_text[texts[i]]
+
+        if not embeddings:
+            return np.empty((0, self.cache.dim or 0), dtype=np.float32)
+        result = np.stack(embeddings)
+        return result[0] if single else result
+
+    def stats(self) -> dict:
+        return self.cache.stats()
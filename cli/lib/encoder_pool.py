@@ -0,0 +1,120 @@
+import contextlib
+import os
+from collections.abc import Iterator
+
+import numpy as np
+
+from .embedding_cache import CachedEncoder
+from .search_utils import EMBEDDING_BATCH_SIZE, ENCODE_WORKERS_ENV
+
+# Set in each worker process by its initializer.
+_worker_model = None
+_worker_barrier = None
+
+
+def _init_worker(model_name: str, threads: int, barrier) -> None:
+    global _worker_model, _worker_barrier
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    # Workers share the cores; without a cap each would start one thread per core.
+    torch.set_num_threads(threads)
+    _worker_model = SentenceTransformer(model_name, device="cpu")
+    _worker_barrier = barrier
+
+
+def _encode_batch(texts: list[str], batch_size: int, kwargs: dict) -> np.ndarray:
+    embeddings = _worker_model.encode(
+        texts, batch_size=batch_size, show_progress_bar=False, **kwargs
+    )
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def _wait_for_workers() -> int:
+    _worker_barrier.wait()
+    return os.getpid()
+
+
+class EncoderPool:
+    """SentenceTransformer text encoding spread over worker processes
+
+    Each worker loads `model_name` once and runs torch with `threads` threads,
+    by default an even share of the cores. encode() takes the arguments of
+    SentenceTransformer.encode and sends each batch_size slice of the texts,
+    in the order given, to the next free worker, so callers that sort texts
+    by length keep similar lengths in a batch. The pool can stand in for
+    the model in a CachedEncoder.
+
+    Workers are spawned rather than forked, since a forked copy of a process
+    that has already run torch can deadlock in its thread pool.
+    """
+
+    def __init__(
+        self, model_name: str, workers: int, threads: int | None = None
+    ) -> None:
+        self.model_name = model_name
+        self.workers = workers
+        self.threads = threads or max(1, (os.cpu_count() or 1) // workers)
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        context = multiprocessing.get_context("spawn")
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(model_name, self.threads, context.Barrier(workers)),
+        )
+
+    def warm_up(self) -> int:
+        """Start every worker and load its model; returns the workers started"""
+        # Workers spawn on demand while none is idle. Each task holds its
+        # worker at the barrier until all have loaded, so every task lands
+        # on a different worker.
+        futures = [self.executor.submit(_wait_for_workers) for _ in range(self.workers)]
+        return len({future.result() for future in futures})
+
+    def encode(
+        self, sentences, batch_size: int = EMBEDDING_BATCH_SIZE, **kwargs
+    ) -> np.ndarray:
+        kwargs.pop("show_progress_bar", None)
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        batches = [
+            texts[start : start + batch_size]
+            for start in range(0, len(texts), batch_size)
+        ]
+        futures = [
+            self.executor.submit(_encode_batch, batch, batch_size, kwargs)
+            for batch in batches
+        ]
+        results = [future.result() for future in futures]
+        if not results:
+            return np.empty((0, 0), dtype=np.float32)
+        embeddings = np.concatenate(results)
+        return embeddings[0] if single else embeddings
+
+    def close(self) -> None:
+        self.executor.shutdown()
+
+    def __enter__(self) -> "EncoderPool":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def default_encode_workers() -> int:
+    """Worker processes for embedding builds, from ENCODE_WORKERS_ENV (default 1)"""
+    value = os.environ.get(ENCODE_WORKERS_ENV, "").strip()
+    return max(1, int(value)) if value else 1
+
+
+@contextlib.contextmanager
+def pooled_encoder(encoder: CachedEncoder, workers: int) -> Iterator[CachedEncoder]:
+    """`encoder` itself, or with more than one worker, the same cache over a pool"""
+    if workers <= 1:
+        yield encoder
+        return
+    with EncoderPool(encoder.model_name, workers) as pool:
+        yield CachedEncoder(pool, encoder.model_name, encoder.cache)
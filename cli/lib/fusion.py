@@ -0,0 +1,209 @@
+from typing import Callable
+
+import numpy as np
+
+from .search_utils import DEFAULT_K, FUSION_METHODS
+from .semantic_search import top_k_indices
+
+
+class RankedList:
+    """One retriever's scores over every document, read in rank order on demand
+
+    scores holds a score per document index, -inf where the retriever didn't
+    return the document. Only the best `max_depth` documents belong to the
+    list, as if the retriever had been asked for that many results. Ties
+    rank in index order, like top_k_indices.
+    """
+
+    def __init__(self, scores: np.ndarray, max_depth: int) -> None:
+        self.scores = np.asarray(scores, dtype=np.float64)
+        self.size = min(int(np.count_nonzero(np.isfinite(self.scores))), max_depth)
+        self.order = np.empty(0, dtype=np.int64)
+        self.rank_of: np.ndarray | None = None
+
+    def top(self, depth: int) -> np.ndarray:
+        """Document indices of the first `depth` ranks"""
+        depth = min(depth, self.size)
+        if depth > len(self.order):
+            self.order = top_k_indices(self.scores, depth)
+        return self.order[:depth]
+
+    def score_at(self, rank: int) -> float | None:
+        """Score at a 1-based rank, None past the end of the list"""
+        if rank < 1 or rank > self.size:
+            return None
+        return float(self.scores[self.top(rank)[rank - 1]])
+
+    def ranks(self, docs: np.ndarray) -> np.ndarray:
+        """1-based rank of each document, 0 where it isn't in the list"""
+        if self.rank_of is None:
+            # Ranked once per list; every deepening pass then only indexes it.
+            self.rank_of = np.zeros(len(self.scores), dtype=np.int64)
+            self.rank_of[self.top(self.size)] = np.arange(1, self.size + 1)
+        return self.rank_of[docs]
+
+
+# contribution(list, docs, ranks) scores documents for one list; bound(list, rank)
+# is the most any document at that rank or lower can get from it.
+Contribution = Callable[[RankedList, np.ndarray, np.ndarray], np.ndarray]
+Bound = Callable[[RankedList, int], float]
+
+
+def rrf_fusion(k: int) -> tuple[Contribution, Bound]:
+    """Reciprocal rank fusion, 1 / (k + rank) per list"""
+
+    def contribution(ranked: RankedList, docs: np.ndarray, ranks: np.ndarray):
+        return np.where(ranks > 0, 1 / (k + np.maximum(ranks, 1)), 0.0)
+
+    def bound(ranked: RankedList, rank: int) -> float:
+        return 1 / (k + rank) if rank <= ranked.size else 0.0
+
+    return contribution, bound
+
+
+def min_max_fusion() -> tuple[Contribution, Bound]:
+    """Scores min-max normalized over each list, 0 for documents not in it"""
+
+    def normalize(ranked: RankedList, scores):
+        top, bottom = ranked.score_at(1), ranked.score_at(ranked.size)
+        if top == bottom:
+            return np.ones_like(scores)
+        return (scores - bottom) / (top - bottom)
+
+    def contribution(ranked: RankedList, docs: np.ndarray, ranks: np.ndarray):
+        if ranked.size == 0:
+            return np.zeros(len(docs))
+        return np.where(ranks > 0, normalize(ranked, ranked.scores[docs]), 0.0)
+
+    def bound(ranked: RankedList, rank: int) -> float:
+        score = ranked.score_at(rank)
+        return 0.0 if score is None else float(normalize(ranked, np.float64(score)))
+
+    return contribution, bound
+
+
+def fuse(
+    lists: list[RankedList],
+    fusion: tuple[Contribution, Bound],
+    limit: int,
+    weights: list[float] | None = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Top `limit` documents by the weighted sum of each list's contribution
+
+    The lists are read to a growing depth, threshold-algorithm style: every
+    document seen so far is scored exactly, and reading stops once the
+    limit-th best score beats the most a document below that depth in every
+    list could get.
+
+    Returns:
+        (doc indices, fused scores, contributions, ranks); contributions and
+        ranks have one row per list and one column per returned document
+    """
+    weights = np.ones(len(lists)) if weights is None else np.asarray(weights)
+    contribution, bound = fusion
+    max_size = max((ranked.size for ranked in lists), default=0)
+    depth = 2 * limit
+
+    while True:
+        seen = np.unique(np.concatenate([ranked.top(depth) for ranked in lists]))
+        ranks = np.stack([ranked.ranks(seen) for ranked in lists])
+        contributions = np.stack(
+            [contribution(ranked, seen, r) for ranked, r in zip(lists, ranks)]
+        )
+        fused = weights @ contributions
+        if depth >= max_size or limit <= 0:
+            break
+        if len(seen) >= limit:
+            kth = np.partition(fused, len(seen) - limit)[len(seen) - limit]
+            unseen = sum(w * bound(ranked, depth + 1) for w, ranked in zip(weights, lists))
+            if kth > unseen:
+                break
+        depth *= 2
+
+    # Ties go to the document ranked higher in the first list, then the next.
+    missing = np.iinfo(np.int64).max
+    tie_keys = [np.where(r > 0, r, missing) for r in ranks[::-1]]
+    order = np.lexsort(tie_keys + [-fused])[:limit]
+    return seen[order], fused[order], contributions[:, order], ranks[:, order]
+
+
+def min_max_normalize(scores: np.ndarray) -> np.ndarray:
+    """Scale each row to [0, 1] over its retrieved documents
+
+    scores is a document-aligned vector, or one row per retriever, with -inf
+    (or nan) for documents a retriever didn't return; those score 0. A row
+    whose retrieved scores are all equal scores 1.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    present = np.isfinite(scores)
+    low = np.where(present, scores, np.inf).min(axis=-1, keepdims=True)
+    high = np.where(present, scores, -np.inf).max(axis=-1, keepdims=True)
+    with np.errstate(all="ignore"):
+        normalized = np.where(high > low, (scores - low) / (high - low), 1.0)
+    return np.where(present, normalized, 0.0)
+
+
+def z_score_normalize(scores: np.ndarray) -> np.ndarray:
+    """Standardize each row over its retrieved documents
+
+    Documents a retriever didn't return get the row's lowest z-score, so
+    they never outrank one it did return. A constant row scores 0.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    present = np.isfinite(scores)
+    values = np.where(present, scores, 0.0)
+    count = np.maximum(present.sum(axis=-1, keepdims=True), 1)
+    mean = values.sum(axis=-1, keepdims=True) / count
+    deviation = np.where(present, scores - mean, 0.0)
+    std = np.sqrt((deviation**2).sum(axis=-1, keepdims=True) / count)
+    with np.errstate(all="ignore"):
+        z = np.where(std > 0, deviation / std, 0.0)
+    floor = np.where(present, z, np.inf).min(axis=-1, keepdims=True)
+    return np.where(present, z, np.where(np.isfinite(floor), floor, 0.0))
+
+
+def rrf_normalize(scores: np.ndarray, k: int = DEFAULT_K) -> np.ndarray:
+    """1 / (k + rank) of each retrieved document, 0 for the rest
+
+    Ranks follow descending score, ties in index order, as in top_k_indices.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    present = np.isfinite(scores)
+    order = np.argsort(np.where(present, -scores, np.inf), axis=-1, kind="stable")
+    ranks = np.empty_like(order)
+    np.put_along_axis(
+        ranks, order, np.arange(1, scores.shape[-1] + 1) + np.zeros_like(order), axis=-1
+    )
+    return np.where(present, 1 / (k + ranks), 0.0)
+
+
+def fuse_scores(
+    scores: np.ndarray,
+    method: str = "rrf",
+    weights: list[float] | None = None,
+    k: int = DEFAULT_K,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Fuse any number of retrievers' document-aligned score vectors
+
+    Args:
+        scores: (retrievers, documents) scores, -inf where not retrieved
+        method: One of FUSION_METHODS, applied to each retriever's row
+        weights: Weight per retriever, 1 each by default
+        k: RRF constant
+
+    Returns:
+        (fused score per document, normalized scores per retriever)
+    """
+    scores = np.atleast_2d(np.asarray(scores, dtype=np.float64))
+    if method == "min_max":
+        normalized = min_max_normalize(scores)
+    elif method == "z_score":
+        normalized = z_score_normalize(scores)
+    elif method == "rrf":
+        normalized = rrf_normalize(scores, k)
+    else:
+        raise ValueError(
+            f"unknown fusion method {method!r}, expected one of {FUSION_METHODS}"
+        )
+    weights = np.ones(len(scores)) if weights is None else np.asarray(weights)
+    return weights @ normalized, normalized
@@ -1,120 +1,136 @@
 import os
-import time
 import json
 
+import numpy as np
 from dotenv import load_dotenv
-from google import genai
-from sentence_transformers import CrossEncoder
-
 
+from .fusion import (
+    RankedList,
+    fuse,
+    fuse_scores,
+    min_max_fusion,
+    min_max_normalize,
+    rrf_fusion,
+)
 from .keyword_search import InvertedIndex
 from .search_utils import (
     DEFAULT_ALPHA,
     DEFAULT_K,
     DEFAULT_SEARCH_LIMIT,
+    DOCUMENT_PREVIEW_LENGTH,
+    HYBRID_CANDIDATE_MULTIPLIER,
     format_search_result,
-    load_movies,
 )
+from .search_client import call_search_service
 from .semantic_search import ChunkedSemanticSearch
 
 load_dotenv()
 
 
 class HybridSearch:
-    def __init__(self, documents: list[dict]) -> None:
+    def __init__(
+        self,
+        documents: list[dict],
+        semantic_search: ChunkedSemanticSearch | None = None,
+        idx: InvertedIndex | None = None,
+    ) -> None:
         self.documents = documents
-        self.semantic_search = ChunkedSemanticSearch()
+        self.semantic_search = semantic_search or ChunkedSemanticSearch()
         self.semantic_search.load_or_create_chunk_embeddings(documents)
 
-        self.idx = InvertedIndex()
+        self.idx = idx or InvertedIndex()
         if not os.path.exists(self.idx.index_path):
             self.idx.build()
             self.idx.save()
 
+        self.doc_positions = {doc["id"]: i for i, doc in enumerate(documents)}
+
     def _bm25_search(self, query: str, limit: int = DEFAULT_SEARCH_LIMIT) -> list[dict]:
-        self.idx.load()
+        # Loaded once, and reloaded only when the index files are rebuilt.
+        self.idx.ensure_loaded()
         return self.idx.bm25_search(query, limit)
 
     def weighted_search(self, query: str, alpha: float, limit: int = 5) -> list[dict]:
-        bm25_results = self._bm25_search(query, limit * 500)
-        semantic_results = self.semantic_search.search_chunks(query, limit * 500)
-
-        combined = combine_search_results(
-            bm25_results,
-            semantic_results,
-            alpha,
-        )
-        return combined[:limit]
+        return self.weighted_search_many([query], alpha, limit)[0]
 
     def rrf_search(self, query: str, k: int, limit: int = 10) -> list[dict]:
-        bm25_results = self._bm25_search(query, limit * 500)
-        semantic_results = self.semantic_search.search_chunks(
-            query,
-            limit * 500,
-        )
-
-        combined = combine_rrf_search_results(
-            bm25_results,
-            semantic_results,
-            k,
-        )
-        return combined[:limit]
+        return self.rrf_search_many([query], k, limit)[0]
+
+    def weighted_search_many(
+        self, queries: list[str], alpha: float, limit: int = 5
+    ) -> list[list[dict]]:
+        """weighted_search for a batch of queries, one result list per query"""
+        return self.__fuse_many(queries, min_max_fusion(), limit, [alpha, 1 - alpha])
+
+    def rrf_search_many(
+        self, queries: list[str], k: int, limit: int = 10
+    ) -> list[list[dict]]:
+        """rrf_search for a batch of queries, one result list per query"""
+        return self.__fuse_many(queries, rrf_fusion(k), limit)
+
+    def __fuse_many(
+        self, queries: list[str], fusion, limit: int, weights: list[float] | None = None
+    ) -> list[list[dict]]:
+        """Fuse BM25 and chunked semantic scores without building per-candidate dicts
+
+        Both retrievers score into arrays over the documents; fuse() reads
+        them only as deep as the top `limit` need.
+        """
+        depth = limit * HYBRID_CANDIDATE_MULTIPLIER
+        bm25_scores = self.__bm25_score_arrays(queries)
+        semantic_scores = self.semantic_search.movie_scores_many(queries, depth)
+
+        results = []
+        for bm25, semantic in zip(bm25_scores, semantic_scores):
+            lists = [RankedList(bm25, depth), RankedList(semantic, depth)]
+            results.append(self.__fused_results(*fuse(lists, fusion, limit, weights)))
+        return results
+
+    def __bm25_score_arrays(self, queries: list[str]) -> np.ndarray:
+        self.idx.ensure_loaded()
+        scores = np.full((len(queries), len(self.documents)), -np.inf)
+        for row, doc_scores in zip(scores, self.idx.bm25_scores_many(queries)):
+            for doc_id, score in doc_scores.items():
+                position = self.doc_positions.get(doc_id)
+                if position is not None:
+                    row[position] = score
+        return scores
+
+    def __fused_results(self, docs, scores, contributions, ranks) -> list[dict]:
+        results = []
+        for i, doc_idx in enumerate(docs):
+            doc = self.documents[doc_idx]
+            # BM25 results carry the full description, chunk results a preview.
+            document = doc["description"]
+            if ranks[0, i] == 0:
+                document = document[:DOCUMENT_PREVIEW_LENGTH]
+            results.append(
+                format_search_result(
+                    doc_id=doc["id"],
+                    title=doc["title"],
+                    document=document,
+                    score=float(scores[i]),
+                    bm25_score=float(contributions[0, i]),
+                    semantic_score=float(contributions[1, i]),
+                )
+            )
+        return results
 
 
 def rank_search_results(results: list[dict], k: int = DEFAULT_K) -> list[dict]:
-    scores: list[int] = []
-    for rank, result in enumerate(results, 1):
-        scores.append(rrf_score(rank, k))
-
-    for i, result in enumerate(results):
-        result["rrf_score"] = scores[i]
-
-    return results
+    """Copies of the results with the RRF score of their position"""
+    scores = 1 / (k + np.arange(1, len(results) + 1))
+    return [
+        {**result, "rrf_score": float(score)} for result, score in zip(results, scores)
+    ]
 
 
 def combine_rrf_search_results(
     bm25_results: list[dict], semantic_results: list[dict], k: int = DEFAULT_K
 ) -> list[dict]:
-    bm25_ranked = rank_search_results(bm25_results, k)
-    semantic_ranked = rank_search_results(semantic_results, k)
-
-    combined_scores = {}
-
-    for result in bm25_ranked:
-        doc_id = result["id"]
-        if doc_id not in combined_scores:
-            combined_scores[doc_id] = {
-                "title": result["title"],
-                "document": result["document"],
-                "bm25_rank": result["rrf_score"],
-                "semantic_rank": 0.0,
-            }
-    for result in semantic_ranked:
-        doc_id = result["id"]
-        if doc_id not in combined_scores:
-            combined_scores[doc_id] = {
-                "title": result["title"],
-                "document": result["document"],
-                "bm25_rank": 0.0,
-                "semantic_rank": result["rrf_score"],
-            }
-        else:
-            combined_scores[doc_id]["semantic_rank"] = result["rrf_score"]
-
-    hybrid_results = []
-    for doc_id, data in combined_scores.items():
-        rank_value = data["bm25_rank"] + data["semantic_rank"]
-        result = format_search_result(
-            doc_id=doc_id,
-            title=data["title"],
-            document=data["document"],
-            score=rank_value,
-            bm25_score=data["bm25_rank"],
-            semantic_score=data["semantic_rank"],
-        )
-        hybrid_results.append(result)
-
-    return sorted(hybrid_results, key=lambda x: x["score"], reverse=True)
+    return _combined_results(
+        [bm25_results, semantic_results], "rrf", k=k, names=["bm25", "semantic"]
+    )
 
 
 def rrf_score(rank: int, k: int = DEFAULT_K):
@@ -124,30 +140,16 @@ def rrf_score(rank: int, k: int = DEFAULT_K):
 def normalize_scores(scores: list[float]) -> list[float]:
     if not scores:
         return []
-
-    min_score = min(scores)
-    max_score = max(scores)
-
-    if max_score == min_score:
-        return [1.0] * len(scores)
-
-    normalized_scores = []
-    for s in scores:
-        normalized_scores.append((s - min_score) / (max_score - min_score))
-
-    return normalized_scores
+    return min_max_normalize(np.array(scores, dtype=np.float64)).tolist()
 
 
 def normalize_search_results(results: list[dict]) -> list[dict]:
-    scores: list[float] = []
-    for result in results:
-        scores.append(result["score"])
-
-    normalized: list[float] = normalize_scores(scores)
-    for i, result in enumerate(results):
-        result["normalized_score"] = normalized[i]
-
-    return results
+    """Copies of the results with their min-max normalized score"""
+    normalized = normalize_scores([result["score"] for result in results])
+    return [
+        {**result, "normalized_score": score}
+        for result, score in zip(results, normalized)
+    ]
 
 
 def hybrid_score(
@@ -161,65 +163,89 @@ def combine_search_results(
     semantic_results: list[dict],
     alpha: float = DEFAULT_ALPHA,
 ) -> list[dict]:
-    bm25_normalized = normalize_search_results(bm25_results)
-    semantic_normalized = normalize_search_results(semantic_results)
-
-    combined_scores = {}
-
-    for result in bm25_normalized:
-        doc_id = result["id"]
-        if doc_id not in combined_scores:
-            combined_scores[doc_id] = {
-                "title": result["title"],
-                "document": result["document"],
-                "bm25_score": 0.0,
-                "semantic_score": 0.0,
-            }
-        if result["normalized_score"] > combined_scores[doc_id]["bm25_score"]:
-            combined_scores[doc_id]["bm25_score"] = result["normalized_score"]
-
-    for result in semantic_normalized:
-        doc_id = result["id"]
-        if doc_id not in combined_scores:
-            combined_scores[doc_id] = {
-                "title": result["title"],
-                "document": result["document"],
-                "bm25_score": 0.0,
-                "semantic_score": 0.0,
-            }
-        if result["normalized_score"] > combined_scores[doc_id]["semantic_score"]:
-            combined_scores[doc_id]["semantic_score"] = result["normalized_score"]
+    return _combined_results(
+        [bm25_results, semantic_results],
+        "min_max",
+        weights=[alpha, 1 - alpha],
+        names=["bm25", "semantic"],
+    )
+
+
+def fuse_search_results(
+    result_lists: list[list[dict]],
+    method: str = "rrf",
+    weights: list[float] | None = None,
+    k: int = DEFAULT_K,
+) -> list[dict]:
+    """Fuse any number of result lists, matching results by id
+
+    Args:
+        result_lists: Each retriever's results, best first
+        method: One of FUSION_METHODS; rrf ranks by list position
+        weights: Weight per list, 1 each by default
+        k: RRF constant
+
+    Returns:
+        Fused results, best first, with each list's normalized score in
+        metadata["scores"]
+    """
+    return _combined_results(result_lists, method, weights, k)
+
+
+def _combined_results(
+    result_lists: list[list[dict]],
+    method: str,
+    weights: list[float] | None = None,
+    k: int = DEFAULT_K,
+    names: list[str] | None = None,
+) -> list[dict]:
+    # The first list a result appears in supplies its title and document.
+    firsts: dict = {}
+    for results in result_lists:
+        for result in results:
+            firsts.setdefault(result["id"], result)
+    positions = {doc_id: i for i, doc_id in enumerate(firsts)}
+
+    scores = np.full((len(result_lists), len(firsts)), -np.inf)
+    for row, results in zip(scores, result_lists):
+        columns = np.array([positions[r["id"]] for r in results], dtype=np.int64)
+        if method == "rrf":
+            values = -np.arange(len(results), dtype=np.float64)
+        else:
+            values = np.array([r["score"] for r in results], dtype=np.float64)
+        np.maximum.at(row, columns, values)
+    fused, normalized = fuse_scores(scores, method, weights, k)
 
     hybrid_results = []
-    for doc_id, data in combined_scores.items():
-        score_value = hybrid_score(
-            data["bm25_score"],
-            data["semantic_score"],
-            alpha,
-        )
-        result = format_search_result(
-            doc_id=doc_id,
-            title=data["title"],
-            document=data["document"],
-            score=score_value,
-            bm25_score=data["bm25_score"],
-            semantic_score=data["semantic_score"],
+    for i, result in enumerate(firsts.values()):
+        if names is None:
+            metadata = {"scores": normalized[:, i].tolist()}
+        else:
+            metadata = {
+                f"{name}_score": float(score)
+                for name, score in zip(names, normalized[:, i])
+            }
+        hybrid_results.append(
+            format_search_result(
+                doc_id=result["id"],
+                title=result["title"],
+                document=result["document"],
+                score=float(fused[i]),
+                **metadata,
+            )
         )
-        hybrid_results.append(result)
-
     return sorted(hybrid_results, key=lambda x: x["score"], reverse=True)
 
 
 def weighted_search_command(
     query: str, alpha: float = DEFAULT_ALPHA, limit: int = DEFAULT_SEARCH_LIMIT
 ) -> dict:
-    movies = load_movies()
-    searcher = HybridSearch(movies)
-
     original_query = query
 
     search_limit = limit
-    results = searcher.weighted_search(query, alpha, search_limit)
+    results = call_search_service(
+        "weighted_search", query=query, alpha=alpha, limit=search_limit
+    )
 
     return {
         "original_query": original_query,
@@ -235,10 +261,8 @@ def rrf_search_command(
     limit: int = DEFAULT_SEARCH_LIMIT,
     enhance: str = "",
     rerank: str = "",
+    rerank_budget_ms: float | None = None,
 ) -> dict:
-    movies = load_movies()
-    searcher = HybridSearch(movies)
-
     original_query = query
     print(f"Original Query: {original_query}")
     if enhance is not None or enhance != "":
@@ -246,10 +270,10 @@ def rrf_search_command(
         print(f"Query after enhancement: {query}")
 
     search_limit = limit
-    if rerank == "individual":
+    if rerank in ("individual", "cross_encoder"):
         search_limit *= 5
 
-    results = searcher.rrf_search(query, k, search_limit)
+    results = call_search_service("rrf_search", query=query, k=k, limit=search_limit)
     print("The results")
     for res in results:
         print(f"Title: {res["title"]}")
@@ -257,11 +281,11 @@ def rrf_search_command(
         print(f"semantic: {res["metadata"]["semantic_score"]:.4f}")
         print(f"keyword: {res["metadata"]["bm25_score"]:.4f}")
     if rerank != "":
-        results = rerank_method(query, results, rerank)
+        results = rerank_method(query, results, rerank, rerank_budget_ms)
         print("The results afte re-ranking")
         for res in results:
             print(f"Title: {res["title"]}")
-            print(f"Score: {res["new_score"]}")
+            print(f"Score: {res.get("new_score")}")
 
     return {
         "original_query": original_query,
@@ -271,11 +295,15 @@ def rrf_search_command(
     }
 
 
-def rerank_method(query: str, documents: list[dict], method: str):
-    api_key = os.environ.get("GEMINI_API_KEY")
-    client = genai.Client(api_key=api_key)
+def rerank_method(
+    query: str, documents: list[dict], method: str, budget_ms: float | None = None
+):
+    from .llm_client import get_llm_client
+
+    llm = get_llm_client()
 
     if method == "individual":
+        prompts = []
         for doc in documents:
             genai_prompt = f"""Rate how well this movie matches the search query.
 
@@ -291,13 +319,11 @@ Rate 0-10 (10 = perfect match).
 Give me ONLY the number in your response, no other text or explanation.
 
 Score:"""
-            print("sleeping for 10 sec")
-            time.sleep(10)
+            prompts.append(genai_prompt)
 
-            response = client.models.generate_content(
-                model="gemini-2.0-flash-001",
-                contents=genai_prompt,
-            )
+        # Scored concurrently; the shared client keeps within the rate limit.
+        responses = llm.generate_many(prompts)
+        for doc, response in zip(documents, responses):
             new_score = response.text.strip()
             doc["new_score"] = new_score
 
@@ -315,10 +341,7 @@ Return ONLY the IDs in order of relevance (best match first). Return a valid JSO
 
 [75, 12, 34, 2, 1]
         """
-        response = client.models.generate_content(
-            model="gemini-2.0-flash-001",
-            contents=genai_prompt,
-        )
+        response = llm.generate(genai_prompt)
         new_rank_order = json.loads(response.text.strip())
         print(documents)
         for doc in documents:
@@ -328,26 +351,13 @@ Return ONLY the IDs in order of relevance (best match first). Return a valid JSO
 
         return sorted(documents, key=lambda x: x["new_score"], reverse=True)
     elif method == "cross_encoder":
-        pairs = []
-        for doc in documents:
-            pairs.append(
-                [
-                    query,
-                    f"{doc.get('title', '')} - {doc.get('description', '')}",
-                ]
-            )
-        cross_encoder = CrossEncoder("cross-encoder/ms-marco-TinyBERT-L2-v2")
-        scores = cross_encoder.predict(pairs)
-        for i, doc in enumerate(documents):
-            doc["new_score"] = scores[i]
-
-        return sorted(documents, key=lambda x: x["new_score"], reverse=True)
+        # Runs where the cross-encoder stays loaded, the search server if one is up.
+        return call_search_service(
+            "rerank", query=query, documents=documents, budget_ms=budget_ms
+        )
 
 
 def update_query(query: str, method: str) -> str:
-    api_key = os.environ.get("GEMINI_API_KEY")
-    client = genai.Client(api_key=api_key)
-
     if method == "" or method is None:
         return query
 
@@ -395,10 +405,9 @@ Examples:
 Query: "{query}"
 """
 
-    response = client.models.generate_content(
-        model="gemini-2.0-flash-001",
-        contents=genai_query,
-    )
+    from .llm_client import get_llm_client
+
+    response = get_llm_client().generate(genai_query)
 
     enhanced_query = response.text.strip()
     print(f"Enhanced query ({method}): '{query}' -> '{enhanced_query}'\n")
@@ -407,8 +416,9 @@ Query: "{query}"
 
 
 def evaluate_results(query: str, results: dict):
-    api_key = os.environ.get("GEMINI_API_KEY")
-    client = genai.Client(api_key=api_key)
+    from .llm_client import get_llm_client
+
+    llm = get_llm_client()
 
     formatted_results = []
     for i, r in enumerate(results, 1):
@@ -435,10 +445,7 @@ Return ONLY the scores in the same order you were given the documents. Return a
 
 [2, 0, 3, 2, 0, 1]"""
 
-    response = client.models.generate_content(
-        model="gemini-2.0-flash-001",
-        contents=genai_query,
-    )
+    response = llm.generate(genai_query)
     rankings = json.loads(response.text.strip())
     for i, res in enumerate(results):
         print(f"{i+1}. {res['title']}: {rankings[i]}/3")
@@ -0,0 +1,378 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections.abc import Mapping
+
+import numpy as np
+
+SEGMENT_VERSION = 2
+
+SEGMENT_META_FILE = "segment.json"
+# Names the live segment directory of an index; see publish_segment().
+SEGMENT_POINTER_FILE = "CURRENT"
+SEGMENT_DIR_PREFIX = "segment_"
+TERMS_FILE = "terms.npy"
+TERM_OFFSETS_FILE = "term_offsets.npy"
+POSTING_DOCS_FILE = "posting_docs.npy"
+POSTING_TFS_FILE = "posting_tfs.npy"
+POSTING_IMPACTS_FILE = "posting_impacts.npy"
+MAX_IMPACTS_FILE = "max_impacts.npy"
+DOC_IDS_FILE = "doc_ids.npy"
+DOC_LENGTHS_FILE = "doc_lengths.npy"
+DOC_HASHES_FILE = "doc_hashes.npy"
+STORED_FIELDS_FILE = "stored_fields.bin"
+STORED_OFFSETS_FILE = "stored_offsets.npy"
+
+
+class IndexSegment:
+    """Read-only, memory-mapped view of an inverted index segment
+
+    Layout (all arrays are .npy files opened with mmap_mode="r"):
+        terms.npy          sorted term dictionary (fixed-width UTF-8 bytes)
+        term_offsets.npy   int64, start of each term's postings (+1 sentinel)
+        posting_docs.npy   int32, delta-encoded doc ordinals per term
+        posting_tfs.npy    int32, term frequency of each posting
+        posting_impacts.npy / max_impacts.npy  optional float32 BM25 impacts
+        doc_ids.npy        int32, sorted document ids (ordinal -> id)
+        doc_lengths.npy    int32, token count per ordinal
+        doc_hashes.npy     content hash per ordinal, for incremental updates
+        stored_fields.bin  concatenated JSON documents, stored_offsets.npy
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        with open(os.path.join(directory, SEGMENT_META_FILE), "r") as f:
+            meta = json.load(f)
+        if meta.get("version") != SEGMENT_VERSION:
+            raise ValueError(
+                f"unsupported index segment version {meta.get('version')}, "
+                f"expected {SEGMENT_VERSION}. Rebuild the index."
+            )
+        self.num_docs: int = meta["num_docs"]
+        self.num_terms: int = meta["num_terms"]
+        self.total_length: int = meta["total_length"]
+        self.has_impacts: bool = meta["has_impacts"]
+
+        self.terms = self._load(TERMS_FILE)
+        self.term_offsets = self._load(TERM_OFFSETS_FILE)
+        self.posting_docs = self._load(POSTING_DOCS_FILE)
+        self.posting_tfs = self._load(POSTING_TFS_FILE)
+        self.doc_ids = self._load(DOC_IDS_FILE)
+        self.doc_lengths = self._load(DOC_LENGTHS_FILE)
+        self.doc_hashes = self._load(DOC_HASHES_FILE)
+        self.stored_offsets = self._load(STORED_OFFSETS_FILE)
+        self.posting_impacts = None
+        self.max_impacts = None
+        if self.has_impacts:
+            self.posting_impacts = self._load(POSTING_IMPACTS_FILE)
+            self.max_impacts = self._load(MAX_IMPACTS_FILE)
+
+        stored_path = os.path.join(directory, STORED_FIELDS_FILE)
+        if os.path.getsize(stored_path) > 0:
+            self.stored_fields = np.memmap(stored_path, dtype=np.uint8, mode="r")
+        else:
+            self.stored_fields = np.empty(0, dtype=np.uint8)
+
+    def _load(self, name: str) -> np.ndarray:
+        return np.load(os.path.join(self.directory, name), mmap_mode="r")
+
+    def term_id(self, term: str) -> int | None:
+        key = term.encode("utf-8")
+        i = int(np.searchsorted(self.terms, key))
+        if i < self.num_terms and self.terms[i] == key:
+            return i
+        return None
+
+    def iter_terms(self):
+        for term in self.terms:
+            yield term.decode("utf-8")
+
+    def iter_postings(self):
+        """Yield (term, doc ids, term frequencies) for every term"""
+        for term_id, term in enumerate(self.iter_terms()):
+            start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+            yield term, self.doc_ids[self.ordinals(term_id)], self.posting_tfs[start:end]
+
+    def doc_freq(self, term: str) -> int:
+        term_id = self.term_id(term)
+        if term_id is None:
+            return 0
+        return int(self.term_offsets[term_id + 1] - self.term_offsets[term_id])
+
+    def ordinals(self, term_id: int) -> np.ndarray:
+        start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+        return np.cumsum(self.posting_docs[start:end], dtype=np.int64)
+
+    def postings(self, term: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return (doc ids, term frequencies, doc lengths) of a term's postings"""
+        term_id = self.term_id(term)
+        if term_id is None:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, empty
+        ordinals = self.ordinals(term_id)
+        start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+        return (
+            self.doc_ids[ordinals],
+            self.posting_tfs[start:end],
+            self.doc_lengths[ordinals],
+        )
+
+    def impacts(self, term: str) -> tuple[np.ndarray, np.ndarray, float] | None:
+        """Return (doc ids, BM25 impacts, max impact) of a term's postings"""
+        if not self.has_impacts:
+            raise ValueError("segment was built without impact postings")
+        term_id = self.term_id(term)
+        if term_id is None:
+            return None
+        start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+        return (
+            self.doc_ids[self.ordinals(term_id)],
+            self.posting_impacts[start:end],
+            float(self.max_impacts[term_id]),
+        )
+
+    def ordinal(self, doc_id: int) -> int | None:
+        i = int(np.searchsorted(self.doc_ids, doc_id))
+        if i < self.num_docs and self.doc_ids[i] == doc_id:
+            return i
+        return None
+
+    def doc_length(self, doc_id: int) -> int:
+        i = self.ordinal(doc_id)
+        return 0 if i is None else int(self.doc_lengths[i])
+
+    def doc_hash(self, doc_id: int) -> str | None:
+        i = self.ordinal(doc_id)
+        return None if i is None else self.doc_hashes[i].decode("ascii")
+
+    def tf(self, doc_id: int, term: str) -> int:
+        term_id = self.term_id(term)
+        i = self.ordinal(doc_id)
+        if term_id is None or i is None:
+            return 0
+        ordinals = self.ordinals(term_id)
+        pos = int(np.searchsorted(ordinals, i))
+        if pos < len(ordinals) and ordinals[pos] == i:
+            return int(self.posting_tfs[self.term_offsets[term_id] + pos])
+        return 0
+
+    def document(self, doc_id: int) -> dict | None:
+        i = self.ordinal(doc_id)
+        if i is None:
+            return None
+        start, end = self.stored_offsets[i], self.stored_offsets[i + 1]
+        return json.loads(self.stored_fields[start:end].tobytes().decode("utf-8"))
+
+    def iter_documents(self):
+        for i in range(self.num_docs):
+            start, end = self.stored_offsets[i], self.stored_offsets[i + 1]
+            yield json.loads(self.stored_fields[start:end].tobytes().decode("utf-8"))
+
+
+def write_segment(
+    directory: str,
+    documents: Mapping[int, dict],
+    doc_lengths: dict[int, int],
+    doc_hashes: dict[int, str],
+    postings: dict[str, list[tuple[int, int]]],
+    impacts: dict[str, tuple[list[int], list[float]]] | None = None,
+) -> None:
+    """Write an index segment
+
+    Args:
+        directory: Segment directory, created if missing
+        documents: Stored fields keyed by document id
+        doc_lengths: Token count keyed by document id
+        doc_hashes: Content hash (hex) keyed by document id
+        postings: term -> [(doc id, term frequency), ...]
+        impacts: Optional term -> (sorted doc ids, BM25 impact per posting)
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    doc_ids = sorted(documents)
+    ordinal_of = {doc_id: i for i, doc_id in enumerate(doc_ids)}
+    terms = sorted(postings, key=lambda t: t.encode("utf-8"))
+
+    term_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    posting_docs, posting_tfs, posting_impacts, max_impacts = [], [], [], []
+    for term_id, term in enumerate(terms):
+        entries = sorted((ordinal_of[doc_id], tf) for doc_id, tf in postings[term])
+        previous = 0
+        for ordinal, tf in entries:
+            posting_docs.append(ordinal - previous)
+            posting_tfs.append(tf)
+            previous = ordinal
+        term_offsets[term_id + 1] = term_offsets[term_id] + len(entries)
+        if impacts is not None:
+            # impacts are stored in doc id order, which is also ordinal order
+            term_impacts = impacts[term][1]
+            posting_impacts.extend(term_impacts)
+            max_impacts.append(max(term_impacts))
+
+    encoded_terms = [t.encode("utf-8") for t in terms]
+    width = max((len(t) for t in encoded_terms), default=1) or 1
+
+    stored_offsets = np.zeros(len(doc_ids) + 1, dtype=np.int64)
+    stored_tmp = os.path.join(directory, STORED_FIELDS_FILE + ".tmp")
+    with open(stored_tmp, "wb") as f:
+        for i, doc_id in enumerate(doc_ids):
+            data = json.dumps(documents[doc_id]).encode("utf-8")
+            f.write(data)
+            stored_offsets[i + 1] = stored_offsets[i] + len(data)
+    os.replace(stored_tmp, os.path.join(directory, STORED_FIELDS_FILE))
+
+    arrays = {
+        TERMS_FILE: np.array(encoded_terms, dtype=f"S{width}"),
+        TERM_OFFSETS_FILE: term_offsets,
+        POSTING_DOCS_FILE: np.array(posting_docs, dtype=np.int32),
+        POSTING_TFS_FILE: np.array(posting_tfs, dtype=np.int32),
+        DOC_IDS_FILE: np.array(doc_ids, dtype=np.int32),
+        DOC_LENGTHS_FILE: np.array(
+            [doc_lengths[doc_id] for doc_id in doc_ids], dtype=np.int32
+        ),
+        DOC_HASHES_FILE: np.array(
+            [doc_hashes[doc_id].encode("ascii") for doc_id in doc_ids], dtype="S32"
+        ),
+        STORED_OFFSETS_FILE: stored_offsets,
+    }
+    if impacts is not None:
+        arrays[POSTING_IMPACTS_FILE] = np.array(posting_impacts, dtype=np.float32)
+        arrays[MAX_IMPACTS_FILE] = np.array(max_impacts, dtype=np.float32)
+    for name, array in arrays.items():
+        save_array(os.path.join(directory, name), array)
+
+    meta = {
+        "version": SEGMENT_VERSION,
+        "num_docs": len(doc_ids),
+        "num_terms": len(terms),
+        "total_length": int(sum(doc_lengths[doc_id] for doc_id in doc_ids)),
+        "has_impacts": impacts is not None,
+    }
+    write_json(os.path.join(directory, SEGMENT_META_FILE), meta)
+
+
+def new_segment_dir(index_dir: str) -> str:
+    """Create an empty, uniquely named directory to write the next segment into"""
+    os.makedirs(index_dir, exist_ok=True)
+    return tempfile.mkdtemp(prefix=SEGMENT_DIR_PREFIX, dir=index_dir)
+
+
+def current_segment(index_dir: str) -> str | None:
+    """Directory of the index's live segment, or None if none was published"""
+    try:
+        with open(os.path.join(index_dir, SEGMENT_POINTER_FILE), "r") as f:
+            return os.path.join(index_dir, json.load(f)["segment"])
+    except FileNotFoundError:
+        return None
+
+
+def publish_segment(
+    index_dir: str, directory: str, meta_file: str = SEGMENT_META_FILE
+) -> None:
+    """Make a fully written segment the live one
+
+    Segments are never modified in place: the pointer file is replaced in a
+    single rename, so a loader sees either the old segment or the new one,
+    never a mix of their arrays. The previous segment is kept for loaders
+    that read the pointer just before the switch; older ones are removed.
+    `meta_file` is the header a segment writes last, marking it finished.
+    """
+    previous = current_segment(index_dir)
+    write_json(
+        os.path.join(index_dir, SEGMENT_POINTER_FILE),
+        {"segment": os.path.basename(directory)},
+    )
+    keep = {os.path.basename(directory), os.path.basename(previous or "")}
+    for name in os.listdir(index_dir):
+        path = os.path.join(index_dir, name)
+        # Segments still being written have no header yet and are left alone.
+        if (
+            name.startswith(SEGMENT_DIR_PREFIX)
+            and name not in keep
+            and os.path.exists(os.path.join(path, meta_file))
+        ):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def save_array(path: str, array: np.ndarray) -> None:
+    # Replace rather than overwrite so processes that still map the old file
+    # keep a valid view of it.
+    tmp_path = _tmp_path(path)
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def write_json(path: str, data: dict) -> None:
+    tmp_path = _tmp_path(path)
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _tmp_path(path: str) -> str:
+    """A temporary name for `path` that no other process or thread writes to"""
+    return f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+
+
+class NpyWriter:
+    """Write a 2-D .npy file block by block, without holding it in memory
+
+    Rows go to a raw temporary file; close() copies them into the .npy in
+    blocks and replaces `path`, so readers never see a partial file.
+    """
+
+    COPY_ROWS = 65536
+
+    def __init__(self, path: str, dtype, width: int | None = None) -> None:
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.width = width
+        self.rows = 0
+        self.raw_path = path + ".rows.tmp"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.raw = open(self.raw_path, "wb")
+
+    def append(self, block: np.ndarray) -> None:
+        block = np.asarray(block, dtype=self.dtype)
+        if len(block) == 0:
+            return
+        block = block.reshape(len(block), -1)
+        if self.width is None:
+            self.width = block.shape[1]
+        elif block.shape[1] != self.width:
+            raise ValueError(f"expected rows of width {self.width}, got {block.shape[1]}")
+        self.raw.write(np.ascontiguousarray(block).tobytes())
+        self.rows += len(block)
+
+    def close(self) -> None:
+        self.raw.close()
+        try:
+            shape = (self.rows, self.width or 0)
+            if self.rows == 0 or not self.width:
+                save_array(self.path, np.empty(shape, dtype=self.dtype))
+                return
+            tmp_path = self.path + ".tmp"
+            out = np.lib.format.open_memmap(
+                tmp_path, mode="w+", dtype=self.dtype, shape=shape
+            )
+            rows = np.memmap(self.raw_path, dtype=self.dtype, mode="r", shape=shape)
+            for start in range(0, self.rows, self.COPY_ROWS):
+                out[start : start + self.COPY_ROWS] = rows[start : start + self.COPY_ROWS]
+            out.flush()
+            del out, rows
+            os.replace(tmp_path, self.path)
+        finally:
+            os.remove(self.raw_path)
+
+    def __enter__(self) -> "NpyWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.raw.close()
+            os.remove(self.raw_path)
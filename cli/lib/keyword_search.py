@@ -1,16 +1,33 @@
+import bisect
+import functools
+import heapq
+import itertools
+import json
 import math
 import os
-import pickle
 import string
-from collections import Counter, defaultdict
-
-from nltk.stem import PorterStemmer
-
+import threading
+from collections import Counter, defaultdict, deque
+from collections.abc import Iterable, Iterator, Mapping
+
+from .doc_store import DocStore
+from .index_segment import (
+    SEGMENT_POINTER_FILE,
+    IndexSegment,
+    current_segment,
+    new_segment_dir,
+    publish_segment,
+    write_segment,
+)
+from .search_client import call_search_service
 from .search_utils import (
     BM25_B,
     BM25_K1,
     CACHE_DIR,
+    CATALOG_BATCH_SIZE,
+    COMPACTION_THRESHOLD,
     DEFAULT_SEARCH_LIMIT,
+    document_hash,
     format_search_result,
     load_movies,
     load_stopwords,
@@ -20,68 +37,468 @@ from .search_utils import (
 class InvertedIndex:
     def __init__(self) -> None:
         self.index = defaultdict(set)
+        # Documents are read from `catalog` after build(); docmap holds the
+        # ones added or replaced since. doc_hashes has every in-memory id.
         self.docmap: dict[int, dict] = {}
-        self.index_path = os.path.join(CACHE_DIR, "index.pkl")
-        self.docmap_path = os.path.join(CACHE_DIR, "docmap.pkl")
-        self.tf_path = os.path.join(CACHE_DIR, "term_frequencies.pkl")
-        self.doc_lengths_path = os.path.join(CACHE_DIR, "doc_lengths.pkl")
+        self.catalog: DocStore | None = None
+        self.index_dir = os.path.join(CACHE_DIR, "index")
+        self.index_path = os.path.join(self.index_dir, SEGMENT_POINTER_FILE)
+        self.update_log_path = os.path.join(self.index_dir, "updates.jsonl")
         self.term_frequencies = defaultdict(Counter)
         self.doc_lengths = {}
-
-    def build(self) -> None:
+        self.doc_hashes: dict[int, str] = {}
+        self.avg_doc_length = 0.0
+        # term -> (sorted doc ids, BM25 contribution of each posting)
+        self.impacts: dict[str, tuple[list[int], list[float]]] | None = None
+        self.max_impacts: dict[str, float] = {}
+        # Set by load(). The in-memory structures above then only hold movies
+        # added or updated since the segment was written, and `deleted` holds
+        # the ids of segment documents that were deleted or replaced.
+        self.segment: IndexSegment | None = None
+        self.deleted: set[int] = set()
+        self.deleted_length = 0
+        self.loaded_version: tuple[int, ...] | None = None
+        self.lock = threading.RLock()
+
+    def build(self, impacts: bool = False, workers: int = 1) -> None:
+        """Build the index from the movie catalog
+
+        With workers > 1 the catalog is split into shards that are analyzed
+        in separate processes, and their partial postings are merged in shard
+        order. The result is identical to a serial build.
+        """
         movies = load_movies()
-        for m in movies:
-            doc_id = m["id"]
-            doc_description = f"{m['title']} {m['description']}"
-            self.docmap[doc_id] = m
-            self.__add_document(doc_id, doc_description)
+        self.catalog = movies
+        shard_size = CATALOG_BATCH_SIZE
+        if workers > 1:
+            shard_size = min(shard_size, -(-len(movies) // (workers * 4)) or 1)
+
+        def shards():
+            for batch in itertools.batched(movies, shard_size):
+                for m in batch:
+                    self.doc_hashes[m["id"]] = document_hash(m)
+                yield [(m["id"], f"{m['title']} {m['description']}") for m in batch]
+
+        if workers > 1 and len(movies) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # Keep a few shards in flight rather than submitting the catalog.
+                pending = deque()
+                for shard in shards():
+                    pending.append(executor.submit(_analyze_shard, shard))
+                    if len(pending) > 2 * workers:
+                        self.__merge_postings(*pending.popleft().result())
+                while pending:
+                    self.__merge_postings(*pending.popleft().result())
+        else:
+            for shard in shards():
+                self.__merge_postings(*_analyze_shard(shard))
+
+        self.avg_doc_length = self.__get_avg_doc_length()
+        if impacts:
+            self.build_impacts()
+
+    def build_impacts(self) -> None:
+        """Precompute each posting's BM25 contribution and per-term upper bounds"""
+        self.impacts = {}
+        self.max_impacts = {}
+        for token, postings in self.index.items():
+            idf = self.__bm25_idf(len(postings))
+            doc_ids = sorted(postings)
+            scores = []
+            for doc_id in doc_ids:
+                tf = self.term_frequencies[doc_id][token]
+                scores.append(self.__bm25_tf(tf, self.doc_lengths[doc_id]) * idf)
+            self.impacts[token] = (doc_ids, scores)
+            self.max_impacts[token] = max(scores)
 
     def save(self) -> None:
-        os.makedirs(CACHE_DIR, exist_ok=True)
-        with open(self.index_path, "wb") as f:
-            pickle.dump(self.index, f)
-        with open(self.docmap_path, "wb") as f:
-            pickle.dump(self.docmap, f)
-        with open(self.tf_path, "wb") as f:
-            pickle.dump(self.term_frequencies, f)
-        with open(self.doc_lengths_path, "wb") as f:
-            pickle.dump(self.doc_lengths, f)
+        if self.segment is not None:
+            self.compact()
+            return
+        postings = {}
+        for token, doc_ids in self.index.items():
+            postings[token] = [
+                (doc_id, self.term_frequencies[doc_id][token]) for doc_id in doc_ids
+            ]
+        segment_dir = new_segment_dir(self.index_dir)
+        write_segment(
+            segment_dir,
+            _Documents(self),
+            self.doc_lengths,
+            self.doc_hashes,
+            postings,
+            self.impacts,
+        )
+        publish_segment(self.index_dir, segment_dir)
+        # A fresh segment already contains every update.
+        if os.path.exists(self.update_log_path):
+            os.remove(self.update_log_path)
 
     def load(self) -> None:
-        with open(self.index_path, "rb") as f:
-            self.index = pickle.load(f)
-        with open(self.docmap_path, "rb") as f:
-            self.docmap = pickle.load(f)
-        with open(self.tf_path, "rb") as f:
-            self.term_frequencies = pickle.load(f)
-        with open(self.doc_lengths_path, "rb") as f:
-            self.doc_lengths = pickle.load(f)
+        with self.lock:
+            version = self.disk_version()
+            segment_dir = current_segment(self.index_dir)
+            if segment_dir is None:
+                raise FileNotFoundError(f"no index segment in {self.index_dir}")
+            self.segment = IndexSegment(segment_dir)
+            self.index = defaultdict(set)
+            self.docmap = {}
+            self.catalog = None
+            self.term_frequencies = defaultdict(Counter)
+            self.doc_lengths = {}
+            self.doc_hashes = {}
+            self.deleted = set()
+            self.deleted_length = 0
+            self.impacts, self.max_impacts = None, {}
+            if os.path.exists(self.update_log_path):
+                with open(self.update_log_path, "r") as f:
+                    for line in f:
+                        self.__apply_update(json.loads(line))
+            self.avg_doc_length = self.__get_avg_doc_length()
+            self.loaded_version = version
+
+    def disk_version(self) -> tuple[int, ...] | None:
+        """Identify the index on disk by its segment header and update log
+
+        save() and compact() switch the segment pointer last, so any rebuild
+        changes the version, and so does every update appended to the log.
+        """
+        try:
+            stat = os.stat(self.index_path)
+        except FileNotFoundError:
+            return None
+        try:
+            log_stat = os.stat(self.update_log_path)
+            log_version = (log_stat.st_size, log_stat.st_mtime_ns)
+        except FileNotFoundError:
+            log_version = (0, 0)
+        return stat.st_mtime_ns, stat.st_ino, *log_version
+
+    def is_stale(self) -> bool:
+        return self.segment is None or self.disk_version() != self.loaded_version
+
+    def ensure_loaded(self) -> None:
+        """Load the segment unless the loaded copy is still current"""
+        if self.is_stale():
+            self.load()
+
+    @property
+    def doc_count(self) -> int:
+        count = len(self.doc_hashes)
+        if self.segment is not None:
+            count += self.segment.num_docs - len(self.deleted)
+        return count
+
+    @property
+    def has_impacts(self) -> bool:
+        if self.segment is not None:
+            # Impacts go stale once corpus statistics change; compact() refreshes them.
+            return self.segment.has_impacts and not self.has_pending_updates
+        return self.impacts is not None
+
+    @property
+    def has_pending_updates(self) -> bool:
+        return bool(self.doc_hashes or self.deleted) and self.segment is not None
+
+    def __in_segment(self, doc_id: int) -> bool:
+        return (
+            self.segment is not None
+            and doc_id not in self.doc_hashes
+            and doc_id not in self.deleted
+            and self.segment.ordinal(doc_id) is not None
+        )
+
+    def get_document(self, doc_id: int) -> dict | None:
+        if doc_id in self.docmap:
+            return self.docmap[doc_id]
+        if self.catalog is not None and doc_id in self.doc_hashes:
+            return self.catalog[self.catalog.index_of(doc_id)]
+        if self.__in_segment(doc_id):
+            return self.segment.document(doc_id)
+        return None
+
+    def get_document_hash(self, doc_id: int) -> str | None:
+        if doc_id in self.doc_hashes:
+            return self.doc_hashes[doc_id]
+        if self.__in_segment(doc_id):
+            return self.segment.doc_hash(doc_id)
+        return None
+
+    def get_doc_ids(self) -> set[int]:
+        doc_ids = set()
+        if self.segment is not None:
+            doc_ids.update(self.segment.doc_ids.tolist())
+            doc_ids.difference_update(self.deleted)
+        # Updated documents are tombstoned in the segment but live in memory.
+        doc_ids.update(self.doc_hashes)
+        return doc_ids
 
     def get_documents(self, term: str) -> list[int]:
-        doc_ids = self.index.get(term, set())
-        return sorted(list(doc_ids))
+        doc_ids, _, _ = self.__postings(term)
+        return sorted(doc_ids)
+
+    def __merge_postings(
+        self, postings: dict[str, list[tuple[int, int]]], doc_lengths: dict[int, int]
+    ) -> None:
+        for token, entries in postings.items():
+            doc_ids = self.index[token]
+            for doc_id, tf in entries:
+                doc_ids.add(doc_id)
+                self.term_frequencies[doc_id][token] = tf
+        self.doc_lengths.update(doc_lengths)
+
+    def upsert_document(self, doc: dict) -> bool:
+        """Add a movie or replace the stored one with the same id
+
+        Returns False without touching the index if the content is unchanged.
+        Once the index is loaded from disk, changes are appended to the update
+        log so other processes see them; compact() folds them into a segment.
+        """
+        update = {"op": "upsert", "doc": doc}
+        with self.lock:
+            if not self.__apply_update(update):
+                return False
+            self.__log_updates([update])
+        return True
+
+    def delete_document(self, doc_id: int) -> bool:
+        update = {"op": "delete", "id": doc_id}
+        with self.lock:
+            if not self.__apply_update(update):
+                return False
+            self.__log_updates([update])
+        return True
+
+    def sync(self, movies: Iterable[dict]) -> dict[str, int]:
+        """Update the index to match a catalog, touching only changed movies"""
+        stats = {"added": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+        with self.lock:
+            updates = []
+            seen = set()
+            for movie in movies:
+                seen.add(movie["id"])
+                existed = self.get_document_hash(movie["id"]) is not None
+                update = {"op": "upsert", "doc": movie}
+                if self.__apply_update(update):
+                    updates.append(update)
+                    stats["updated" if existed else "added"] += 1
+                else:
+                    stats["unchanged"] += 1
+            for doc_id in sorted(self.get_doc_ids() - seen):
+                update = {"op": "delete", "id": doc_id}
+                self.__apply_update(update)
+                updates.append(update)
+                stats["deleted"] += 1
+            self.__log_updates(updates)
+        return stats
+
+    def __apply_update(self, update: dict) -> bool:
+        if update["op"] == "delete":
+            changed = self.__remove_document(update["id"])
+        else:
+            doc = update["doc"]
+            doc_hash = document_hash(doc)
+            if self.get_document_hash(doc["id"]) == doc_hash:
+                return False
+            self.__remove_document(doc["id"])
+            text = f"{doc['title']} {doc['description']}"
+            self.__merge_postings(*_analyze_shard([(doc["id"], text)]))
+            self.docmap[doc["id"]] = doc
+            self.doc_hashes[doc["id"]] = doc_hash
+            changed = True
+        if changed:
+            # Precomputed impacts no longer match the corpus statistics.
+            self.impacts, self.max_impacts = None, {}
+            self.avg_doc_length = self.__get_avg_doc_length()
+        return changed
+
+    def __remove_document(self, doc_id: int) -> bool:
+        if doc_id in self.doc_hashes:
+            for token in self.term_frequencies.pop(doc_id, {}):
+                self.index[token].discard(doc_id)
+                if not self.index[token]:
+                    del self.index[token]
+            self.docmap.pop(doc_id, None)
+            del self.doc_lengths[doc_id]
+            del self.doc_hashes[doc_id]
+            return True
+        if self.__in_segment(doc_id):
+            self.deleted.add(doc_id)
+            self.deleted_length += self.segment.doc_length(doc_id)
+            return True
+        return False
+
+    def __log_updates(self, updates: list[dict]) -> None:
+        if self.segment is None or not updates:
+            return
+        was_current = self.disk_version() == self.loaded_version
+        with open(self.update_log_path, "a") as f:
+            for update in updates:
+                f.write(json.dumps(update) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        if was_current:
+            self.loaded_version = self.disk_version()
+
+    def needs_compaction(self, threshold: float = COMPACTION_THRESHOLD) -> bool:
+        """Whether pending updates exceed a fraction of the segment's documents"""
+        if self.segment is None:
+            return False
+        pending = len(self.doc_hashes) + len(self.deleted)
+        return pending > threshold * max(self.segment.num_docs, 1)
+
+    def compact(self) -> None:
+        """Fold the update log into a fresh segment
+
+        Searches keep using the current segment while the new one is written
+        to its own directory, and switch over once it is complete.
+        Updates that arrive meanwhile stay in the log and are replayed on top
+        of the new segment.
+        """
+        with self.lock:
+            if self.segment is None:
+                raise ValueError("No index loaded. Call load() before compacting.")
+            merged = self.__materialize()
+            log_offset = (
+                os.path.getsize(self.update_log_path)
+                if os.path.exists(self.update_log_path)
+                else 0
+            )
 
-    def __add_document(self, doc_id: int, text: str) -> None:
-        tokens = tokenize_text(text)
-        for token in set(tokens):
-            self.index[token].add(doc_id)
-        self.term_frequencies[doc_id].update(tokens)
-        self.doc_lengths[doc_id] = len(tokens)
+        postings = {}
+        for token, doc_ids in merged.index.items():
+            postings[token] = [
+                (doc_id, merged.term_frequencies[doc_id][token]) for doc_id in doc_ids
+            ]
+        segment_dir = new_segment_dir(self.index_dir)
+        write_segment(
+            segment_dir,
+            merged.docmap,
+            merged.doc_lengths,
+            merged.doc_hashes,
+            postings,
+            merged.impacts,
+        )
+
+        with self.lock:
+            # Until the log is trimmed below, a loader replays updates the new
+            # segment already holds; replayed in order they end in the same state.
+            publish_segment(self.index_dir, segment_dir)
+            remaining = b""
+            if os.path.exists(self.update_log_path):
+                with open(self.update_log_path, "rb") as f:
+                    f.seek(log_offset)
+                    remaining = f.read()
+            if remaining:
+                tmp_path = self.update_log_path + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(remaining)
+                os.replace(tmp_path, self.update_log_path)
+            elif os.path.exists(self.update_log_path):
+                os.remove(self.update_log_path)
+            self.load()
+
+    def compact_in_background(self) -> threading.Thread:
+        thread = threading.Thread(target=self.compact, name="index-compaction")
+        thread.start()
+        return thread
+
+    def __materialize(self) -> "InvertedIndex":
+        """Copy every live document into a new in-memory index"""
+        merged = InvertedIndex()
+        for doc in self.segment.iter_documents():
+            if doc["id"] not in self.deleted:
+                merged.docmap[doc["id"]] = doc
+                merged.doc_hashes[doc["id"]] = self.segment.doc_hash(doc["id"])
+                merged.doc_lengths[doc["id"]] = self.segment.doc_length(doc["id"])
+        for token, doc_ids, tfs in self.segment.iter_postings():
+            for doc_id, tf in zip(doc_ids.tolist(), tfs.tolist()):
+                if doc_id not in self.deleted:
+                    merged.index[token].add(doc_id)
+                    merged.term_frequencies[doc_id][token] = tf
+        merged.docmap.update(self.docmap)
+        merged.doc_hashes.update(self.doc_hashes)
+        merged.doc_lengths.update(self.doc_lengths)
+        for doc_id, counts in self.term_frequencies.items():
+            for token, tf in counts.items():
+                merged.index[token].add(doc_id)
+                merged.term_frequencies[doc_id][token] = tf
+        merged.avg_doc_length = merged.__get_avg_doc_length()
+        if self.segment.has_impacts:
+            merged.build_impacts()
+        return merged
+
+    def __doc_freq(self, token: str) -> int:
+        if self.segment is not None and not self.deleted:
+            return self.segment.doc_freq(token) + len(self.index.get(token, ()))
+        doc_ids, _, _ = self.__postings(token)
+        return len(doc_ids)
+
+    def __postings(self, token: str) -> tuple[list[int], list[int], list[int]]:
+        """Return (doc ids, term frequencies, doc lengths) of a token's postings"""
+        doc_ids, tfs, lengths = [], [], []
+        if self.segment is not None:
+            seg_doc_ids, seg_tfs, seg_lengths = self.segment.postings(token)
+            doc_ids, tfs, lengths = (
+                seg_doc_ids.tolist(),
+                seg_tfs.tolist(),
+                seg_lengths.tolist(),
+            )
+            if self.deleted:
+                live = [
+                    i for i, doc_id in enumerate(doc_ids) if doc_id not in self.deleted
+                ]
+                doc_ids = [doc_ids[i] for i in live]
+                tfs = [tfs[i] for i in live]
+                lengths = [lengths[i] for i in live]
+        for doc_id in self.index.get(token, ()):
+            doc_ids.append(doc_id)
+            tfs.append(self.term_frequencies[doc_id][token])
+            lengths.append(self.doc_lengths[doc_id])
+        return doc_ids, tfs, lengths
+
+    def __impact_postings(
+        self, token: str
+    ) -> tuple[list[int], list[float], float] | None:
+        """Return (sorted doc ids, impacts, max impact) of a token's postings"""
+        if self.segment is not None:
+            postings = self.segment.impacts(token)
+            if postings is None:
+                return None
+            doc_ids, impacts, max_impact = postings
+            return doc_ids.tolist(), impacts.tolist(), max_impact
+        if token not in self.impacts:
+            return None
+        doc_ids, impacts = self.impacts[token]
+        return doc_ids, impacts, self.max_impacts[token]
+
+    def __doc_length(self, doc_id: int) -> int:
+        if doc_id in self.doc_lengths:
+            return self.doc_lengths[doc_id]
+        if self.__in_segment(doc_id):
+            return self.segment.doc_length(doc_id)
+        return 0
 
     def get_tf(self, doc_id: int, term: str) -> int:
         tokens = tokenize_text(term)
         if len(tokens) != 1:
             raise ValueError("term must be a single token")
         token = tokens[0]
-        return self.term_frequencies[doc_id][token]
+        if doc_id in self.term_frequencies:
+            return self.term_frequencies[doc_id][token]
+        if self.__in_segment(doc_id):
+            return self.segment.tf(doc_id, token)
+        return 0
 
     def get_idf(self, term: str) -> float:
         tokens = tokenize_text(term)
         if len(tokens) != 1:
             raise ValueError("term must be a single token")
         token = tokens[0]
-        doc_count = len(self.docmap)
-        term_doc_count = len(self.index[token])
+        doc_count = self.doc_count
+        term_doc_count = self.__doc_freq(token)
         return math.log((doc_count + 1) / (term_doc_count + 1))
 
     def get_bm25_idf(self, term: str) -> float:
@@ -89,18 +506,24 @@ class InvertedIndex:
         if len(tokens) != 1:
             raise ValueError("term must be a single token")
         token = tokens[0]
-        doc_count = len(self.docmap)
-        term_doc_count = len(self.index[token]) if token in self.index else 0
-        return math.log((doc_count - term_doc_count + 0.5) / (term_doc_count + 0.5) + 1)
+        return self.__bm25_idf(self.__doc_freq(token))
 
     def get_bm25_tf(
         self, doc_id: int, term: str, k1: float = BM25_K1, b: float = BM25_B
     ) -> float:
         tf = self.get_tf(doc_id, term)
-        doc_length = self.doc_lengths.get(doc_id, 0)
-        avg_doc_length = self.__get_avg_doc_length()
-        if avg_doc_length > 0:
-            length_norm = 1 - b + b * (doc_length / avg_doc_length)
+        doc_length = self.__doc_length(doc_id)
+        return self.__bm25_tf(tf, doc_length, k1, b)
+
+    def __bm25_idf(self, term_doc_count: int) -> float:
+        doc_count = self.doc_count
+        return math.log((doc_count - term_doc_count + 0.5) / (term_doc_count + 0.5) + 1)
+
+    def __bm25_tf(
+        self, tf: int, doc_length: int, k1: float = BM25_K1, b: float = BM25_B
+    ) -> float:
+        if self.avg_doc_length > 0:
+            length_norm = 1 - b + b * (doc_length / self.avg_doc_length)
         else:
             length_norm = 1
         return (tf * (k1 + 1)) / (tf + k1 * length_norm)
@@ -111,33 +534,154 @@ class InvertedIndex:
         return tf * idf
 
     def __get_avg_doc_length(self) -> float:
-        if not self.doc_lengths or len(self.doc_lengths) == 0:
+        doc_count = self.doc_count
+        if doc_count == 0:
             return 0.0
         total_length = 0
         for length in self.doc_lengths.values():
             total_length += length
-        return total_length / len(self.doc_lengths)
+        if self.segment is not None:
+            total_length += self.segment.total_length - self.deleted_length
+        return total_length / doc_count
 
     def bm25(self, doc_id: int, term: str) -> float:
         tf_component = self.get_bm25_tf(doc_id, term)
         idf_component = self.get_bm25_idf(term)
         return tf_component * idf_component
 
+    def bm25_scores(
+        self,
+        query_tokens: list[str],
+        term_impacts: dict[str, tuple[list[int], list[float]]] | None = None,
+    ) -> dict[int, float]:
+        """Score documents term-at-a-time, walking only the query terms' postings
+
+        term_impacts caches each term's (doc ids, BM25 impacts) so a batch of
+        queries reads every distinct term's postings once.
+        """
+        scores: dict[int, float] = defaultdict(float)
+        for token, query_tf in Counter(query_tokens).items():
+            if term_impacts is None:
+                doc_ids, impacts = self.__term_impacts(token)
+            else:
+                if token not in term_impacts:
+                    term_impacts[token] = self.__term_impacts(token)
+                doc_ids, impacts = term_impacts[token]
+            for doc_id, impact in zip(doc_ids, impacts):
+                scores[doc_id] += query_tf * impact
+        return scores
+
+    def __term_impacts(self, token: str) -> tuple[list[int], list[float]]:
+        doc_ids, tfs, lengths = self.__postings(token)
+        if not doc_ids:
+            return [], []
+        idf = self.__bm25_idf(len(doc_ids))
+        impacts = [
+            self.__bm25_tf(tf, doc_length) * idf for tf, doc_length in zip(tfs, lengths)
+        ]
+        return doc_ids, impacts
+
+    def wand_top_k(self, query_tokens: list[str], limit: int) -> list[tuple[int, float]]:
+        """Top-k BM25 over impact postings using WAND early termination
+
+        Documents whose summed per-term upper bounds cannot beat the current
+        heap threshold are skipped without being scored. Requires build_impacts.
+        """
+        if not self.has_impacts:
+            raise ValueError("No impact postings. Build the index with impacts first.")
+        if limit <= 0:
+            return []
+
+        cursors = []
+        for token, query_tf in Counter(query_tokens).items():
+            postings = self.__impact_postings(token)
+            if postings is not None:
+                doc_ids, impacts, max_impact = postings
+                upper_bound = query_tf * max_impact
+                cursors.append(_PostingCursor(doc_ids, impacts, query_tf, upper_bound))
+        # Scores are summed in query term order so they match bm25_scores exactly.
+        term_order = list(cursors)
+
+        heap: list[tuple[float, int]] = []
+        while cursors:
+            threshold = heap[0][0] if len(heap) >= limit else 0.0
+            cursors.sort(key=lambda c: c.doc_id)
+
+            pivot = None
+            upper_bound = 0.0
+            for i, cursor in enumerate(cursors):
+                upper_bound += cursor.upper_bound
+                if upper_bound > threshold:
+                    pivot = i
+                    break
+            if pivot is None:
+                break
+
+            pivot_doc = cursors[pivot].doc_id
+            if cursors[0].doc_id == pivot_doc:
+                score = 0.0
+                for cursor in term_order:
+                    if not cursor.exhausted and cursor.doc_id == pivot_doc:
+                        score += cursor.query_tf * cursor.impact
+                        cursor.advance_to(pivot_doc + 1)
+                if len(heap) < limit:
+                    heapq.heappush(heap, (score, -pivot_doc))
+                elif score > threshold:
+                    heapq.heapreplace(heap, (score, -pivot_doc))
+            else:
+                for cursor in cursors[:pivot]:
+                    cursor.advance_to(pivot_doc)
+            cursors = [c for c in cursors if not c.exhausted]
+
+        return [(-neg_doc_id, score) for score, neg_doc_id in sorted(heap, reverse=True)]
+
     def bm25_search(self, query: str, limit: int = DEFAULT_SEARCH_LIMIT) -> list[dict]:
+        """Top `limit` documents by BM25
+
+        Only documents that contain a query term are returned; documents that
+        would score 0 are not padded in, so a query can return fewer results.
+        """
         query_tokens = tokenize_text(query)
+        with self.lock:
+            if self.has_impacts:
+                top_docs = self.wand_top_k(query_tokens, limit)
+            else:
+                scores = self.bm25_scores(query_tokens)
+                # Ties are broken by the lower doc id so results are deterministic.
+                top_docs = heapq.nlargest(
+                    limit, scores.items(), key=lambda x: (x[1], -x[0])
+                )
+
+            return self.__format_results(top_docs)
+
+    def bm25_search_many(
+        self, queries: list[str], limit: int = DEFAULT_SEARCH_LIMIT
+    ) -> list[list[dict]]:
+        """BM25 search for a batch of queries, one result list per query"""
+        with self.lock:
+            results = []
+            for scores in self.bm25_scores_many(queries):
+                top_docs = heapq.nlargest(
+                    limit, scores.items(), key=lambda x: (x[1], -x[0])
+                )
+                results.append(self.__format_results(top_docs))
+        return results
 
-        scores = {}
-        for doc_id in self.docmap:
-            score = 0.0
-            for token in query_tokens:
-                score += self.bm25(doc_id, token)
-            scores[doc_id] = score
+    def bm25_scores_many(self, queries: list[str]) -> list[dict[int, float]]:
+        """bm25_scores for a batch of queries, one {doc id: score} per query
 
-        sorted_docs = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+        Scores term-at-a-time, computing each distinct term's impacts once for
+        the whole batch, so queries that share terms share posting reads.
+        """
+        query_tokens = get_analyzer().analyze_many(queries)
+        with self.lock:
+            term_impacts = {}
+            return [self.bm25_scores(tokens, term_impacts) for tokens in query_tokens]
 
+    def __format_results(self, top_docs: list[tuple[int, float]]) -> list[dict]:
         results = []
-        for doc_id, score in sorted_docs[:limit]:
-            doc = self.docmap[doc_id]
+        for doc_id, score in top_docs:
+            doc = self.get_document(doc_id)
             formatted_result = format_search_result(
                 doc_id=doc["id"],
                 title=doc["title"],
@@ -145,60 +689,164 @@ class InvertedIndex:
                 score=score,
             )
             results.append(formatted_result)
+        return results
+
+    def search(self, query: str, limit: int = DEFAULT_SEARCH_LIMIT) -> list[dict]:
+        query_tokens = tokenize_text(query)
+        seen, results = set(), []
+        with self.lock:
+            for query_token in query_tokens:
+                matching_doc_ids = self.get_documents(query_token)
+                for doc_id in matching_doc_ids:
+                    if doc_id in seen:
+                        continue
+                    seen.add(doc_id)
+                    doc = self.get_document(doc_id)
+                    if not doc:
+                        continue
+                    results.append(doc)
+                    if len(results) >= limit:
+                        return results
 
         return results
 
 
-def build_command() -> None:
+class _Documents(Mapping):
+    """An index's in-memory documents by id, read on demand rather than copied"""
+
+    def __init__(self, idx: InvertedIndex) -> None:
+        self.idx = idx
+
+    def __getitem__(self, doc_id: int) -> dict:
+        doc = self.idx.get_document(doc_id)
+        if doc is None:
+            raise KeyError(doc_id)
+        return doc
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.idx.doc_hashes)
+
+    def __len__(self) -> int:
+        return len(self.idx.doc_hashes)
+
+
+def _analyze_shard(
+    docs: list[tuple[int, str]],
+) -> tuple[dict[str, list[tuple[int, int]]], dict[int, int]]:
+    """Tokenize (doc id, text) pairs into partial postings and doc lengths"""
+    token_lists = get_analyzer().analyze_many(text for _, text in docs)
+    postings = defaultdict(list)
+    doc_lengths = {}
+    for (doc_id, _), tokens in zip(docs, token_lists):
+        for token, tf in Counter(tokens).items():
+            postings[token].append((doc_id, tf))
+        doc_lengths[doc_id] = len(tokens)
+    return dict(postings), doc_lengths
+
+
+class _PostingCursor:
+    def __init__(
+        self, doc_ids: list[int], impacts: list[float], query_tf: int, upper_bound: float
+    ) -> None:
+        self.doc_ids = doc_ids
+        self.impacts = impacts
+        self.query_tf = query_tf
+        self.upper_bound = upper_bound
+        self.pos = 0
+
+    @property
+    def exhausted(self) -> bool:
+        return self.pos >= len(self.doc_ids)
+
+    @property
+    def doc_id(self) -> int:
+        return self.doc_ids[self.pos]
+
+    @property
+    def impact(self) -> float:
+        return self.impacts[self.pos]
+
+    def advance_to(self, doc_id: int) -> None:
+        self.pos = bisect.bisect_left(self.doc_ids, doc_id, self.pos)
+
+
+def build_command(impacts: bool = False, workers: int = 1) -> None:
     idx = InvertedIndex()
-    idx.build()
+    idx.build(impacts, workers)
     idx.save()
 
 
-def search_command(query: str, limit: int = DEFAULT_SEARCH_LIMIT) -> list[dict]:
+def update_command() -> dict[str, int]:
+    """Apply catalog changes to the saved index without a full rebuild"""
     idx = InvertedIndex()
+    if not os.path.exists(idx.index_path):
+        idx.build()
+        idx.save()
     idx.load()
-    query_tokens = tokenize_text(query)
-    seen, results = set(), []
-    for query_token in query_tokens:
-        matching_doc_ids = idx.get_documents(query_token)
-        for doc_id in matching_doc_ids:
-            if doc_id in seen:
-                continue
-            seen.add(doc_id)
-            doc = idx.docmap[doc_id]
-            if not doc:
-                continue
-            results.append(doc)
-            if len(results) >= limit:
-                return results
-
-    return results
+    stats = idx.sync(load_movies())
+    # The thread is not a daemon, so the process waits for it before exiting.
+    stats["compacting"] = idx.needs_compaction()
+    if stats["compacting"]:
+        idx.compact_in_background()
+    return stats
+
+
+def search_command(query: str, limit: int = DEFAULT_SEARCH_LIMIT) -> list[dict]:
+    return call_search_service("keyword_search", query=query, limit=limit)
+
+
+PUNCTUATION_TABLE = str.maketrans("", "", string.punctuation)
+
+
+class Analyzer:
+    """Lowercases, strips punctuation, drops stopwords and Porter-stems text
+
+    Build one and reuse it: the stopword table is read once and stems are
+    memoized across calls.
+    """
+
+    def __init__(
+        self, stopwords: Iterable[str] | None = None, stem_cache_size: int = 1 << 16
+    ) -> None:
+        if stopwords is None:
+            stopwords = load_stopwords()
+        self.stopwords = frozenset(stopwords)
+        from nltk.stem import PorterStemmer
+
+        self.stemmer = PorterStemmer()
+        self.stem = functools.lru_cache(maxsize=stem_cache_size)(self.stemmer.stem)
+
+    def analyze(self, text: str) -> list[str]:
+        stopwords, stem = self.stopwords, self.stem
+        words = preprocess_text(text).split()
+        return [stem(word) for word in words if word not in stopwords]
+
+    def analyze_many(self, texts: Iterable[str]) -> list[list[str]]:
+        """Analyze a batch of texts, stemming each distinct word only once"""
+        stopwords = self.stopwords
+        word_lists = [
+            [word for word in preprocess_text(text).split() if word not in stopwords]
+            for text in texts
+        ]
+        stems = {}
+        for words in word_lists:
+            for word in words:
+                if word not in stems:
+                    stems[word] = self.stem(word)
+        return [[stems[word] for word in words] for words in word_lists]
+
+
+@functools.cache
+def get_analyzer() -> Analyzer:
+    return Analyzer()
 
 
 def preprocess_text(text: str) -> str:
-    text = text.lower()
-    text = text.translate(str.maketrans("", "", string.punctuation))
-    return text
+    return text.lower().translate(PUNCTUATION_TABLE)
 
 
 def tokenize_text(text: str) -> list[str]:
-    text = preprocess_text(text)
-    tokens = text.split()
-    valid_tokens = []
-    for token in tokens:
-        if token:
-            valid_tokens.append(token)
-    stop_words = load_stopwords()
-    filtered_words = []
-    for word in valid_tokens:
-        if word not in stop_words:
-            filtered_words.append(word)
-    stemmer = PorterStemmer()
-    stemmed_words = []
-    for word in filtered_words:
-        stemmed_words.append(stemmer.stem(word))
-    return stemmed_words
+    return get_analyzer().analyze(text)
 
 
 def tf_command(doc_id: int, term: str) -> int:
@@ -234,6 +882,4 @@ def tfidf_command(doc_id: int, term: str) -> float:
 
 
 def bm25search_command(query: str, limit: int = DEFAULT_SEARCH_LIMIT) -> list[dict]:
-    idx = InvertedIndex()
-    idx.load()
-    return idx.bm25_search(query, limit)
+    return call_search_service("bm25_search", query=query, limit=limit)
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from .search_utils import (
+    LLM_CACHE_MAX_BYTES,
+    LLM_CACHE_PATH,
+    LLM_CACHE_TTL_SECONDS,
+)
+
+
+@dataclass
+class CachedResponse:
+    """Stands in for a GenerateContentResponse served from the cache"""
+
+    text: str
+    usage_metadata: Any = None
+
+
+def prompt_hash(model: str, contents) -> str:
+    """Hash of the model and the full request contents, including image bytes"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(model.encode("utf-8"))
+    parts = contents if isinstance(contents, (list, tuple)) else [contents]
+    for part in parts:
+        digest.update(b"\0")
+        if isinstance(part, str):
+            digest.update(part.encode("utf-8"))
+        elif hasattr(part, "model_dump_json"):
+            digest.update(part.model_dump_json().encode("utf-8"))
+        else:
+            digest.update(json.dumps(part, sort_keys=True, default=repr).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed cache of LLM response text keyed by (model, prompt hash)
+
+    Entries older than `ttl` seconds are treated as misses. Once the stored
+    text exceeds `max_bytes`, the least recently used entries are evicted.
+    The database is shared by every process that uses the same path.
+    """
+
+    def __init__(
+        self,
+        path: str = LLM_CACHE_PATH,
+        ttl: float = LLM_CACHE_TTL_SECONDS,
+        max_bytes: int = LLM_CACHE_MAX_BYTES,
+    ) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.connection: sqlite3.Connection | None = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, model: str, contents) -> CachedResponse | None:
+        key = prompt_hash(model, contents)
+        now = time.time()
+        with self.lock:
+            db = self.__connect()
+            row = db.execute(
+                "SELECT text, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                self.misses += 1
+                return None
+            db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            db.commit()
+            self.hits += 1
+        return CachedResponse(text=row[0])
+
+    def put(self, model: str, contents, text: str | None) -> None:
+        if text is None:
+            return
+        key = prompt_hash(model, contents)
+        now = time.time()
+        with self.lock:
+            db = self.__connect()
+            db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, model, text, now, now),
+            )
+            self.__evict(db, now)
+            db.commit()
+
+    def clear(self) -> None:
+        with self.lock:
+            db = self.__connect()
+            db.execute("DELETE FROM responses")
+            db.commit()
+
+    def stats(self) -> dict:
+        with self.lock:
+            entries, size = self.__connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(text)), 0) FROM responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def __evict(self, db: sqlite3.Connection, now: float) -> None:
+        db.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+        (size,) = db.execute(
+            "SELECT COALESCE(SUM(LENGTH(text)), 0) FROM responses"
+        ).fetchone()
+        if size <= self.max_bytes:
+            return
+        excess = size - self.max_bytes
+        keys = []
+        for key, length in db.execute(
+            "SELECT key, LENGTH(text) FROM responses ORDER BY accessed_at"
+        ):
+            keys.append((key,))
+            excess -= length
+            if excess <= 0:
+                break
+        db.executemany("DELETE FROM responses WHERE key = ?", keys)
+
+    def __connect(self) -> sqlite3.Connection:
+        if self.connection is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # Calls arrive from the client's event loop thread as well as callers.
+            self.connection = sqlite3.connect(
+                self.path, timeout=30, check_same_thread=False
+            )
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )"""
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)"
+            )
+            self.connection.commit()
+        return self.connection
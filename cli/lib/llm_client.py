@@ -0,0 +1,238 @@
+import asyncio
+import functools
+import os
+import random
+import re
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from .llm_cache import ResponseCache
+from .search_utils import (
+    GEMINI_MODEL,
+    LLM_CACHE_ENV,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES,
+    LLM_REQUESTS_PER_MINUTE,
+)
+
+load_dotenv()
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+MAX_BACKOFF_SECONDS = 60.0
+
+
+class TokenBucket:
+    """Async token bucket that quota headers can retune while it runs"""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock: asyncio.Lock | None = None
+
+    def __refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        # Waiters queue on the lock, so tokens are handed out in arrival order.
+        async with self.lock:
+            while True:
+                wait = self.paused_until - time.monotonic()
+                if wait <= 0:
+                    self.__refill()
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+                await asyncio.sleep(wait)
+
+    def update(
+        self,
+        limit_per_minute: float | None = None,
+        remaining: float | None = None,
+        retry_after: float | None = None,
+    ) -> None:
+        self.__refill()
+        if limit_per_minute:
+            self.rate = limit_per_minute / 60
+            self.capacity = limit_per_minute
+        if remaining is not None:
+            self.tokens = min(self.tokens, remaining)
+        if retry_after:
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+
+class LLMClient:
+    """Shared Gemini client for concurrent, rate-limited generate_content calls
+
+    Requests run on one background event loop, so the underlying HTTP
+    connections are reused across calls. At most `max_concurrency` requests
+    are in flight, each waits for a token-bucket slot, and rate-limit or
+    server errors are retried with exponential backoff. Rate-limit headers
+    and retry delays returned by the API retune the bucket. With a cache,
+    repeated (model, contents) requests are answered without calling the API.
+
+    Args:
+        model: Model used when a call doesn't name one
+        client: genai.Client-compatible object; created from GEMINI_API_KEY if None
+        max_concurrency: Requests in flight at once
+        requests_per_minute: Initial token-bucket rate
+        max_retries: Retries per request before the error is raised
+        cache: Optional ResponseCache for response text
+    """
+
+    def __init__(
+        self,
+        model: str = GEMINI_MODEL,
+        client=None,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        requests_per_minute: float = LLM_REQUESTS_PER_MINUTE,
+        max_retries: int = LLM_MAX_RETRIES,
+        cache: ResponseCache | None = None,
+    ) -> None:
+        self.model = model
+        self.cache = cache
+        self._client = client
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.bucket = TokenBucket(requests_per_minute / 60, requests_per_minute)
+        self.semaphore: asyncio.Semaphore | None = None
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.loop_lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            from google import genai
+
+            self._client = genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))
+        return self._client
+
+    def generate(self, contents, model: str | None = None, use_cache: bool = True):
+        """Blocking generate_content through the shared event loop"""
+        return self.__run(self.agenerate(contents, model, use_cache))
+
+    def generate_many(
+        self, contents_list: list, model: str | None = None, use_cache: bool = True
+    ) -> list:
+        """Blocking, concurrent generate_content for many prompts, in order"""
+        return self.__run(self.agenerate_many(contents_list, model, use_cache))
+
+    async def agenerate_many(
+        self, contents_list: list, model: str | None = None, use_cache: bool = True
+    ) -> list:
+        return await asyncio.gather(
+            *(self.agenerate(contents, model, use_cache) for contents in contents_list)
+        )
+
+    async def agenerate(self, contents, model: str | None = None, use_cache: bool = True):
+        model = model or self.model
+        cache = self.cache if use_cache else None
+        if cache is not None:
+            cached = cache.get(model, contents)
+            if cached is not None:
+                return cached
+
+        response = await self.__generate(contents, model)
+        if cache is not None:
+            cache.put(model, contents, response.text)
+        return response
+
+    async def __generate(self, contents, model: str):
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            async with self.semaphore:
+                try:
+                    response = await self.client.aio.models.generate_content(
+                        model=model, contents=contents
+                    )
+                except Exception as error:
+                    if attempt == self.max_retries or not is_retryable(error):
+                        raise
+                    retry_after = self.__apply_quota(_error_headers(error))
+                    delay = retry_after or retry_delay(error) or backoff_delay(attempt)
+                    if retry_after is None and is_rate_limited(error):
+                        self.bucket.update(retry_after=delay)
+                else:
+                    self.__apply_quota(_response_headers(response))
+                    return response
+            await asyncio.sleep(delay)
+
+    def __apply_quota(self, headers: dict) -> float | None:
+        """Retune the bucket from rate-limit headers; returns Retry-After if set"""
+        headers = {key.lower(): value for key, value in headers.items()}
+        retry_after = _to_float(headers.get("retry-after"))
+        self.bucket.update(
+            limit_per_minute=_to_float(headers.get("x-ratelimit-limit-requests")),
+            remaining=_to_float(headers.get("x-ratelimit-remaining-requests")),
+            retry_after=retry_after,
+        )
+        return retry_after
+
+    def __run(self, coroutine):
+        with self.loop_lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self.loop.run_forever, name="llm-client", daemon=True
+                ).start()
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+
+def is_retryable(error: Exception) -> bool:
+    from google.genai import errors
+
+    if isinstance(error, errors.APIError):
+        return error.code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (ConnectionError, TimeoutError))
+
+
+def is_rate_limited(error: Exception) -> bool:
+    from google.genai import errors
+
+    return isinstance(error, errors.APIError) and error.code == 429
+
+
+def retry_delay(error: Exception) -> float | None:
+    """Delay requested by a RetryInfo detail in an API error, e.g. "12s" """
+    details = getattr(error, "details", None)
+    match = re.search(r"""["']retryDelay["']\s*:\s*["'](\d+(?:\.\d+)?)s""", str(details))
+    return float(match.group(1)) if match else None
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(MAX_BACKOFF_SECONDS, 2.0**attempt))
+
+
+def _response_headers(response) -> dict:
+    http_response = getattr(response, "sdk_http_response", None)
+    return dict(getattr(http_response, "headers", None) or {})
+
+
+def _error_headers(error: Exception) -> dict:
+    return dict(getattr(getattr(error, "response", None), "headers", None) or {})
+
+
+def _to_float(value) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@functools.cache
+def get_llm_client() -> LLMClient:
+    if os.environ.get(LLM_CACHE_ENV, "").strip().lower() == "off":
+        return LLMClient()
+    return LLMClient(cache=ResponseCache())
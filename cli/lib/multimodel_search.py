@@ -1,48 +1,57 @@
-from PIL import Image
-from sentence_transformers import SentenceTransformer
-from .semantic_search import cosine_similarity
-from .search_utils import load_movies
-
-
-class MultiModal:
-    def __init__(self, documents, model_name="clip-ViT-B-32"):
-        self.model = SentenceTransformer(model_name)
-        self.documents = documents
-        self.texts = []
-        for doc in documents:
-            self.texts.append(f"{doc['title']}: {doc['description']}")
-        self.text_embeddings = self.model.encode(
-            self.texts,
-            show_progress_bar=True,
-        )
+from .search_utils import (
+    CLIP_EMBEDDINGS_MANIFEST_PATH,
+    CLIP_EMBEDDINGS_PATH,
+    CLIP_EMBEDDING_SHARDS_DIR,
+    DEFAULT_SEARCH_LIMIT,
+    load_movies,
+)
+from .semantic_search import SemanticSearch, normalize_embeddings, top_k_indices
+
+
+class MultiModal(SemanticSearch):
+    """Image search over the catalog's "title: description" CLIP embeddings
+
+    The text embeddings are built like SemanticSearch's movie embeddings:
+    saved normalized under CACHE_DIR with a manifest of content hashes, and
+    re-embedded only for movies whose text changed. An image query is one
+    image encode and one matrix product against them.
+    """
+
+    embeddings_path = CLIP_EMBEDDINGS_PATH
+    manifest_path = CLIP_EMBEDDINGS_MANIFEST_PATH
+    shards_dir = CLIP_EMBEDDING_SHARDS_DIR
+
+    def __init__(self, documents=None, model_name="clip-ViT-B-32", encode_workers=None):
+        super().__init__(model_name, encode_workers=encode_workers)
+        if documents is not None:
+            self.load_or_create_embeddings(documents)
 
     def embed_image(self, image_path: str):
-        image_data = Image.open(image_path)
-        return self.model.encode(image_data)
-
-    def search_with_image(self, image_path: str):
-        image_embedding = self.embed_image(image_path)
-        cosine_similarities = []
-        for idx, embedding in enumerate(self.text_embeddings):
-            score = cosine_similarity(
-                embedding,
-                image_embedding,
+        from PIL import Image
+
+        with Image.open(image_path) as image_data:
+            return self.model.encode(image_data)
+
+    def search_with_image(self, image_path: str, limit: int = DEFAULT_SEARCH_LIMIT):
+        if self.embeddings is None or self.documents is None:
+            raise ValueError(
+                "No embeddings loaded. Call load_or_create_embeddings first."
             )
-            doc = self.documents[idx]
-            cosine_similarities.append(
+
+        image_embedding = normalize_embeddings(self.embed_image(image_path))
+        similarities = self.embeddings @ image_embedding
+        results = []
+        for i in top_k_indices(similarities, limit):
+            doc = self.documents[i]
+            results.append(
                 {
                     "id": doc["id"],
                     "title": doc["title"],
                     "description": doc["description"],
-                    "score": score,
+                    "score": float(similarities[i]),
                 }
             )
-
-        return sorted(
-            cosine_similarities,
-            key=lambda x: x["score"],
-            reverse=True,
-        )[:5]
+        return results
 
 
 def verify_image_embedding(image_path: str):
@@ -51,9 +60,9 @@ def verify_image_embedding(image_path: str):
     print(f"Embedding shape: {embedding.shape[0]} dimensions")
 
 
-def image_search_command(img_path):
+def image_search_command(img_path, workers=None):
     movies = load_movies()
-    multi_model = MultiModal(movies)
+    multi_model = MultiModal(movies, encode_workers=workers)
     results = multi_model.search_with_image(img_path)
 
     for i, res in enumerate(results, 1):
@@ -0,0 +1,151 @@
+import contextlib
+import glob
+import os
+
+import numpy as np
+
+from .index_segment import save_array
+from .search_utils import QUANTIZATION_KINDS, content_hash
+
+# Rows converted per step, so scoring never materializes the float32 matrix.
+SCORE_BATCH_SIZE = 65536
+
+
+class QuantizedEmbeddings:
+    """Compact copy of L2-normalized embeddings for candidate scoring
+
+    kinds:
+        float16  half precision, 2x smaller
+        int8     symmetric per-row scalar quantization, 4x smaller
+        binary   sign bits packed 8 per byte, scored by Hamming distance, 32x smaller
+
+    Scores are approximate, so callers rescore the best candidates against
+    the float32 embeddings with rescore().
+
+    load_or_create() keeps the codes (and int8 scales) as .npy files next to
+    the float32 file and memory-maps them, so processes share one copy in
+    the page cache and never read the float32 matrix to start up.
+    """
+
+    def __init__(
+        self, kind: str, codes: np.ndarray, scales: np.ndarray | None = None
+    ) -> None:
+        if kind not in QUANTIZATION_KINDS:
+            raise ValueError(
+                f"unknown quantization {kind!r}, expected one of {QUANTIZATION_KINDS}"
+            )
+        self.kind = kind
+        self.codes = codes
+        self.scales = scales
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (0 if self.scales is None else self.scales.nbytes)
+
+    @classmethod
+    def load_or_create(
+        cls, embeddings_path: str, kind: str, embeddings: np.ndarray, source: str
+    ) -> "QuantizedEmbeddings":
+        """Map the saved store for an embeddings file, quantizing it first if missing
+
+        Args:
+            embeddings_path: The float32 .npy file the store belongs to
+            kind: One of QUANTIZATION_KINDS
+            embeddings: That file, mapped; only read if the store is missing
+            source: file_fingerprint of that file, taken when it was mapped.
+                Stores are named after it, so a store is only ever used with
+                the embeddings (and manifest) it was made from.
+        """
+        codes_path, scales_path = store_paths(embeddings_path, kind, source)
+        if not os.path.exists(codes_path):
+            quantized = cls.from_embeddings(embeddings, kind)
+            # Scales first: a store counts as saved once its codes exist.
+            if quantized.scales is not None:
+                save_array(scales_path, quantized.scales)
+            save_array(codes_path, quantized.codes)
+            # Stores of earlier versions of the file are no longer used.
+            stale = glob.escape(os.path.splitext(embeddings_path)[0]) + f".{kind}.*.npy"
+            for path in set(glob.glob(stale)) - {codes_path, scales_path}:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
+        scales = None
+        if kind == "int8":
+            scales = np.load(scales_path, mmap_mode="r")
+        return cls(kind, np.load(codes_path, mmap_mode="r"), scales)
+
+    @classmethod
+    def from_embeddings(cls, embeddings: np.ndarray, kind: str) -> "QuantizedEmbeddings":
+        """Quantize normalized embeddings, e.g. a read-only memmap, in batches"""
+        dim = embeddings.shape[1]
+        if kind == "binary":
+            codes = np.empty((len(embeddings), (dim + 7) // 8), dtype=np.uint8)
+        else:
+            dtype = np.float16 if kind == "float16" else np.int8
+            codes = np.empty((len(embeddings), dim), dtype=dtype)
+        scales = np.empty(len(embeddings), dtype=np.float32) if kind == "int8" else None
+
+        for start in range(0, len(embeddings), SCORE_BATCH_SIZE):
+            batch = np.asarray(embeddings[start : start + SCORE_BATCH_SIZE])
+            end = start + len(batch)
+            if kind == "float16":
+                codes[start:end] = batch
+            elif kind == "int8":
+                scale = np.abs(batch).max(axis=1) / 127
+                scale[scale == 0] = 1
+                codes[start:end] = np.rint(batch / scale[:, None])
+                scales[start:end] = scale
+            else:
+                codes[start:end] = np.packbits(batch > 0, axis=1)
+        return cls(kind, codes, scales)
+
+    def scores(
+        self, query_embedding: np.ndarray, rows: np.ndarray | None = None
+    ) -> np.ndarray:
+        """Approximate similarity of the query to every row (or the given rows)
+
+        Higher is better. For binary codes this is the negated Hamming
+        distance, which only ranks and is not on the cosine scale.
+        """
+        codes = self.codes if rows is None else self.codes[rows]
+        scales = None
+        if self.scales is not None:
+            scales = self.scales if rows is None else self.scales[rows]
+
+        if self.kind == "binary":
+            query_bits = np.packbits(query_embedding > 0)
+            distances = np.empty(len(codes), dtype=np.int32)
+            for start in range(0, len(codes), SCORE_BATCH_SIZE):
+                batch = codes[start : start + SCORE_BATCH_SIZE]
+                distances[start : start + len(batch)] = np.bitwise_count(
+                    batch ^ query_bits
+                ).sum(axis=1)
+            return -distances.astype(np.float32)
+
+        query_embedding = np.asarray(query_embedding, dtype=np.float32)
+        scores = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), SCORE_BATCH_SIZE):
+            batch = codes[start : start + SCORE_BATCH_SIZE].astype(np.float32)
+            scores[start : start + len(batch)] = batch @ query_embedding
+        if scales is not None:
+            scores *= scales
+        return scores
+
+
+def store_paths(embeddings_path: str, kind: str, source: str) -> tuple[str, str]:
+    """(codes, scales) paths of the quantized store for an embeddings file version"""
+    prefix = f"{os.path.splitext(embeddings_path)[0]}.{kind}.{content_hash(source)[:16]}"
+    return f"{prefix}.npy", f"{prefix}.scales.npy"
+
+
+def rescore(
+    embeddings: np.ndarray, rows: np.ndarray, query_embedding: np.ndarray
+) -> np.ndarray:
+    """Exact cosine similarity of the query to the given rows
+
+    embeddings are normalized float32, typically a memmap of the saved .npy
+    file, so only the requested rows are read.
+    """
+    return embeddings[rows] @ query_embedding
@@ -0,0 +1,99 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+from .search_utils import QUERY_CACHE_SIZE, QUERY_CACHE_TTL_SECONDS
+
+
+class QueryCache:
+    """LRU cache of search results with a time-to-live
+
+    Every lookup passes the current index version; when it changes, all
+    entries are dropped, so results never outlive a rebuild. Results are
+    copied in and out because callers such as reranking edit them.
+    """
+
+    def __init__(
+        self, max_entries: int = QUERY_CACHE_SIZE, ttl: float = QUERY_CACHE_TTL_SECONDS
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.version: Hashable = None
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.hit_seconds = 0.0
+        self.miss_seconds = 0.0
+
+    def get_or_compute(
+        self, key: Hashable, version: Hashable, compute: Callable[[], Any]
+    ) -> Any:
+        start = time.perf_counter()
+        value = self.get(key, version)
+        hit = value is not None
+        if not hit:
+            value = compute()
+            self.put(key, version, value)
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            if hit:
+                self.hits += 1
+                self.hit_seconds += elapsed
+            else:
+                self.misses += 1
+                self.miss_seconds += elapsed
+        return value
+
+    def get(self, key: Hashable, version: Hashable) -> Any:
+        with self.lock:
+            self.__check_version(version)
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if time.monotonic() > expires:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+        return copy.deepcopy(value)
+
+    def put(self, key: Hashable, version: Hashable, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        value = copy.deepcopy(value)
+        with self.lock:
+            self.__check_version(version)
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "mean_hit_ms": 1000 * self.hit_seconds / self.hits if self.hits else 0.0,
+            "mean_miss_ms": (
+                1000 * self.miss_seconds / self.misses if self.misses else 0.0
+            ),
+        }
+
+    def reset_stats(self) -> None:
+        with self.lock:
+            self.hits = self.misses = 0
+            self.hit_seconds = self.miss_seconds = 0.0
+
+    def __check_version(self, version: Hashable) -> None:
+        if version != self.version:
+            self.entries.clear()
+            self.version = version
@@ -0,0 +1,152 @@
+import functools
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from .search_utils import (
+    CROSS_ENCODER_MODEL,
+    RERANK_BATCH_SIZE,
+    RERANK_CACHE_SIZE,
+)
+
+# Weight of the newest batch in the running per-pair latency estimate.
+LATENCY_SMOOTHING = 0.3
+
+
+def rerank_text(doc: dict) -> str:
+    """Text a result is reranked on; fused results carry "document", not "description" """
+    body = doc.get("description") or doc.get("document", "")
+    return f"{doc.get('title', '')} - {body}"
+
+
+class CrossEncoderReranker:
+    """Cross-encoder reranker that loads its model once and reuses it
+
+    Pairs are scored in batches of `batch_size`, sorted by length so each
+    batch pads to similar lengths, and scores are kept in an LRU cache keyed
+    by (query, text). With a latency budget, candidates are scored in rank
+    order only while the running per-pair latency says the next batch fits;
+    the rest keep their original order after the reranked ones. At least
+    the top candidates that fit the budget, and never fewer than one, are
+    scored on every call, so the latency estimate keeps tracking the model.
+    """
+
+    def __init__(
+        self,
+        model_name: str = CROSS_ENCODER_MODEL,
+        batch_size: int = RERANK_BATCH_SIZE,
+        cache_size: int = RERANK_CACHE_SIZE,
+    ) -> None:
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.cache: OrderedDict[tuple[str, str], float] = OrderedDict()
+        self.pair_seconds: float | None = None
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            from sentence_transformers import CrossEncoder
+
+            self._model = CrossEncoder(self.model_name)
+        return self._model
+
+    def rerank(
+        self, query: str, documents: list[dict], budget_ms: float | None = None
+    ) -> list[dict]:
+        """Set "new_score" on the documents that were scored and reorder them
+
+        Args:
+            query: Search query
+            documents: Results in their current rank order
+            budget_ms: Optional time allowed for scoring, in milliseconds
+        """
+        texts = [rerank_text(doc) for doc in documents]
+        scores = self.score(query, texts, budget_ms)
+
+        scored = []
+        unscored = []
+        for doc, score in zip(documents, scores):
+            if score is None:
+                unscored.append(doc)
+            else:
+                doc["new_score"] = score
+                scored.append(doc)
+        scored.sort(key=lambda x: x["new_score"], reverse=True)
+        return scored + unscored
+
+    def score(
+        self, query: str, texts: list[str], budget_ms: float | None = None
+    ) -> list[float | None]:
+        """Cross-encoder score per text, or None where the budget ran out"""
+        scores: list[float | None] = [self.__cached(query, text) for text in texts]
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if not missing:
+            return scores
+
+        if budget_ms is None:
+            windows = [missing]
+        else:
+            # Best-ranked candidates first, so a tight budget still reranks the top.
+            windows = [
+                missing[start : start + self.batch_size]
+                for start in range(0, len(missing), self.batch_size)
+            ]
+        # Load the model outside the budget and the latency estimate.
+        model = self.model
+        deadline = None if budget_ms is None else time.perf_counter() + budget_ms / 1000
+
+        for number, window in enumerate(windows):
+            last = False
+            if deadline is not None and self.pair_seconds is not None:
+                fits = int((deadline - time.perf_counter()) / self.pair_seconds)
+                if fits < len(window):
+                    if number > 0:
+                        break
+                    # Score what fits of the first window rather than nothing.
+                    window = window[: max(fits, 1)]
+                    last = True
+            window = sorted(window, key=lambda i: len(query) + len(texts[i]))
+            for start in range(0, len(window), self.batch_size):
+                batch = window[start : start + self.batch_size]
+                batch_texts = [texts[i] for i in batch]
+                for i, score in zip(batch, self.__predict(model, query, batch_texts)):
+                    scores[i] = score
+                    self.__remember(query, texts[i], score)
+            if last or (deadline is not None and time.perf_counter() > deadline):
+                break
+        return scores
+
+    def __predict(self, model, query: str, texts: list[str]) -> list[float]:
+        start = time.perf_counter()
+        scores = model.predict(
+            [[query, text] for text in texts],
+            batch_size=self.batch_size,
+            show_progress_bar=False,
+        )
+        seconds = (time.perf_counter() - start) / len(texts)
+        if self.pair_seconds is None:
+            self.pair_seconds = seconds
+        else:
+            self.pair_seconds += LATENCY_SMOOTHING * (seconds - self.pair_seconds)
+        return np.asarray(scores, dtype=np.float64).tolist()
+
+    def __cached(self, query: str, text: str) -> float | None:
+        score = self.cache.get((query, text))
+        if score is not None:
+            self.cache.move_to_end((query, text))
+        return score
+
+    def __remember(self, query: str, text: str, score: float) -> None:
+        if self.cache_size <= 0:
+            return
+        self.cache[(query, text)] = score
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+
+@functools.cache
+def get_reranker() -> CrossEncoderReranker:
+    return CrossEncoderReranker()
@@ -0,0 +1,96 @@
+import json
+import os
+from typing import Any
+
+from .search_utils import (
+    SEARCH_SERVER_CONNECT_TIMEOUT,
+    SEARCH_SERVER_ENV,
+    SEARCH_SERVER_HOST,
+    SEARCH_SERVER_PORT,
+    SEARCH_SERVER_READ_TIMEOUT,
+)
+
+
+def get_server_address() -> tuple[str, int] | None:
+    """Address of the search server, or None when it is disabled"""
+    value = os.environ.get(SEARCH_SERVER_ENV, "").strip()
+    if value.lower() == "off":
+        return None
+    if not value:
+        return SEARCH_SERVER_HOST, SEARCH_SERVER_PORT
+    host, _, port = value.rpartition(":")
+    return host or SEARCH_SERVER_HOST, int(port)
+
+
+def server_is_running() -> bool:
+    address = get_server_address()
+    if address is None:
+        return False
+    host, port = address
+    import http.client
+
+    conn = http.client.HTTPConnection(host, port, timeout=SEARCH_SERVER_CONNECT_TIMEOUT)
+    try:
+        conn.request("GET", "/health")
+        return conn.getresponse().status == 200
+    except OSError:
+        return False
+    finally:
+        conn.close()
+
+
+def request_server(method: str, **params: Any) -> Any:
+    """Run a search service method on the running search server
+
+    Raises:
+        ConnectionError: No server is reachable, or it stopped responding or
+            sent a reply that isn't a search server's
+        RuntimeError: The server failed to run the method
+    """
+    address = get_server_address()
+    if address is None:
+        raise ConnectionError("search server is disabled")
+    host, port = address
+    import http.client
+
+    conn = http.client.HTTPConnection(host, port, timeout=SEARCH_SERVER_CONNECT_TIMEOUT)
+    try:
+        try:
+            conn.connect()
+        except OSError as e:
+            raise ConnectionError(f"no search server at {host}:{port}") from e
+        # Queries can take longer than the connect timeout allows.
+        conn.sock.settimeout(SEARCH_SERVER_READ_TIMEOUT)
+
+        body = json.dumps({"method": method, "params": params})
+        try:
+            conn.request("POST", "/call", body, {"Content-Type": "application/json"})
+            response = conn.getresponse()
+            data = json.loads(response.read())
+        except TimeoutError as e:
+            raise ConnectionError(f"search server at {host}:{port} timed out") from e
+        except (ValueError, http.client.HTTPException) as e:
+            # Something else holds the port, or the reply was cut short.
+            raise ConnectionError(
+                f"no valid search server reply from {host}:{port}"
+            ) from e
+    finally:
+        conn.close()
+
+    if not isinstance(data, dict) or not ("result" in data or "error" in data):
+        raise ConnectionError(f"no valid search server reply from {host}:{port}")
+    if response.status != 200:
+        raise RuntimeError(f"search server error: {data.get('error')}")
+    return data["result"]
+
+
+def call_search_service(method: str, **params: Any) -> Any:
+    """Run a search on the warm search server, or in-process if none is running"""
+    try:
+        return request_server(method, **params)
+    except ConnectionError:
+        pass
+
+    from .search_service import get_search_service
+
+    return getattr(get_search_service(), method)(**params)
@@ -0,0 +1,77 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .search_service import SearchService
+
+
+class SearchRequestHandler(BaseHTTPRequestHandler):
+    server: "SearchServer"
+
+    def do_GET(self) -> None:
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self) -> None:
+        if self.path != "/call":
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length))
+            method = request["method"]
+            params = request.get("params", {})
+        except (ValueError, KeyError) as e:
+            self._send_json(400, {"error": f"invalid request: {e}"})
+            return
+
+        if method not in self.server.service.METHODS:
+            self._send_json(400, {"error": f"unknown method {method}"})
+            return
+
+        try:
+            # The models and indexes are shared, so queries run one at a time.
+            with self.server.lock:
+                result = getattr(self.server.service, method)(**params)
+        except Exception as e:
+            self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+            return
+        self._send_json(200, {"result": result})
+
+    def _send_json(self, status: int, data: dict) -> None:
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class SearchServer(ThreadingHTTPServer):
+    """Localhost HTTP server holding one warm SearchService"""
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], service: "SearchService") -> None:
+        super().__init__(address, SearchRequestHandler)
+        self.service = service
+        self.lock = threading.Lock()
+
+
+def serve_command(host: str, port: int) -> None:
+    from .search_service import SearchService
+
+    service = SearchService()
+    print("Loading indexes and models...")
+    service.warm_up()
+    with SearchServer((host, port), service) as server:
+        print(f"Search server listening on http://{host}:{port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("Shutting down search server.")
@@ -0,0 +1,223 @@
+import os
+
+from .hybrid_search import HybridSearch
+from .keyword_search import InvertedIndex
+from .query_cache import QueryCache
+from .reranker import get_reranker
+from .search_utils import (
+    CHUNK_EMBEDDINGS_PATH,
+    DEFAULT_SEARCH_LIMIT,
+    EMBEDDING_QUANTIZATION_ENV,
+    MOVIE_EMBEDDINGS_PATH,
+    load_movies,
+)
+from .semantic_search import ChunkedSemanticSearch
+
+
+class SearchService:
+    """Search engines loaded once and reused by every query in a process
+
+    Each component is loaded the first time a query needs it, so an
+    in-process keyword search never pays for the embedding model. The search
+    server calls warm_up() to load everything before accepting queries.
+    """
+
+    METHODS = (
+        "keyword_search",
+        "bm25_search",
+        "semantic_search",
+        "search_chunks",
+        "weighted_search",
+        "rrf_search",
+        "bm25_search_many",
+        "semantic_search_many",
+        "search_chunks_many",
+        "weighted_search_many",
+        "rrf_search_many",
+        "rerank",
+        "query_cache_stats",
+    )
+
+    def __init__(self) -> None:
+        self._documents: list[dict] | None = None
+        self._idx: InvertedIndex | None = None
+        self._semantic: ChunkedSemanticSearch | None = None
+        self._hybrid: HybridSearch | None = None
+        # Embedding files as of the last load, to notice rebuilds by other processes.
+        self._embeddings_version: tuple | None = None
+        self.query_cache = QueryCache()
+
+    @property
+    def documents(self) -> list[dict]:
+        if self._documents is None:
+            self._documents = load_movies()
+        return self._documents
+
+    @property
+    def idx(self) -> InvertedIndex:
+        if self._idx is None:
+            idx = InvertedIndex()
+            if not os.path.exists(idx.index_path):
+                idx.build()
+                idx.save()
+            self._idx = idx
+        self._idx.ensure_loaded()
+        return self._idx
+
+    @property
+    def semantic(self) -> ChunkedSemanticSearch:
+        if self._semantic is None:
+            self._semantic = ChunkedSemanticSearch(
+                quantization=os.environ.get(EMBEDDING_QUANTIZATION_ENV) or None
+            )
+        else:
+            self.__reload_stale_embeddings()
+        return self._semantic
+
+    @property
+    def hybrid(self) -> HybridSearch:
+        if self._hybrid is None:
+            self._hybrid = HybridSearch(
+                self.documents, semantic_search=self.semantic, idx=self.idx
+            )
+            self._embeddings_version = self.__embeddings_version()
+        else:
+            self.__reload_stale_embeddings()
+        return self._hybrid
+
+    def warm_up(self) -> None:
+        self.hybrid
+        self.__ensure_movie_embeddings()
+
+    def __ensure_movie_embeddings(self) -> None:
+        if self.semantic.embeddings is None:
+            self.semantic.load_or_create_embeddings(self.documents)
+            self._embeddings_version = self.__embeddings_version()
+
+    def __ensure_chunk_embeddings(self) -> None:
+        if self.semantic.chunk_embeddings is None:
+            self.semantic.load_or_create_chunk_embeddings(self.documents)
+            self._embeddings_version = self.__embeddings_version()
+
+    def __reload_stale_embeddings(self) -> None:
+        """Reload loaded embeddings whose files were rebuilt, like idx does"""
+        if self.__embeddings_version() == self._embeddings_version:
+            return
+        semantic = self._semantic
+        if semantic.embeddings is not None:
+            semantic.load_or_create_embeddings(self.documents)
+        if semantic.chunk_embeddings is not None:
+            semantic.load_or_create_chunk_embeddings(self.documents)
+        self._embeddings_version = self.__embeddings_version()
+
+    def keyword_search(
+        self, query: str, limit: int = DEFAULT_SEARCH_LIMIT
+    ) -> list[dict]:
+        return self.idx.search(query, limit)
+
+    def bm25_search(self, query: str, limit: int = DEFAULT_SEARCH_LIMIT) -> list[dict]:
+        return self.idx.bm25_search(query, limit)
+
+    def semantic_search(
+        self, query: str, limit: int = DEFAULT_SEARCH_LIMIT
+    ) -> list[dict]:
+        self.__ensure_movie_embeddings()
+        return self.semantic.search(query, limit)
+
+    def search_chunks(
+        self, query: str, limit: int = DEFAULT_SEARCH_LIMIT, nprobe: int | None = None
+    ) -> list[dict]:
+        self.__ensure_chunk_embeddings()
+        return self.semantic.search_chunks(query, limit, nprobe)
+
+    def weighted_search(
+        self, query: str, alpha: float, limit: int = DEFAULT_SEARCH_LIMIT
+    ) -> list[dict]:
+        return self.__cached(
+            ("weighted_search", alpha, limit),
+            query,
+            lambda: self.hybrid.weighted_search(query, alpha, limit),
+        )
+
+    def rrf_search(
+        self, query: str, k: int, limit: int = DEFAULT_SEARCH_LIMIT
+    ) -> list[dict]:
+        return self.__cached(
+            ("rrf_search", k, limit),
+            query,
+            lambda: self.hybrid.rrf_search(query, k, limit),
+        )
+
+    def query_cache_stats(self) -> dict:
+        return self.query_cache.stats()
+
+    def __cached(self, params: tuple, query: str, search) -> list[dict]:
+        """Serve repeated queries from the query cache
+
+        Queries that differ only in case or spacing share an entry. Anything
+        else, such as punctuation or stopwords, can change the semantic side
+        of the results, so it gets its own entry.
+        """
+        folded = " ".join(query.lower().split())
+        return self.query_cache.get_or_compute(
+            (params, folded), self.__index_version(), search
+        )
+
+    def __index_version(self) -> tuple:
+        """Changes whenever the index or embedding files are rebuilt"""
+        return (self.idx.disk_version(), *self.__embeddings_version())
+
+    def __embeddings_version(self) -> tuple:
+        files = []
+        for path in (MOVIE_EMBEDDINGS_PATH, CHUNK_EMBEDDINGS_PATH):
+            try:
+                stat = os.stat(path)
+                files.append((stat.st_size, stat.st_mtime_ns, stat.st_ino))
+            except FileNotFoundError:
+                files.append(None)
+        return tuple(files)
+
+    def bm25_search_many(
+        self, queries: list[str], limit: int = DEFAULT_SEARCH_LIMIT
+    ) -> list[list[dict]]:
+        return self.idx.bm25_search_many(queries, limit)
+
+    def semantic_search_many(
+        self, queries: list[str], limit: int = DEFAULT_SEARCH_LIMIT
+    ) -> list[list[dict]]:
+        self.__ensure_movie_embeddings()
+        return self.semantic.search_many(queries, limit)
+
+    def search_chunks_many(
+        self,
+        queries: list[str],
+        limit: int = DEFAULT_SEARCH_LIMIT,
+        nprobe: int | None = None,
+    ) -> list[list[dict]]:
+        self.__ensure_chunk_embeddings()
+        return self.semantic.search_chunks_many(queries, limit, nprobe)
+
+    def weighted_search_many(
+        self, queries: list[str], alpha: float, limit: int = DEFAULT_SEARCH_LIMIT
+    ) -> list[list[dict]]:
+        return self.hybrid.weighted_search_many(queries, alpha, limit)
+
+    def rrf_search_many(
+        self, queries: list[str], k: int, limit: int = DEFAULT_SEARCH_LIMIT
+    ) -> list[list[dict]]:
+        return self.hybrid.rrf_search_many(queries, k, limit)
+
+    def rerank(
+        self, query: str, documents: list[dict], budget_ms: float | None = None
+    ) -> list[dict]:
+        return get_reranker().rerank(query, documents, budget_ms)
+
+
+_search_service: SearchService | None = None
+
+
+def get_search_service() -> SearchService:
+    global _search_service
+    if _search_service is None:
+        _search_service = SearchService()
+    return _search_service
@@ -1,17 +1,31 @@
+import hashlib
 import json
 import os
-from typing import Any
+from collections.abc import Iterator
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .doc_store import DocStore
 
 DEFAULT_ALPHA = 0.5
 DEFAULT_K = 60
 
 DEFAULT_SEARCH_LIMIT = 5
+# Queries scored per matrix-matrix product by the batched search APIs.
+QUERY_BATCH_SIZE = 64
 DOCUMENT_PREVIEW_LENGTH = 100
 SCORE_PRECISION = 3
 
+FUSION_METHODS = ("min_max", "z_score", "rrf")
+# Hybrid search treats each retriever as returning limit * this many results.
+HYBRID_CANDIDATE_MULTIPLIER = 500
+
 BM25_K1 = 1.5
 BM25_B = 0.75
 
+# Compact the index once pending updates exceed this fraction of its documents.
+COMPACTION_THRESHOLD = 0.1
+
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
 DATA_PATH = os.path.join(PROJECT_ROOT, "data", "movies.json")
 STOPWORDS_PATH = os.path.join(PROJECT_ROOT, "data", "stopwords.txt")
@@ -19,20 +33,210 @@ DATA_DIR = os.path.join(PROJECT_ROOT, "data")
 GOLDEN_DATASET_PATH = os.path.join(DATA_DIR, "golden_dataset.json")
 
 CACHE_DIR = os.path.join(PROJECT_ROOT, "cache")
+DOC_STORE_DIR = os.path.join(CACHE_DIR, "doc_store")
+# Bytes read per step when streaming the catalog.
+CATALOG_READ_SIZE = 1 << 16
+# Movies processed per step by index and embedding builds, bounding their memory.
+CATALOG_BATCH_SIZE = 1024
 
 DEFAULT_CHUNK_SIZE = 200
 DEFAULT_CHUNK_OVERLAP = 1
 DEFAULT_SEMANTIC_CHUNK_SIZE = 4
 
 MOVIE_EMBEDDINGS_PATH = os.path.join(CACHE_DIR, "movie_embeddings.npy")
+MOVIE_EMBEDDINGS_MANIFEST_PATH = os.path.join(CACHE_DIR, "movie_embeddings.json")
 CHUNK_EMBEDDINGS_PATH = os.path.join(CACHE_DIR, "chunk_embeddings.npy")
-CHUNK_METADATA_PATH = os.path.join(CACHE_DIR, "chunk_metadata.json")
+# int32 (movie_idx, chunk_idx, total_chunks) per row of chunk_embeddings.npy
+CHUNK_METADATA_PATH = os.path.join(CACHE_DIR, "chunk_metadata.npy")
+CHUNK_MANIFEST_PATH = os.path.join(CACHE_DIR, "chunk_manifest.json")
+# Chunk metadata was a list of dicts in this file before it became an array.
+LEGACY_CHUNK_METADATA_PATH = os.path.join(CACHE_DIR, "chunk_metadata.json")
+CHUNK_ANN_INDEX_PATH = os.path.join(CACHE_DIR, "chunk_ivf_index.npz")
+# Normalized CLIP embeddings of each movie's text, for image search.
+CLIP_EMBEDDINGS_PATH = os.path.join(CACHE_DIR, "clip_embeddings.npy")
+CLIP_EMBEDDINGS_MANIFEST_PATH = os.path.join(CACHE_DIR, "clip_embeddings.json")
+# Embedding builds checkpoint a shard per CATALOG_BATCH_SIZE movies here and
+# resume from them after a crash; they are removed once the build completes.
+MOVIE_EMBEDDING_SHARDS_DIR = os.path.join(CACHE_DIR, "embedding_build", "movies")
+CHUNK_EMBEDDING_SHARDS_DIR = os.path.join(CACHE_DIR, "embedding_build", "chunks")
+CLIP_EMBEDDING_SHARDS_DIR = os.path.join(CACHE_DIR, "embedding_build", "clip")
+# Texts per encode call; builds sort each shard's texts by length first.
+EMBEDDING_BATCH_SIZE = 32
+# Shards chunked ahead of the encoder by the build's reader thread.
+EMBEDDING_PREFETCH_SHARDS = 2
+# Set to a number of worker processes to encode embedding builds on an
+# EncoderPool, each worker holding its own copy of the model.
+ENCODE_WORKERS_ENV = "HOOPLA_ENCODE_WORKERS"
+
+# IVF approximate search over chunk embeddings; nprobe lists are scanned per query.
+ANN_KMEANS_ITERATIONS = 10
+DEFAULT_ANN_NPROBE = 8
+
+QUANTIZATION_KINDS = ("float16", "int8", "binary")
+# Candidates scored with quantized embeddings are rescored exactly from float32.
+RESCORE_CANDIDATES = 300
+# Set to one of QUANTIZATION_KINDS to search with quantized embeddings.
+EMBEDDING_QUANTIZATION_ENV = "HOOPLA_EMBEDDING_QUANTIZATION"
+
+EMBEDDING_CACHE_DIR = os.path.join(CACHE_DIR, "embedding_cache")
+# Vectors kept in memory per model, on top of the on-disk cache.
+EMBEDDING_CACHE_MEMORY_SIZE = 10000
+# Size of a model's on-disk cache file; past it the oldest half is dropped.
+EMBEDDING_CACHE_MAX_BYTES = 1 << 30
+
+CROSS_ENCODER_MODEL = "cross-encoder/ms-marco-TinyBERT-L2-v2"
+RERANK_BATCH_SIZE = 32
+# (query, document) pair scores kept by the cross-encoder reranker.
+RERANK_CACHE_SIZE = 10000
+
+GEMINI_MODEL = "gemini-2.0-flash-001"
+# Shared LLM client limits; rate-limit headers from the API adjust the rate.
+LLM_MAX_CONCURRENCY = 8
+LLM_REQUESTS_PER_MINUTE = 15
+LLM_MAX_RETRIES = 5
+
+LLM_CACHE_PATH = os.path.join(CACHE_DIR, "llm_responses.sqlite")
+LLM_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+# Least recently used responses are evicted past this much cached text.
+LLM_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Set to "off" to always call the API.
+LLM_CACHE_ENV = "HOOPLA_LLM_CACHE"
+
+# Hybrid search results cached per normalized query; rebuilt indexes invalidate them.
+QUERY_CACHE_SIZE = 1024
+QUERY_CACHE_TTL_SECONDS = 300
+
+# CLI invocations timed by `benchmark_cli.py startup`, with the import time each
+# is allowed in ms. None of them may import a STARTUP_DEFERRED_MODULES package;
+# those load only on the code paths that use them.
+STARTUP_BUDGETS_MS = {
+    "hybrid_search_cli.py normalize 0.5 2.0 3.5": 400,
+    "hybrid_search_cli.py rrf-search --help": 400,
+    "keyword_search_cli.py bm25search --help": 400,
+    "semantic_search_cli.py chunk 'a short movie plot to split' --chunk-size 3": 400,
+    "semantic_search_cli.py search_chunked --help": 400,
+    "augmented_generation_cli.py rag --help": 400,
+    "multimodal_search_cli.py image_search --help": 400,
+    "describe_image_cli.py --help": 200,
+    "evaluation_cli.py --help": 200,
+    "search_server_cli.py status --help": 200,
+    "benchmark_cli.py --help": 200,
+}
+STARTUP_DEFERRED_MODULES = (
+    "torch",
+    "transformers",
+    "sentence_transformers",
+    "google.genai",
+    "nltk",
+    "PIL",
+)
+
+SEARCH_SERVER_HOST = "127.0.0.1"
+SEARCH_SERVER_PORT = 8765
+SEARCH_SERVER_CONNECT_TIMEOUT = 0.5
+# A server that accepted a query but sends nothing for this long is treated as down.
+SEARCH_SERVER_READ_TIMEOUT = 120.0
+# Set to "host:port" to use another server, or "off" to always search in-process.
+SEARCH_SERVER_ENV = "HOOPLA_SEARCH_SERVER"
+
+
+def load_movies() -> "DocStore":
+    """The movie catalog as a memory-mapped DocStore, a sequence of movie dicts
+
+    The store is rebuilt by streaming the catalog whenever the file changes.
+    """
+    from .doc_store import open_doc_store
 
+    return open_doc_store(DOC_STORE_DIR, DATA_PATH, iter_movies())
 
-def load_movies() -> list[dict]:
-    with open(DATA_PATH, "r") as f:
-        data = json.load(f)
-    return data["movies"]
+
+def iter_movies(path: str = DATA_PATH) -> Iterator[dict]:
+    """Yield catalog movies one at a time without reading the whole file
+
+    Reads JSON Lines (.jsonl, one movie per line) or a {"movies": [...]}
+    document, which is decoded incrementally.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+        yield from _iter_json_array(f, "movies")
+
+
+def _iter_json_array(f, key: str) -> Iterator[Any]:
+    """Stream the elements of the array under `key` of a top-level JSON object"""
+    decoder = json.JSONDecoder()
+    buffer, pos = "", 0
+
+    def skip(chars: str) -> str:
+        """Skip whitespace and any of `chars`; return the next character"""
+        nonlocal buffer, pos
+        while True:
+            while pos < len(buffer) and (buffer[pos].isspace() or buffer[pos] in chars):
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            data = f.read(CATALOG_READ_SIZE)
+            if not data:
+                return ""
+            buffer, pos = buffer[pos:] + data, 0
+
+    def decode():
+        nonlocal buffer, pos
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Possibly cut off at the end of the buffer; read on.
+                data = f.read(CATALOG_READ_SIZE)
+                if not data:
+                    raise
+                buffer, pos = buffer[pos:] + data, 0
+                continue
+            if end == len(buffer) and not isinstance(value, (str, dict, list)):
+                # A number or literal may continue past the buffer.
+                data = f.read(CATALOG_READ_SIZE)
+                if data:
+                    buffer, pos = buffer[pos:] + data, 0
+                    continue
+            pos = end
+            return value
+
+    if skip("") != "{":
+        raise ValueError(f"expected a JSON object with a {key!r} array")
+    pos += 1
+    while skip(",") == '"':
+        name = decode()
+        skip(":")
+        if name != key:
+            decode()
+            continue
+        if skip(":") != "[":
+            raise ValueError(f"expected {key!r} to be a JSON array")
+        pos += 1
+        while skip(",") not in ("]", ""):
+            yield decode()
+        return
+
+
+def content_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def document_hash(doc: dict) -> str:
+    return content_hash(json.dumps(doc, sort_keys=True))
+
+
+def file_fingerprint(path: str) -> str:
+    """Identify a file's contents without reading them
+
+    Cache files are only ever replaced, never rewritten in place, so every
+    rebuild changes the inode, modification time or size.
+    """
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}:{stat.st_ino}"
 
 
 def load_stopwords() -> list[str]:
@@ -1,65 +1,173 @@
 import json
 import os
 import re
+from collections import defaultdict
 
 import numpy as np
-from sentence_transformers import SentenceTransformer
 
+from .ann_index import IVFIndex
+from .embedding_build import EmbeddingBuild
+from .embedding_cache import CachedEncoder
+from .encoder_pool import default_encode_workers, pooled_encoder
+from .index_segment import NpyWriter, write_json
+from .quantization import QuantizedEmbeddings, rescore
+from .search_client import call_search_service
 from .search_utils import (
+    CHUNK_ANN_INDEX_PATH,
     CHUNK_EMBEDDINGS_PATH,
+    CHUNK_EMBEDDING_SHARDS_DIR,
+    CHUNK_MANIFEST_PATH,
     CHUNK_METADATA_PATH,
     DEFAULT_CHUNK_OVERLAP,
     DEFAULT_CHUNK_SIZE,
     DEFAULT_SEARCH_LIMIT,
     DEFAULT_SEMANTIC_CHUNK_SIZE,
     DOCUMENT_PREVIEW_LENGTH,
+    LEGACY_CHUNK_METADATA_PATH,
+    MOVIE_EMBEDDINGS_MANIFEST_PATH,
     MOVIE_EMBEDDINGS_PATH,
+    MOVIE_EMBEDDING_SHARDS_DIR,
+    QUERY_BATCH_SIZE,
+    RESCORE_CANDIDATES,
+    content_hash,
+    file_fingerprint,
     format_search_result,
     load_movies,
 )
 
 
 class SemanticSearch:
-    def __init__(self, model_name="all-MiniLM-L6-v2"):
+    # Where the per-movie embeddings, their manifest and build shards live.
+    embeddings_path = MOVIE_EMBEDDINGS_PATH
+    manifest_path = MOVIE_EMBEDDINGS_MANIFEST_PATH
+    shards_dir = MOVIE_EMBEDDING_SHARDS_DIR
+
+    def __init__(
+        self, model_name="all-MiniLM-L6-v2", quantization=None, encode_workers=None
+    ):
+        from sentence_transformers import SentenceTransformer
+
         self.model = SentenceTransformer(model_name)
+        self.encoder = CachedEncoder(self.model, model_name)
+        # Embedding builds encode on this many processes; queries stay in-process.
+        self.encode_workers = encode_workers or default_encode_workers()
+        # Searches score a quantized copy, then rescore the best candidates.
+        self.quantization = quantization
+        self.quantized: QuantizedEmbeddings | None = None
         self.embeddings = None
         self.documents = None
-        self.document_map = {}
+        # Throughput of the last embedding build, None until one runs.
+        self.build_stats: dict | None = None
 
     def generate_embedding(self, text):
         if not text or not text.strip():
             raise ValueError(
                 f"cannot generate embedding for empty text\ngiven text: {text}"
             )
-        return self.model.encode([text])[0]
+        return self.encoder.encode([text])[0]
 
-    def build_embeddings(self, documents):
-        self.documents = documents
-        self.document_map = {}
-        movie_strings = []
-        for doc in documents:
-            self.document_map[doc["id"]] = doc
-            movie_strings.append(f"{doc['title']}: {doc['description']}")
-        self.embeddings = self.model.encode(movie_strings, show_progress_bar=True)
+    def build_embeddings(self, documents, reuse=None):
+        """Embed every movie and save the vectors with a manifest of their hashes
 
-        os.makedirs(os.path.dirname(MOVIE_EMBEDDINGS_PATH), exist_ok=True)
-        np.save(MOVIE_EMBEDDINGS_PATH, self.embeddings)
-        return self.embeddings
+        Movies are embedded through an EmbeddingBuild, a shard of
+        CATALOG_BATCH_SIZE at a time, so memory use doesn't grow with the
+        catalog and an interrupted build resumes from its last saved shard.
+
+        Args:
+            documents: Movies to embed
+            reuse: Optional movie id -> (content hash, normalized embedding) of
+                vectors that are still valid if the movie's hash is unchanged
+        """
+        self.documents = documents
+        with pooled_encoder(self.encoder, self.encode_workers) as encoder:
+            build = EmbeddingBuild(self.shards_dir, encoder, "movies")
+            build.run(
+                documents,
+                key=lambda doc: (doc["id"], content_hash(movie_text(doc))),
+                texts=lambda doc: [movie_text(doc)],
+                reuse=reuse,
+            )
+        self.build_stats = build.stats
+
+        ids, hashes = [], []
+        with NpyWriter(self.embeddings_path, np.float32) as writer:
+            for shard in build.shards(len(documents)):
+                ids.extend(shard["ids"])
+                hashes.extend(shard["hashes"])
+                writer.append(shard["embeddings"])
+        write_json(
+            self.manifest_path,
+            {"ids": ids, "hashes": hashes, "normalized": True},
+        )
+        build.finish()
+        return self.__set_embeddings()
 
     def load_or_create_embeddings(self, documents):
+        """Load saved embeddings, re-embedding only movies that changed"""
         self.documents = documents
-        self.document_map = {}
-        for doc in documents:
-            self.document_map[doc["id"]] = doc
 
-        if os.path.exists(MOVIE_EMBEDDINGS_PATH):
-            self.embeddings = np.load(MOVIE_EMBEDDINGS_PATH)
-            if len(self.embeddings) == len(documents):
-                return self.embeddings
+        if not os.path.exists(self.embeddings_path):
+            return self.build_embeddings(documents)
+
+        embeddings = np.load(self.embeddings_path, mmap_mode="r")
+        ids, hashes = [], []
+        for doc in documents:
+            ids.append(doc["id"])
+            hashes.append(content_hash(movie_text(doc)))
+        manifest = read_manifest(self.manifest_path)
+        if manifest is None:
+            # Saved before hashes were tracked: trust it if the sizes agree.
+            if len(embeddings) != len(documents):
+                return self.build_embeddings(documents)
+            manifest = {"ids": ids, "hashes": hashes}
+        if len(manifest["ids"]) != len(embeddings):
+            return self.build_embeddings(documents)
+
+        if (
+            manifest.get("normalized")
+            and manifest["ids"] == ids
+            and manifest["hashes"] == hashes
+        ):
+            return self.__set_embeddings()
+
+        if not manifest.get("normalized"):
+            embeddings = normalize_embeddings(embeddings)
+        reuse = {
+            doc_id: (doc_hash, embeddings[i])
+            for i, (doc_id, doc_hash) in enumerate(
+                zip(manifest["ids"], manifest["hashes"])
+            )
+        }
+        return self.build_embeddings(documents, reuse)
+
+    def __set_embeddings(self):
+        # Saved embeddings are normalized, so search reads them straight from
+        # the page cache, which every process mapping the file shares.
+        self.embeddings, source = load_mapped(self.embeddings_path)
+        if self.quantization is not None:
+            self.quantized = QuantizedEmbeddings.load_or_create(
+                self.embeddings_path, self.quantization, self.embeddings, source
+            )
+        return self.embeddings
 
-        return self.build_embeddings(documents)
+    def generate_embeddings(self, texts):
+        """Embed a batch of texts with a single encode call"""
+        for text in texts:
+            if not text or not text.strip():
+                raise ValueError(
+                    f"cannot generate embedding for empty text\ngiven text: {text}"
+                )
+        return self.encoder.encode(list(texts))
 
     def search(self, query, limit=DEFAULT_SEARCH_LIMIT):
+        return self.search_many([query], limit)[0]
+
+    def search_many(self, queries, limit=DEFAULT_SEARCH_LIMIT):
+        """Search for a batch of queries, returning one result list per query
+
+        The queries are embedded in one batch and scored against every movie
+        with one matrix-matrix product per QUERY_BATCH_SIZE queries.
+        """
         if self.embeddings is None or self.embeddings.size == 0:
             raise ValueError(
                 "No embeddings loaded. Call load_or_create_embeddings first."
@@ -70,28 +178,100 @@ class SemanticSearch:
                 "No documents loaded. Call load_or_create_embeddings first."
             )
 
-        query_embedding = self.generate_embedding(query)
-
-        similarities = []
-        for i, doc_embedding in enumerate(self.embeddings):
-            similarity = cosine_similarity(query_embedding, doc_embedding)
-            similarities.append((similarity, self.documents[i]))
-
-        similarities.sort(key=lambda x: x[0], reverse=True)
+        query_embeddings = normalize_embeddings(self.generate_embeddings(queries))
+        results = []
+        if self.quantized is None:
+            rows = np.arange(len(self.embeddings))
+            for start in range(0, len(query_embeddings), QUERY_BATCH_SIZE):
+                batch = query_embeddings[start : start + QUERY_BATCH_SIZE]
+                for similarities in (self.embeddings @ batch.T).T:
+                    results.append(self.__movie_results(rows, similarities, limit))
+        else:
+            for query_embedding in query_embeddings:
+                rows, similarities = rescored_candidates(
+                    self.quantized, self.embeddings, query_embedding, limit
+                )
+                results.append(self.__movie_results(rows, similarities, limit))
+        return results
 
+    def __movie_results(self, rows, similarities, limit):
         results = []
-        for score, doc in similarities[:limit]:
+        for i in top_k_indices(similarities, limit):
+            doc = self.documents[rows[i]]
             results.append(
                 {
-                    "score": score,
+                    "score": float(similarities[i]),
                     "title": doc["title"],
                     "description": doc["description"],
                 }
             )
-
         return results
 
 
+def normalize_embeddings(embeddings: np.ndarray) -> np.ndarray:
+    """L2-normalize a vector or each row of a matrix as float32
+
+    Zero vectors are left as zeros so their cosine similarity is 0.
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+    return np.divide(
+        embeddings, norms, out=np.zeros_like(embeddings), where=norms > 0
+    )
+
+
+def load_mapped(path: str) -> tuple[np.ndarray, str]:
+    """Memory-map a saved .npy and return it with its file_fingerprint"""
+    while True:
+        before = file_fingerprint(path)
+        array = np.load(path, mmap_mode="r")
+        # Retry if a rebuild replaced the file between the two looks.
+        if file_fingerprint(path) == before:
+            return array, before
+
+
+def read_manifest(path: str) -> dict | None:
+    """Read the ids and content hashes saved alongside an embedding file"""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first, ties in index order"""
+    if k <= 0 or len(scores) == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        # argpartition breaks ties at the k-th score arbitrarily; keep the lowest indices.
+        kth = -np.partition(-scores, k - 1)[k - 1]
+        above = np.flatnonzero(scores > kth)
+        tied = np.flatnonzero(scores == kth)[: k - len(above)]
+        candidates = np.sort(np.concatenate([above, tied]))
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def rescored_candidates(
+    quantized: QuantizedEmbeddings,
+    embeddings: np.ndarray,
+    query_embedding: np.ndarray,
+    limit: int,
+    rows: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Pick candidates with quantized scores, then rescore them exactly
+
+    Returns the candidate row ids (ascending) and their cosine similarities.
+    At least RESCORE_CANDIDATES rows, or limit if larger, are rescored.
+    """
+    approximate = quantized.scores(query_embedding, rows)
+    candidates = np.sort(top_k_indices(approximate, max(RESCORE_CANDIDATES, limit)))
+    if rows is not None:
+        candidates = rows[candidates]
+    return candidates, rescore(embeddings, candidates, query_embedding)
+
+
 def cosine_similarity(vec1, vec2):
     dot_product = np.dot(vec1, vec2)
     norm1 = np.linalg.norm(vec1)
@@ -121,12 +301,23 @@ def verify_embeddings():
     search_instance = SemanticSearch()
     documents = load_movies()
     embeddings = search_instance.load_or_create_embeddings(documents)
+    if search_instance.build_stats is not None:
+        print_build_stats(search_instance.build_stats, "movies")
     print(f"Number of docs:   {len(documents)}")
     print(
         f"Embeddings shape: {embeddings.shape[0]} vectors in {embeddings.shape[1]} dimensions"
     )
 
 
+def print_build_stats(stats: dict, label: str) -> None:
+    print(
+        f"Embedded {stats['encoded']} {label} in {stats['seconds']:.1f} s "
+        f"({stats['per_second']:.1f} {label}/s); "
+        f"{stats['resumed_shards']}/{stats['shards']} shards resumed, "
+        f"{stats['reused_documents']} movies reused"
+    )
+
+
 def embed_query_text(query):
     search_instance = SemanticSearch()
     embedding = search_instance.generate_embedding(query)
@@ -136,11 +327,7 @@ def embed_query_text(query):
 
 
 def semantic_search(query, limit=DEFAULT_SEARCH_LIMIT):
-    search_instance = SemanticSearch()
-    documents = load_movies()
-    search_instance.load_or_create_embeddings(documents)
-
-    results = search_instance.search(query, limit)
+    results = call_search_service("semantic_search", query=query, limit=limit)
 
     print(f"Query: {query}")
     print(f"Top {len(results)} results:")
@@ -213,6 +400,21 @@ def semantic_chunk(
     return chunks
 
 
+def movie_text(doc: dict) -> str:
+    """Text a movie is embedded from"""
+    return f"{doc['title']}: {doc['description']}"
+
+
+def movie_chunks(doc: dict) -> list[str]:
+    """Chunks of a movie's description, each embedded separately"""
+    text = doc.get("description", "")
+    if not text.strip():
+        return []
+    return semantic_chunk(
+        text, max_chunk_size=DEFAULT_SEMANTIC_CHUNK_SIZE, overlap=DEFAULT_CHUNK_OVERLAP
+    )
+
+
 def semantic_chunk_text(
     text: str,
     max_chunk_size: int = DEFAULT_SEMANTIC_CHUNK_SIZE,
@@ -225,100 +427,268 @@ def semantic_chunk_text(
 
 
 class ChunkedSemanticSearch(SemanticSearch):
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2") -> None:
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        quantization: str | None = None,
+        encode_workers: int | None = None,
+    ) -> None:
         """Initialize chunked semantic search"""
-        super().__init__(model_name)
+        super().__init__(model_name, quantization, encode_workers)
         self.chunk_embeddings = None
+        # file_fingerprint of the loaded chunk embeddings file.
+        self.chunk_fingerprint: str | None = None
+        self.chunk_quantized: QuantizedEmbeddings | None = None
         self.chunk_metadata = None
-
-    def build_chunk_embeddings(self, documents: list[dict]) -> np.ndarray:
+        self.chunk_movie_idx = None
+        self.chunked_movies = None
+        self.ann_index: IVFIndex | None = None
+
+    def build_chunk_embeddings(
+        self,
+        documents: list[dict],
+        reuse: dict[int, tuple[str, np.ndarray]] | None = None,
+    ) -> np.ndarray:
+        """Chunk and embed every movie description
+
+        Descriptions are chunked on the build's reader thread while the
+        previous shard is encoded; see EmbeddingBuild.
+
+        Args:
+            documents: Movies to chunk and embed
+            reuse: Optional movie id -> (description hash, normalized chunk
+                embeddings) of chunks that are still valid if the description is
+                unchanged
+        """
         self.documents = documents
-
-        self.document_map = {}
-        for doc in documents:
-            self.document_map[doc["id"]] = doc
-
-        all_chunks = []
-        chunk_metadata = []
-
-        for idx, doc in enumerate(documents):
-            text = doc.get("description", "")
-            if not text.strip():
-                continue
-
-            chunks = semantic_chunk(
-                text,
-                max_chunk_size=DEFAULT_SEMANTIC_CHUNK_SIZE,
-                overlap=DEFAULT_CHUNK_OVERLAP,
+        with pooled_encoder(self.encoder, self.encode_workers) as encoder:
+            build = EmbeddingBuild(CHUNK_EMBEDDING_SHARDS_DIR, encoder, "chunks")
+            build.run(
+                documents,
+                key=lambda doc: (doc["id"], content_hash(doc.get("description", ""))),
+                texts=movie_chunks,
+                reuse=reuse,
             )
+        self.build_stats = build.stats
 
-            for i, chunk in enumerate(chunks):
-                all_chunks.append(chunk)
+        ids, hashes = [], []
+        with (
+            NpyWriter(CHUNK_EMBEDDINGS_PATH, np.float32) as chunk_rows,
+            NpyWriter(CHUNK_METADATA_PATH, np.int32, width=3) as chunk_metadata,
+        ):
+            for shard in build.shards(len(documents)):
+                ids.extend(shard["ids"])
+                hashes.extend(shard["hashes"])
+                chunk_rows.append(shard["embeddings"])
                 chunk_metadata.append(
-                    {"movie_idx": idx, "chunk_idx": i, "total_chunks": len(chunks)}
+                    [
+                        (shard["start"] + i, j, count)
+                        for i, count in enumerate(shard["counts"].tolist())
+                        for j in range(count)
+                    ]
                 )
 
-        self.chunk_embeddings = self.model.encode(all_chunks, show_progress_bar=True)
-        self.chunk_metadata = chunk_metadata
+        write_json(
+            CHUNK_MANIFEST_PATH,
+            {
+                "ids": ids,
+                "hashes": hashes,
+                "total_chunks": chunk_rows.rows,
+                "normalized": True,
+            },
+        )
+        build.finish()
+        if os.path.exists(LEGACY_CHUNK_METADATA_PATH):
+            os.remove(LEGACY_CHUNK_METADATA_PATH)
+
+        self.__set_chunks()
+        return self.chunk_embeddings
 
-        os.makedirs(os.path.dirname(CHUNK_EMBEDDINGS_PATH), exist_ok=True)
-        np.save(CHUNK_EMBEDDINGS_PATH, self.chunk_embeddings)
-        with open(CHUNK_METADATA_PATH, "w") as f:
-            json.dump(
-                {"chunks": chunk_metadata, "total_chunks": len(all_chunks)}, f, indent=2
+    def __set_chunks(self):
+        self.chunk_embeddings, self.chunk_fingerprint = load_mapped(
+            CHUNK_EMBEDDINGS_PATH
+        )
+        if self.quantization is not None:
+            self.chunk_quantized = QuantizedEmbeddings.load_or_create(
+                CHUNK_EMBEDDINGS_PATH,
+                self.quantization,
+                self.chunk_embeddings,
+                self.chunk_fingerprint,
             )
-
-        return self.chunk_embeddings
+        self.chunk_metadata = np.load(CHUNK_METADATA_PATH, mmap_mode="r")
+        self.chunk_movie_idx = self.chunk_metadata[:, 0]
+        self.chunked_movies = np.unique(self.chunk_movie_idx)
+        self.ann_index = None
 
     def load_or_create_chunk_embeddings(self, documents: list[dict]) -> np.ndarray:
-        self.document_map = {}
-        for doc in documents:
-            self.document_map[doc["id"]] = doc
+        """Load saved chunk embeddings, re-embedding only movies that changed"""
         self.documents = documents
 
-        if os.path.exists(CHUNK_EMBEDDINGS_PATH) and os.path.exists(
-            CHUNK_METADATA_PATH
-        ):
-            self.chunk_embeddings = np.load(CHUNK_EMBEDDINGS_PATH)
-            with open(CHUNK_METADATA_PATH, "r") as f:
+        if not os.path.exists(CHUNK_EMBEDDINGS_PATH):
+            return self.build_chunk_embeddings(documents)
+
+        ids, hashes = [], []
+        for doc in documents:
+            ids.append(doc["id"])
+            hashes.append(content_hash(doc.get("description", "")))
+        manifest = read_manifest(CHUNK_MANIFEST_PATH)
+        if manifest is not None and os.path.exists(CHUNK_METADATA_PATH):
+            movie_idx = np.load(CHUNK_METADATA_PATH, mmap_mode="r")[:, 0]
+        elif os.path.exists(LEGACY_CHUNK_METADATA_PATH):
+            with open(LEGACY_CHUNK_METADATA_PATH, "r") as f:
                 data = json.load(f)
-                self.chunk_metadata = data["chunks"]
+            movie_idx = np.array(
+                [m["movie_idx"] for m in data["chunks"]], dtype=np.int32
+            )
+            if "movies" in data:
+                manifest = {
+                    "ids": [m["id"] for m in data["movies"]],
+                    "hashes": [m["hash"] for m in data["movies"]],
+                }
+            else:
+                # Saved before hashes were tracked: trust it if it fits the catalog.
+                manifest = {"ids": ids, "hashes": hashes}
+        else:
+            return self.build_chunk_embeddings(documents)
+
+        chunk_embeddings = np.load(CHUNK_EMBEDDINGS_PATH, mmap_mode="r")
+        if len(movie_idx) != len(chunk_embeddings) or np.any(
+            movie_idx >= len(manifest["ids"])
+        ):
+            return self.build_chunk_embeddings(documents)
+
+        if (
+            manifest.get("normalized")
+            and manifest["ids"] == ids
+            and manifest["hashes"] == hashes
+        ):
+            self.__set_chunks()
             return self.chunk_embeddings
 
-        return self.build_chunk_embeddings(documents)
+        if not manifest.get("normalized"):
+            chunk_embeddings = normalize_embeddings(chunk_embeddings)
+        rows = defaultdict(list)
+        for row, idx in enumerate(movie_idx.tolist()):
+            rows[idx].append(row)
+        reuse = {
+            doc_id: (doc_hash, chunk_embeddings[rows[idx]])
+            for idx, (doc_id, doc_hash) in enumerate(
+                zip(manifest["ids"], manifest["hashes"])
+            )
+        }
+        return self.build_chunk_embeddings(documents, reuse)
 
-    def search_chunks(self, query: str, limit: int = 10) -> list[dict]:
-        if self.chunk_embeddings is None or self.chunk_metadata is None:
+    def load_or_create_ann_index(self, nlist: int | None = None) -> IVFIndex:
+        """Load the IVF index for the loaded chunk embeddings, building it if stale"""
+        if self.chunk_embeddings is None:
             raise ValueError(
                 "No chunk embeddings loaded. Call load_or_create_chunk_embeddings first."
             )
+        if os.path.exists(CHUNK_ANN_INDEX_PATH):
+            ann_index = IVFIndex.load(CHUNK_ANN_INDEX_PATH)
+            if ann_index.fingerprint == self.chunk_fingerprint and nlist in (
+                None,
+                ann_index.nlist,
+            ):
+                self.ann_index = ann_index
+                return ann_index
+
+        self.ann_index = IVFIndex.build(
+            self.chunk_embeddings, nlist, fingerprint=self.chunk_fingerprint
+        )
+        self.ann_index.save(CHUNK_ANN_INDEX_PATH)
+        return self.ann_index
+
+    def search_chunks(
+        self, query: str, limit: int = 10, nprobe: int | None = None
+    ) -> list[dict]:
+        """Rank movies by their best-matching chunk
+
+        Args:
+            query: Search query
+            limit: Number of movies to return
+            nprobe: Scan only this many IVF lists instead of every chunk
+        """
+        return self.search_chunks_many([query], limit, nprobe)[0]
+
+    def search_chunks_many(
+        self, queries: list[str], limit: int = 10, nprobe: int | None = None
+    ) -> list[list[dict]]:
+        """search_chunks for a batch of queries, one result list per query"""
+        results = []
+        for movie_scores in self.movie_scores_many(queries, limit, nprobe):
+            candidate_movies = np.flatnonzero(np.isfinite(movie_scores))
+            results.append(
+                self.__chunk_results(
+                    candidate_movies, movie_scores[candidate_movies], limit
+                )
+            )
+        return results
 
-        query_embedding = self.generate_embedding(query)
+    def movie_scores_many(
+        self, queries: list[str], limit: int = 10, nprobe: int | None = None
+    ) -> np.ndarray:
+        """Best chunk similarity of every movie, one row per query
 
-        chunk_scores = []
-        for i, chunk_embedding in enumerate(self.chunk_embeddings):
-            similarity = cosine_similarity(query_embedding, chunk_embedding)
-            chunk_scores.append(
-                {
-                    "chunk_idx": i,
-                    "movie_idx": self.chunk_metadata[i]["movie_idx"],
-                    "score": similarity,
-                }
+        The queries are embedded in one batch. An exact search scores every
+        chunk with one matrix-matrix product per QUERY_BATCH_SIZE queries.
+        Movies without chunks, or outside the IVF / quantized candidates,
+        score -inf. limit is the number of movies the caller will keep.
+        """
+        if self.chunk_embeddings is None or self.chunk_metadata is None:
+            raise ValueError(
+                "No chunk embeddings loaded. Call load_or_create_chunk_embeddings first."
             )
 
-        movie_scores = {}
-        for chunk_score in chunk_scores:
-            movie_idx = chunk_score["movie_idx"]
-            if (
-                movie_idx not in movie_scores
-                or chunk_score["score"] > movie_scores[movie_idx]
-            ):
-                movie_scores[movie_idx] = chunk_score["score"]
-
-        sorted_movies = sorted(movie_scores.items(), key=lambda x: x[1], reverse=True)
+        query_embeddings = normalize_embeddings(self.generate_embeddings(queries))
+        movie_scores = np.full(
+            (len(queries), len(self.documents)), -np.inf, dtype=np.float32
+        )
+        if nprobe is not None or self.chunk_quantized is not None:
+            for query_embedding, scores in zip(query_embeddings, movie_scores):
+                self.__score_chunk_candidates(query_embedding, limit, nprobe, scores)
+            return movie_scores
+
+        for start in range(0, len(query_embeddings), QUERY_BATCH_SIZE):
+            batch = query_embeddings[start : start + QUERY_BATCH_SIZE]
+            chunk_scores = self.chunk_embeddings @ batch.T
+            # A movie scores as its best-matching chunk.
+            np.maximum.at(
+                movie_scores[start : start + len(batch)].T,
+                self.chunk_movie_idx,
+                chunk_scores,
+            )
+        return movie_scores
+
+    def __score_chunk_candidates(
+        self,
+        query_embedding: np.ndarray,
+        limit: int,
+        nprobe: int | None,
+        movie_scores: np.ndarray,
+    ) -> None:
+        """Score only IVF candidates and/or rescored quantized candidates"""
+        rows = None
+        if nprobe is not None:
+            if self.ann_index is None:
+                self.load_or_create_ann_index()
+            rows = self.ann_index.candidates(query_embedding, nprobe)
+
+        if self.chunk_quantized is not None:
+            rows, chunk_scores = rescored_candidates(
+                self.chunk_quantized, self.chunk_embeddings, query_embedding, limit, rows
+            )
+        else:
+            chunk_scores = self.chunk_embeddings[rows] @ query_embedding
+        np.maximum.at(movie_scores, self.chunk_movie_idx[rows], chunk_scores)
 
+    def __chunk_results(
+        self, candidate_movies: np.ndarray, candidate_scores: np.ndarray, limit: int
+    ) -> list[dict]:
         results = []
-        for movie_idx, score in sorted_movies[:limit]:
+        for i in top_k_indices(candidate_scores, limit):
+            movie_idx = candidate_movies[i]
+            score = float(candidate_scores[i])
             doc = self.documents[movie_idx]
             results.append(
                 format_search_result(
@@ -328,19 +698,27 @@ class ChunkedSemanticSearch(SemanticSearch):
                     score=score,
                 )
             )
-
         return results
 
 
-def embed_chunks_command() -> np.ndarray:
+def embed_chunks_command(workers: int | None = None) -> tuple[np.ndarray, dict | None]:
+    """Chunk embeddings, and the build's throughput if any had to be embedded"""
     movies = load_movies()
-    searcher = ChunkedSemanticSearch()
-    return searcher.load_or_create_chunk_embeddings(movies)
+    searcher = ChunkedSemanticSearch(encode_workers=workers)
+    embeddings = searcher.load_or_create_chunk_embeddings(movies)
+    return embeddings, searcher.build_stats
 
 
-def search_chunked_command(query: str, limit: int = DEFAULT_SEARCH_LIMIT) -> dict:
-    movies = load_movies()
+def build_ann_index_command(nlist: int | None = None) -> IVFIndex:
     searcher = ChunkedSemanticSearch()
-    searcher.load_or_create_chunk_embeddings(movies)
-    results = searcher.search_chunks(query, limit)
+    searcher.load_or_create_chunk_embeddings(load_movies())
+    return searcher.load_or_create_ann_index(nlist)
+
+
+def search_chunked_command(
+    query: str, limit: int = DEFAULT_SEARCH_LIMIT, nprobe: int | None = None
+) -> dict:
+    results = call_search_service(
+        "search_chunks", query=query, limit=limit, nprobe=nprobe
+    )
     return {"query": query, "results": results}
@@ -16,6 +16,12 @@ def main():
         "image_search", help="Search movie by providing the image path"
     )
     image_search_parser.add_argument("image", type=str, help="image path")
+    image_search_parser.add_argument(
+        "--workers",
+        type=int,
+        help="Encode the catalog text on this many worker processes "
+        "(default $HOOPLA_ENCODE_WORKERS or 1)",
+    )
 
     args = parser.parse_args()
 
@@ -25,7 +31,7 @@ def main():
             verify_image_embedding(image)
         case "image_search":
             image = args.image
-            image_search_command(image)
+            image_search_command(image, args.workers)
         case _:
             parser.print_help()
 
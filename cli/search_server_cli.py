@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+
+import argparse
+
+from lib.search_client import get_server_address, server_is_running
+from lib.search_server import serve_command
+from lib.search_utils import SEARCH_SERVER_HOST, SEARCH_SERVER_PORT
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Search Server CLI")
+    subparsers = parser.add_subparsers(dest="command", help="Available commands")
+
+    serve_parser = subparsers.add_parser(
+        "serve", help="Keep the indexes and models loaded and serve search queries"
+    )
+    serve_parser.add_argument(
+        "--host", type=str, default=SEARCH_SERVER_HOST, help="Address to bind to"
+    )
+    serve_parser.add_argument(
+        "--port", type=int, default=SEARCH_SERVER_PORT, help="Port to listen on"
+    )
+
+    subparsers.add_parser("status", help="Check whether the search server is running")
+
+    args = parser.parse_args()
+
+    match args.command:
+        case "serve":
+            serve_command(args.host, args.port)
+        case "status":
+            address = get_server_address()
+            if address is None:
+                print("Search server is disabled; searches run in-process.")
+            elif server_is_running():
+                print(f"Search server is running on {address[0]}:{address[1]}")
+            else:
+                print(f"No search server on {address[0]}:{address[1]}")
+        case _:
+            parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,14 @@
 
 import argparse
 
+from lib.search_utils import DEFAULT_ANN_NPROBE
 from lib.semantic_search import (
+    build_ann_index_command,
     chunk_text,
     embed_chunks_command,
     embed_query_text,
     embed_text,
+    print_build_stats,
     search_chunked_command,
     semantic_chunk_text,
     semantic_search,
@@ -83,10 +86,16 @@ def main() -> None:
         help="Number of sentences to overlap between chunks",
     )
 
-    subparsers.add_parser(
+    embed_chunks_parser = subparsers.add_parser(
         "embed_chunks",
         help="Generate embeddings for chunked documents",
     )
+    embed_chunks_parser.add_argument(
+        "--workers",
+        type=int,
+        help="Encode on this many worker processes, each with its own model "
+        "(default $HOOPLA_ENCODE_WORKERS or 1)",
+    )
 
     search_chunked_parser = subparsers.add_parser(
         "search_chunked",
@@ -96,6 +105,21 @@ def main() -> None:
     search_chunked_parser.add_argument(
         "--limit", type=int, default=5, help="Number of results to return"
     )
+    search_chunked_parser.add_argument(
+        "--nprobe",
+        type=int,
+        nargs="?",
+        const=DEFAULT_ANN_NPROBE,
+        help=f"Use the IVF index and scan this many lists (default {DEFAULT_ANN_NPROBE})",
+    )
+
+    build_ann_parser = subparsers.add_parser(
+        "build_ann",
+        help="Build the IVF approximate nearest-neighbour index over chunk embeddings",
+    )
+    build_ann_parser.add_argument(
+        "--nlist", type=int, help="Number of IVF lists (default 4 * sqrt(chunks))"
+    )
 
     args = parser.parse_args()
 
@@ -115,15 +139,23 @@ def main() -> None:
         case "semantic_chunk":
             semantic_chunk_text(args.text, args.max_chunk_size, args.overlap)
         case "embed_chunks":
-            embeddings = embed_chunks_command()
+            embeddings, stats = embed_chunks_command(args.workers)
+            if stats is not None:
+                print_build_stats(stats, "chunks")
             print(f"Generated {len(embeddings)} chunked embeddings")
         case "search_chunked":
-            result = search_chunked_command(args.query, args.limit)
+            result = search_chunked_command(args.query, args.limit, args.nprobe)
             print(f"Query: {result['query']}")
             print("Results:")
             for i, res in enumerate(result["results"], 1):
                 print(f"\n{i}. {res['title']} (score: {res['score']:.4f})")
                 print(f"   {res['document']}...")
+        case "build_ann":
+            ann_index = build_ann_index_command(args.nlist)
+            print(
+                f"Built IVF index with {ann_index.nlist} lists over "
+                f"{len(ann_index.list_ids)} chunks"
+            )
         case _:
             parser.print_help()
 
@@ -1,17 +1,38 @@
+import argparse
 import os
-from dotenv import load_dotenv
-from google import genai
-
-load_dotenv()
-api_key = os.environ.get("GEMINI_API_KEY")
-print(f"Using key {api_key[:6]}...")
-
-client = genai.Client(api_key=api_key)
-response = client.models.generate_content(
-    model="gemini-2.0-flash-001",
-    contents="Why is Boot.dev such a great place to learn about RAG? Use one paragraph maximum.",
-)
-
-print(f"Prompt Tokens: {response.usage_metadata.prompt_token_count}")
-print(f"Response Tokens: {response.usage_metadata.candidates_token_count}\n")
-print(f"Response:\n{response.text}")
+import time
+
+from lib.llm_client import get_llm_client
+
+PROMPT = "Why is Boot.dev such a great place to learn about RAG? Use one paragraph maximum."
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gemini smoke test")
+    parser.add_argument(
+        "--requests",
+        type=int,
+        default=1,
+        help="Number of concurrent requests to send through the shared client",
+    )
+    args = parser.parse_args()
+
+    api_key = os.environ.get("GEMINI_API_KEY") or ""
+    print(f"Using key {api_key[:6]}...")
+
+    llm = get_llm_client()
+    start = time.perf_counter()
+    # Always hit the API; cached responses carry no usage metadata.
+    responses = llm.generate_many([PROMPT] * args.requests, use_cache=False)
+    elapsed = time.perf_counter() - start
+
+    response = responses[0]
+    print(f"Prompt Tokens: {response.usage_metadata.prompt_token_count}")
+    print(f"Response Tokens: {response.usage_metadata.candidates_token_count}\n")
+    print(f"Response:\n{response.text}")
+    if args.requests > 1:
+        print(f"\n{args.requests} requests in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from lib.doc_store import DocStore
+
+MOVIES = [
+    {"id": 1, "title": "Space Pirates", "description": "Pirates raid a space station."},
+    {"id": 2, "title": "Pirate Bay", "description": "A pirate crew hunts buried treasure."},
+    {"id": 3, "title": "Haunted House", "description": "A family moves into a haunted house."},
+    {"id": 4, "title": "The Station", "description": "A lonely guard keeps the station."},
+    {"id": 5, "title": "Treasure Planet", "description": "Treasure hunters cross space."},
+    {"id": 6, "title": "Quiet Garden", "description": "Two friends tend a garden."},
+    {"id": 7, "title": "House of Pirates", "description": "Pirates hide in an old house."},
+    {"id": 8, "title": "Deep Space", "description": "A crew wakes up in deep space."},
+    # A remake with the same text, so scores tie and ids decide the order.
+    {"id": 9, "title": "Space Pirates", "description": "Pirates raid a space station."},
+]
+
+QUERIES = [
+    "space pirates",
+    "haunted house",
+    "treasure",
+    "station crew",
+    "garden friends",
+    "pirates treasure space house",
+]
+
+
+class CorpusTestCase(unittest.TestCase):
+    """Runs keyword search on a small catalog under a temporary cache directory
+
+    The index and the catalog's doc store live in self.directory, and
+    load_movies() returns whatever catalog set_catalog() last stored.
+    """
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+        self.set_catalog(MOVIES)
+        for target, value in (
+            ("lib.keyword_search.CACHE_DIR", self.directory),
+            ("lib.keyword_search.load_movies", lambda: self.catalog),
+        ):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def set_catalog(self, movies: list[dict]) -> DocStore:
+        source = os.path.join(self.directory, "movies.json")
+        with open(source, "w") as f:
+            json.dump({"movies": movies}, f)
+        self.catalog = DocStore.build(
+            movies, os.path.join(self.directory, "doc_store"), source
+        )
+        return self.catalog
@@ -0,0 +1,68 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from lib.doc_store import DocStore, open_doc_store
+from lib.index_segment import SEGMENT_DIR_PREFIX
+
+from corpus import MOVIES
+
+
+class TestDocStore(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = os.path.join(tmp.name, "doc_store")
+        self.source = os.path.join(tmp.name, "movies.json")
+        self.write_source(MOVIES)
+
+    def write_source(self, movies: list[dict]) -> None:
+        with open(self.source, "w") as f:
+            json.dump({"movies": movies}, f)
+
+    def store_dirs(self) -> set[str]:
+        return {n for n in os.listdir(self.directory) if n.startswith(SEGMENT_DIR_PREFIX)}
+
+    def test_round_trip(self):
+        movies = MOVIES + [{"id": 10, "title": "Été", "description": "", "year": 2001}]
+        store = DocStore.build(movies, self.directory, self.source)
+        self.assertEqual(list(store), movies)
+        self.assertEqual(store.index_of(10), len(movies) - 1)
+
+    def test_open_rebuilds_only_when_stale(self):
+        open_doc_store(self.directory, self.source, MOVIES)
+        with mock.patch.object(DocStore, "build", side_effect=AssertionError):
+            store = open_doc_store(self.directory, self.source, MOVIES)
+        self.assertEqual(list(store), MOVIES)
+
+        movies = MOVIES[:3]
+        self.write_source(movies)
+        os.utime(self.source, ns=(0, 0))
+        self.assertEqual(list(open_doc_store(self.directory, self.source, movies)), movies)
+
+    def test_concurrent_builds_do_not_mix(self):
+        other = MOVIES[:2]
+
+        def movies_with_a_rebuild_midway():
+            for i, movie in enumerate(MOVIES):
+                if i == 4:
+                    self.inner = DocStore.build(other, self.directory, self.source)
+                yield movie
+
+        outer = DocStore.build(movies_with_a_rebuild_midway(), self.directory, self.source)
+        self.assertEqual(list(self.inner), other)
+        self.assertEqual(list(outer), MOVIES)
+        # The last build to finish is the live one.
+        self.assertEqual(list(open_doc_store(self.directory, self.source, [])), MOVIES)
+
+        for _ in range(3):
+            DocStore.build(MOVIES, self.directory, self.source)
+        self.assertEqual(len(self.store_dirs()), 2)
+        # Stores already opened stay readable after their directory is removed.
+        self.assertEqual(list(outer), MOVIES)
+
+
+if __name__ == "__main__":
+    unittest.main()
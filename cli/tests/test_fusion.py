@@ -0,0 +1,144 @@
+import math
+import unittest
+
+import numpy as np
+
+from lib.fusion import (
+    RankedList,
+    fuse,
+    fuse_scores,
+    min_max_fusion,
+    rrf_fusion,
+)
+
+K = 60
+
+
+def random_scores(rng, num_lists: int, num_docs: int) -> np.ndarray:
+    """Integer scores, so ties are common, with about a third not retrieved"""
+    scores = rng.integers(0, 6, size=(num_lists, num_docs)).astype(np.float64)
+    scores[rng.random(scores.shape) < 0.35] = -np.inf
+    return scores
+
+
+def ranked_entries(row: np.ndarray, max_depth: int | None = None) -> list[tuple[int, float]]:
+    """(doc, score) of a retriever's results in rank order, ties by doc index"""
+    entries = sorted(
+        ((doc, float(score)) for doc, score in enumerate(row) if math.isfinite(score)),
+        key=lambda entry: (-entry[1], entry[0]),
+    )
+    return entries if max_depth is None else entries[:max_depth]
+
+
+def brute_force_fuse(scores, max_depth, method, limit, weights):
+    """Fuse the full lists one document at a time"""
+    lists = [ranked_entries(row, max_depth) for row in scores]
+    ranks = [{doc: rank for rank, (doc, _) in enumerate(entries, 1)} for entries in lists]
+    fused = {}
+    for i, entries in enumerate(lists):
+        for rank, (doc, score) in enumerate(entries, 1):
+            if method == "rrf":
+                value = 1 / (K + rank)
+            else:
+                top, bottom = entries[0][1], entries[-1][1]
+                value = 1.0 if top == bottom else (score - bottom) / (top - bottom)
+            fused[doc] = fused.get(doc, 0.0) + weights[i] * value
+
+    def key(doc):
+        # Ties go to the document ranked higher in the first list, then the next.
+        return (-fused[doc], *(r.get(doc, math.inf) for r in ranks))
+
+    top_docs = sorted(fused, key=key)[:limit]
+    return top_docs, [fused[doc] for doc in top_docs]
+
+
+class TestFuse(unittest.TestCase):
+    def test_matches_brute_force(self):
+        rng = np.random.default_rng(0)
+        fusions = {"rrf": rrf_fusion(K), "min_max": min_max_fusion()}
+        for trial in range(200):
+            num_docs = int(rng.integers(1, 60))
+            scores = random_scores(rng, 2, num_docs)
+            max_depth = int(rng.integers(1, num_docs + 5))
+            # Limits past the list sizes read every list to the end.
+            limit = int(rng.integers(1, num_docs + 10))
+            weights = [1.0, 1.0] if trial % 2 else [1.0, 2.0]
+            for method, fusion in fusions.items():
+                with self.subTest(trial=trial, method=method):
+                    lists = [RankedList(row, max_depth) for row in scores]
+                    docs, fused, _, _ = fuse(lists, fusion, limit, weights)
+                    expected_docs, expected_scores = brute_force_fuse(
+                        scores, max_depth, method, limit, weights
+                    )
+                    self.assertEqual(docs.tolist(), expected_docs)
+                    np.testing.assert_allclose(fused, expected_scores, rtol=1e-12)
+
+    def test_ranks_and_contributions_match_the_lists(self):
+        scores = np.array([[3.0, 1.0, 3.0, -np.inf, 2.0], [-np.inf, 5.0, 5.0, 4.0, 1.0]])
+        lists = [RankedList(row, max_depth=3) for row in scores]
+        docs, fused, contributions, ranks = fuse(lists, rrf_fusion(K), limit=10)
+        expected_ranks = {0: (1, 0), 1: (0, 1), 2: (2, 2), 3: (0, 3), 4: (3, 0)}
+        for j, doc in enumerate(docs.tolist()):
+            self.assertEqual(tuple(ranks[:, j].tolist()), expected_ranks[doc])
+            expected = [1 / (K + r) if r else 0.0 for r in expected_ranks[doc]]
+            np.testing.assert_allclose(contributions[:, j], expected)
+            self.assertAlmostEqual(fused[j], sum(expected))
+
+    def test_empty_lists(self):
+        lists = [RankedList(np.full(4, -np.inf), 10) for _ in range(2)]
+        docs, fused, _, _ = fuse(lists, rrf_fusion(K), limit=3)
+        self.assertEqual(len(docs), 0)
+        self.assertEqual(len(fused), 0)
+
+
+def brute_force_normalize(row: np.ndarray, method: str) -> list[float]:
+    present = [float(s) for s in row if math.isfinite(s)]
+    if method == "rrf":
+        ranks = {doc: rank for rank, (doc, _) in enumerate(ranked_entries(row), 1)}
+        return [1 / (K + ranks[doc]) if doc in ranks else 0.0 for doc in range(len(row))]
+    if method == "min_max":
+        if not present:
+            return [0.0] * len(row)
+        low, high = min(present), max(present)
+        return [
+            (1.0 if high == low else (s - low) / (high - low)) if math.isfinite(s) else 0.0
+            for s in row
+        ]
+    # z_score: population standard deviation over retrieved documents
+    if not present:
+        return [0.0] * len(row)
+    mean = sum(present) / len(present)
+    std = math.sqrt(sum((s - mean) ** 2 for s in present) / len(present))
+    z = [(s - mean) / std if std > 0 else 0.0 for s in present]
+    floor = min(z)
+    values = iter(z)
+    return [next(values) if math.isfinite(s) else floor for s in row]
+
+
+class TestFuseScores(unittest.TestCase):
+    def test_kernels_match_brute_force(self):
+        rng = np.random.default_rng(1)
+        for trial in range(100):
+            num_lists = int(rng.integers(1, 4))
+            scores = random_scores(rng, num_lists, int(rng.integers(1, 40)))
+            if trial % 10 == 0:
+                scores[0] = -np.inf
+            weights = rng.random(num_lists).tolist()
+            for method in ("rrf", "min_max", "z_score"):
+                with self.subTest(trial=trial, method=method):
+                    fused, normalized = fuse_scores(scores, method, weights, K)
+                    expected = np.array(
+                        [brute_force_normalize(row, method) for row in scores]
+                    )
+                    np.testing.assert_allclose(normalized, expected, atol=1e-12)
+                    np.testing.assert_allclose(
+                        fused, np.asarray(weights) @ expected, atol=1e-12
+                    )
+
+    def test_unknown_method(self):
+        with self.assertRaises(ValueError):
+            fuse_scores(np.zeros((1, 3)), "borda")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+import os
+import unittest
+from unittest import mock
+
+from lib import keyword_search
+from lib.index_segment import SEGMENT_DIR_PREFIX, current_segment
+from lib.keyword_search import InvertedIndex
+
+from corpus import MOVIES, QUERIES, CorpusTestCase
+
+
+def changed_catalog() -> list[dict]:
+    """MOVIES with one movie updated, one deleted and one added"""
+    movies = [dict(m) for m in MOVIES if m["id"] != 4]
+    movies[1]["description"] = "A pirate crew finds a haunted station."
+    movies.append({"id": 10, "title": "Garden Station", "description": "A garden in space."})
+    return movies
+
+
+def snapshot(idx: InvertedIndex) -> dict:
+    """Everything a search can observe about an index"""
+    doc_ids = sorted(idx.get_doc_ids())
+    return {
+        "doc_count": idx.doc_count,
+        "documents": {doc_id: idx.get_document(doc_id) for doc_id in doc_ids},
+        "hashes": {doc_id: idx.get_document_hash(doc_id) for doc_id in doc_ids},
+        "results": {
+            query: [
+                (r["id"], round(r["score"], 9))
+                for r in idx.bm25_search(query, len(doc_ids) + 1)
+            ]
+            for query in QUERIES
+        },
+    }
+
+
+class TestIndexUpdates(CorpusTestCase):
+    def setUp(self):
+        super().setUp()
+        idx = InvertedIndex()
+        idx.build()
+        idx.save()
+        self.idx = InvertedIndex()
+        self.idx.load()
+
+        movies = changed_catalog()
+        self.set_catalog(movies)
+        fresh = InvertedIndex()
+        fresh.build()
+        self.expected = snapshot(fresh)
+
+    def segment_dirs(self) -> set[str]:
+        return {
+            name
+            for name in os.listdir(self.idx.index_dir)
+            if name.startswith(SEGMENT_DIR_PREFIX)
+        }
+
+    def test_sync_matches_a_fresh_build(self):
+        stats = self.idx.sync(self.catalog)
+        self.assertEqual(
+            stats, {"added": 1, "updated": 1, "deleted": 1, "unchanged": len(MOVIES) - 2}
+        )
+        self.assertTrue(self.idx.has_pending_updates)
+        self.assertEqual(snapshot(self.idx), self.expected)
+
+    def test_sync_without_changes_logs_nothing(self):
+        self.idx.sync(self.catalog)
+        size = os.path.getsize(self.idx.update_log_path)
+        stats = self.idx.sync(self.catalog)
+        self.assertEqual(stats["unchanged"], len(self.catalog))
+        self.assertEqual(os.path.getsize(self.idx.update_log_path), size)
+
+    def test_another_instance_replays_the_log(self):
+        self.idx.sync(self.catalog)
+        other = InvertedIndex()
+        other.load()
+        self.assertTrue(other.has_pending_updates)
+        self.assertEqual(snapshot(other), self.expected)
+
+    def test_loaded_instance_sees_later_updates(self):
+        other = InvertedIndex()
+        other.load()
+        self.idx.sync(self.catalog)
+        self.assertTrue(other.is_stale())
+        other.ensure_loaded()
+        self.assertEqual(snapshot(other), self.expected)
+
+    def test_compact_folds_the_log_into_a_segment(self):
+        first_segment = os.path.basename(current_segment(self.idx.index_dir))
+        self.idx.sync(self.catalog)
+        self.idx.compact()
+
+        self.assertFalse(os.path.exists(self.idx.update_log_path))
+        self.assertFalse(self.idx.has_pending_updates)
+        self.assertEqual(snapshot(self.idx), self.expected)
+        other = InvertedIndex()
+        other.load()
+        self.assertFalse(other.has_pending_updates)
+        self.assertEqual(snapshot(other), self.expected)
+
+        # The previous segment is kept for loaders caught mid-switch, no older one.
+        second_segment = os.path.basename(current_segment(self.idx.index_dir))
+        self.assertEqual(self.segment_dirs(), {first_segment, second_segment})
+        self.idx.compact()
+        third_segment = os.path.basename(current_segment(self.idx.index_dir))
+        self.assertEqual(self.segment_dirs(), {second_segment, third_segment})
+        self.assertEqual(snapshot(self.idx), self.expected)
+
+    def test_compact_keeps_updates_logged_while_it_runs(self):
+        self.idx.sync(self.catalog)
+        other = InvertedIndex()
+        other.load()
+        late = {"id": 11, "title": "Late Arrival", "description": "A ghost ship in space."}
+        write_segment = keyword_search.write_segment
+
+        def write_segment_then_update(*args, **kwargs):
+            write_segment(*args, **kwargs)
+            other.upsert_document(late)
+
+        with mock.patch.object(keyword_search, "write_segment", write_segment_then_update):
+            self.idx.compact()
+
+        with open(self.idx.update_log_path, "r") as f:
+            self.assertEqual(len(f.readlines()), 1)
+        self.assertTrue(self.idx.has_pending_updates)
+        self.assertEqual(self.idx.get_document(11), late)
+
+        self.set_catalog(self.catalog[:] + [late])
+        fresh = InvertedIndex()
+        fresh.build()
+        self.assertEqual(snapshot(self.idx), snapshot(fresh))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+from lib.keyword_search import InvertedIndex
+
+from corpus import MOVIES, QUERIES, CorpusTestCase
+
+
+class TestBM25Search(CorpusTestCase):
+    def test_returns_only_documents_matching_a_query_term(self):
+        idx = InvertedIndex()
+        idx.build()
+        results = idx.bm25_search("haunted house", limit=len(MOVIES))
+        self.assertEqual([r["id"] for r in results], [3, 7])
+        self.assertTrue(all(r["score"] > 0 for r in results))
+
+    def test_returns_nothing_when_no_term_matches(self):
+        idx = InvertedIndex()
+        idx.build()
+        self.assertEqual(idx.bm25_search("submarine", limit=len(MOVIES)), [])
+
+
+class TestWand(CorpusTestCase):
+    """WAND over impact postings must rank exactly like term-at-a-time BM25"""
+
+    def assert_same_results(self, plain: InvertedIndex, impacts: InvertedIndex, places):
+        self.assertFalse(plain.has_impacts)
+        self.assertTrue(impacts.has_impacts)
+        for query in QUERIES:
+            for limit in (1, 2, 3, len(MOVIES) + 1):
+                with self.subTest(query=query, limit=limit):
+                    expected = plain.bm25_search(query, limit)
+                    actual = impacts.bm25_search(query, limit)
+                    self.assertEqual([r["id"] for r in actual], [r["id"] for r in expected])
+                    for a, e in zip(actual, expected):
+                        self.assertAlmostEqual(a["score"], e["score"], places=places)
+
+    def test_in_memory(self):
+        plain, impacts = InvertedIndex(), InvertedIndex()
+        plain.build()
+        impacts.build(impacts=True)
+        self.assert_same_results(plain, impacts, places=12)
+
+    def test_after_save_and_load(self):
+        plain = InvertedIndex()
+        plain.build()
+        plain.save()
+        plain.load()
+        impacts = InvertedIndex()
+        impacts.build(impacts=True)
+        impacts.save()
+        impacts.load()
+        # Segments store impacts as float32.
+        self.assert_same_results(plain, impacts, places=5)
+
+
+if __name__ == "__main__":
+    unittest.main()
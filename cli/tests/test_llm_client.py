@@ -0,0 +1,169 @@
+import asyncio
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from google.genai import errors
+
+from lib.hybrid_search import rerank_method
+from lib.llm_client import LLMClient
+
+# High enough that the token bucket never holds a test back.
+UNTHROTTLED_RPM = 60000
+
+
+class FakeResponse:
+    def __init__(self, text: str, headers: dict | None = None) -> None:
+        self.text = text
+        self.sdk_http_response = SimpleNamespace(headers=headers or {})
+
+
+class FakeModels:
+    """Stands in for genai.Client().aio.models
+
+    Each call takes the next queued outcome (an exception to raise or a
+    response to return), or echoes the prompt once the queue is empty, and
+    records how many calls were in flight at once.
+    """
+
+    def __init__(self, outcomes=(), delay: float = 0.01, reply=None) -> None:
+        self.outcomes = list(outcomes)
+        self.delay = delay
+        self.reply = reply or (lambda contents: f"echo: {contents}")
+        self.calls = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def generate_content(self, model: str, contents):
+        self.calls.append(contents)
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            delay = self.delay(contents) if callable(self.delay) else self.delay
+            await asyncio.sleep(delay)
+            if self.outcomes:
+                outcome = self.outcomes.pop(0)
+                if isinstance(outcome, Exception):
+                    raise outcome
+                return outcome
+            return FakeResponse(self.reply(contents))
+        finally:
+            self.in_flight -= 1
+
+
+class FakeClient:
+    def __init__(self, models: FakeModels) -> None:
+        self.aio = SimpleNamespace(models=models)
+
+
+def api_error(code: int, headers: dict | None = None) -> errors.APIError:
+    body = {"error": {"code": code, "message": "fake error", "status": "FAKE"}}
+    return errors.APIError(code, body, response=SimpleNamespace(headers=headers or {}))
+
+
+def make_client(models: FakeModels, **kwargs) -> LLMClient:
+    kwargs.setdefault("requests_per_minute", UNTHROTTLED_RPM)
+    return LLMClient(client=FakeClient(models), cache=None, **kwargs)
+
+
+class TestLLMClient(unittest.TestCase):
+    def setUp(self):
+        # Retries wait for the backoff delay; keep the tests fast.
+        patcher = mock.patch("lib.llm_client.backoff_delay", return_value=0.0)
+        self.backoff = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_concurrency_is_capped(self):
+        models = FakeModels(delay=0.02)
+        llm = make_client(models, max_concurrency=3)
+        llm.generate_many([f"prompt {i}" for i in range(12)])
+        self.assertEqual(len(models.calls), 12)
+        self.assertEqual(models.peak_in_flight, 3)
+
+    def test_generate_many_keeps_input_order(self):
+        # Earlier prompts take longer, so they finish last.
+        prompts = [str(i) for i in range(8)]
+        models = FakeModels(delay=lambda contents: 0.005 * (8 - int(contents)))
+        llm = make_client(models, max_concurrency=8)
+        responses = llm.generate_many(prompts)
+        self.assertEqual([r.text for r in responses], [f"echo: {p}" for p in prompts])
+
+    def test_retries_rate_limit_and_server_errors(self):
+        models = FakeModels(outcomes=[api_error(429), api_error(503), api_error(500)])
+        llm = make_client(models, max_retries=3)
+        response = llm.generate("hello")
+        self.assertEqual(response.text, "echo: hello")
+        self.assertEqual(len(models.calls), 4)
+        self.assertEqual(
+            [call.args[0] for call in self.backoff.call_args_list], [0, 1, 2]
+        )
+
+    def test_gives_up_after_max_retries(self):
+        models = FakeModels(outcomes=[api_error(503)] * 3)
+        llm = make_client(models, max_retries=2)
+        with self.assertRaises(errors.APIError) as raised:
+            llm.generate("hello")
+        self.assertEqual(raised.exception.code, 503)
+        self.assertEqual(len(models.calls), 3)
+
+    def test_does_not_retry_client_errors(self):
+        for code in (400, 403, 404):
+            with self.subTest(code=code):
+                models = FakeModels(outcomes=[api_error(code)])
+                llm = make_client(models, max_retries=3)
+                with self.assertRaises(errors.APIError):
+                    llm.generate("hello")
+                self.assertEqual(len(models.calls), 1)
+
+    def test_retry_after_header_pauses_the_bucket(self):
+        models = FakeModels(outcomes=[api_error(429, {"Retry-After": "0.2"})])
+        llm = make_client(models)
+        start = time.monotonic()
+        response = llm.generate("hello")
+        self.assertEqual(response.text, "echo: hello")
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+        self.assertGreater(llm.bucket.paused_until, start + 0.19)
+        # The header's delay replaces the exponential backoff.
+        self.backoff.assert_not_called()
+
+    def test_rate_limit_headers_retune_the_bucket(self):
+        headers = {
+            "x-ratelimit-limit-requests": "120",
+            "x-ratelimit-remaining-requests": "5",
+        }
+        models = FakeModels(outcomes=[FakeResponse("ok", headers)])
+        llm = make_client(models)
+        llm.generate("hello")
+        self.assertEqual(llm.bucket.capacity, 120)
+        self.assertEqual(llm.bucket.rate, 2.0)
+        self.assertLessEqual(llm.bucket.tokens, 5)
+
+    def test_rate_limit_headers_on_errors_retune_the_bucket(self):
+        headers = {"X-RateLimit-Limit-Requests": "30", "Retry-After": "0"}
+        models = FakeModels(outcomes=[api_error(429, headers)])
+        llm = make_client(models)
+        llm.generate("hello")
+        self.assertEqual(llm.bucket.capacity, 30)
+        self.assertEqual(llm.bucket.rate, 0.5)
+
+    def test_individual_rerank_scores_concurrently(self):
+        documents = [
+            {"id": i, "title": f"Movie {i}", "document": "A film."} for i in range(6)
+        ]
+        scores = {f"Movie {i}": str(i) for i in range(6)}
+
+        def reply(prompt):
+            return next(s for title, s in scores.items() if f"Movie: {title} " in prompt)
+
+        models = FakeModels(delay=0.02, reply=reply)
+        llm = make_client(models, max_concurrency=4)
+        with mock.patch("lib.llm_client.get_llm_client", return_value=llm):
+            reranked = rerank_method("space movies", documents, "individual")
+        self.assertEqual(len(models.calls), 6)
+        self.assertEqual(models.peak_in_flight, 4)
+        self.assertEqual([doc["id"] for doc in reranked], [5, 4, 3, 2, 1, 0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from lib.quantization import QuantizedEmbeddings
+from lib.search_utils import QUANTIZATION_KINDS, file_fingerprint
+
+
+class TestQuantizedStore(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+        self.path = os.path.join(self.directory, "chunk_embeddings.npy")
+
+    def save_embeddings(self, seed: int) -> tuple[np.ndarray, str]:
+        embeddings = np.random.default_rng(seed).normal(size=(50, 20)).astype(np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        np.save(self.path, embeddings)
+        return np.load(self.path, mmap_mode="r"), file_fingerprint(self.path)
+
+    def store_files(self, kind: str) -> set[str]:
+        return {name for name in os.listdir(self.directory) if f".{kind}." in name}
+
+    def test_store_is_saved_once_and_mapped(self):
+        embeddings, source = self.save_embeddings(0)
+        for kind in QUANTIZATION_KINDS:
+            with self.subTest(kind=kind):
+                expected = QuantizedEmbeddings.from_embeddings(embeddings, kind)
+                first = QuantizedEmbeddings.load_or_create(self.path, kind, embeddings, source)
+                with mock.patch.object(
+                    QuantizedEmbeddings, "from_embeddings", side_effect=AssertionError
+                ):
+                    second = QuantizedEmbeddings.load_or_create(
+                        self.path, kind, embeddings, source
+                    )
+                for store in (first, second):
+                    self.assertIsInstance(store.codes, np.memmap)
+                    np.testing.assert_array_equal(store.codes, expected.codes)
+                    if kind == "int8":
+                        np.testing.assert_array_equal(store.scales, expected.scales)
+                    else:
+                        self.assertIsNone(store.scales)
+
+    def test_rebuilt_embeddings_get_a_new_store(self):
+        embeddings, source = self.save_embeddings(0)
+        QuantizedEmbeddings.load_or_create(self.path, "int8", embeddings, source)
+        old_files = self.store_files("int8")
+        self.assertEqual(len(old_files), 2)
+
+        embeddings, new_source = self.save_embeddings(1)
+        self.assertNotEqual(new_source, source)
+        store = QuantizedEmbeddings.load_or_create(self.path, "int8", embeddings, new_source)
+        expected = QuantizedEmbeddings.from_embeddings(embeddings, "int8")
+        np.testing.assert_array_equal(store.codes, expected.codes)
+        new_files = self.store_files("int8")
+        self.assertEqual(len(new_files), 2)
+        self.assertFalse(old_files & new_files)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,21 @@
+import unittest
+
+from lib.benchmarks import startup_benchmark
+
+
+class TestStartup(unittest.TestCase):
+    # Import times depend on the machine; `benchmark_cli.py startup` checks
+    # them against STARTUP_BUDGETS_MS. Here only the deterministic part counts.
+    def test_commands_defer_heavy_imports(self):
+        for result in startup_benchmark(runs=1):
+            with self.subTest(command=result["command"]):
+                self.assertEqual(result["returncode"], 0, result["command"])
+                self.assertFalse(
+                    result["deferred_imports"],
+                    f"{result['command']} imported deferred modules: "
+                    f"{', '.join(result['deferred_imports'])}",
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()